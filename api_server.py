@@ -1,23 +1,16 @@
 """
 FastAPI server to provide product search API for Android app.
-Uses the existing scrapers with Playwright to bypass anti-bot protection.
+Uses the existing scrapers with Playwright to bypass anti-bot protection,
+through the same orchestrator (and cache) as the web app.
 """
 from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict
-import asyncio
-from app.scrapers.amazon import AmazonScraper
-from app.scrapers.amazon_fresh import AmazonFreshScraper
-from app.scrapers.flipkart import FlipkartScraper
-from app.scrapers.flipkart_minutes import FlipkartMinutesScraper
-from app.scrapers.bigbasket import BigBasketScraper
-from app.scrapers.jiomart import JioMartScraper
-from app.scrapers.jiomart_quick import JioMartQuickScraper
-from app.scrapers.zepto import ZeptoScraper
-from app.scrapers.blinkit import BlinkitScraper
-from app.scrapers.instamart import InstamartScraper
+from typing import Dict, Optional
+from app.encoding import FastJSONResponse
+from app.orchestrator import orchestrator
+from app.scrapers.deadline import Deadline
 
-app = FastAPI(title="PriceHunt API", version="1.0.0")
+app = FastAPI(title="PriceHunt API", version="1.0.0", default_response_class=FastJSONResponse)
 
 # Allow CORS for Android app
 app.add_middleware(
@@ -28,108 +21,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize scrapers
-scrapers = {}
-
-def get_scrapers(pincode: str):
-    """Get or create scrapers for the given pincode."""
-    if pincode not in scrapers:
-        scrapers[pincode] = {
-            "Amazon Fresh": AmazonFreshScraper(pincode),
-            "Flipkart Minutes": FlipkartMinutesScraper(pincode),
-            "JioMart Quick": JioMartQuickScraper(pincode),
-            "BigBasket": BigBasketScraper(pincode),
-            "Zepto": ZeptoScraper(pincode),
-            "Amazon": AmazonScraper(pincode),
-            "Flipkart": FlipkartScraper(pincode),
-            "JioMart": JioMartScraper(pincode),
-            "Blinkit": BlinkitScraper(pincode),
-            "Instamart": InstamartScraper(pincode),
-        }
-    return scrapers[pincode]
+# The platforms as the Android app knows them, in result order. Kept as the
+# app shipped them: Blinkit and Instamart are listed but no longer searched
+# (their scrapers returned nothing), and delivery times may differ from the
+# web app's registry.
+ANDROID_PLATFORMS = [
+    {"name": "Amazon Fresh", "delivery_time": "2-4 hours"},
+    {"name": "Flipkart Minutes", "delivery_time": "10-45 mins"},
+    {"name": "JioMart Quick", "delivery_time": "10-30 mins"},
+    {"name": "BigBasket", "delivery_time": "2-4 hours"},
+    {"name": "Zepto", "delivery_time": "10-15 mins"},
+    {"name": "Amazon", "delivery_time": "1-3 days"},
+    {"name": "Flipkart", "delivery_time": "2-4 days"},
+    {"name": "JioMart", "delivery_time": "2-5 days"},
+    {"name": "Blinkit", "delivery_time": "10-20 mins"},
+    {"name": "Instamart", "delivery_time": "15-30 mins"},
+]
+ANDROID_ORDER = {platform["name"]: i for i, platform in enumerate(ANDROID_PLATFORMS)}
 
 
 @app.get("/api/search")
 async def search_products(
     q: str = Query(..., description="Search query"),
-    pincode: str = Query("560001", description="Delivery pincode")
+    pincode: str = Query("560001", description="Delivery pincode"),
+    max_wait_ms: Optional[int] = Query(None, ge=1, description="Latency budget; platforms still pending are listed"),
 ) -> Dict:
     """
     Search for products across all platforms.
-    Returns results as they become available.
+    Cached platforms are answered at once; the rest are scraped concurrently.
+    With max_wait_ms, whatever has answered by then is returned.
     """
-    platform_scrapers = get_scrapers(pincode)
-    results = {}
-    
-    # Run all scrapers in parallel
-    tasks = []
-    for platform_name, scraper in platform_scrapers.items():
-        tasks.append(search_platform(platform_name, scraper, q))
+    deadline = Deadline.from_ms(max_wait_ms) if max_wait_ms is not None else None
+    answers = [answer async for answer in orchestrator.stream(q, pincode, deadline)]
+    answers.sort(key=lambda answer: ANDROID_ORDER.get(answer.platform, len(ANDROID_ORDER)))
+    answered = {answer.platform for answer in answers}
     
-    # Wait for all to complete
-    platform_results = await asyncio.gather(*tasks, return_exceptions=True)
+    # The app's response shape: each platform's results in scrape order, and
+    # the cheapest of them all as lowest_price
+    all_products = [product for answer in answers for product in answer.results]
+    lowest = min(all_products, key=lambda x: x.price) if all_products else None
     
-    # Combine results into a flat list
-    all_products = []
-    for platform_name, products in zip(platform_scrapers.keys(), platform_results):
-        if not isinstance(products, Exception) and products:
-            for p in products:
-                all_products.append({
-                    "name": p.name,
-                    "price": p.price,
-                    "original_price": p.original_price,
-                    "discount": p.discount,
-                    "platform": p.platform,
-                    "url": p.url,
-                    "image_url": p.image_url,
-                    "rating": p.rating,
-                    "delivery_time": p.delivery_time,
-                    "available": p.available
-                })
-    
-    # Find lowest price
-    lowest = None
-    if all_products:
-        lowest = min(all_products, key=lambda x: x["price"])
-    
-    return {
+    return FastJSONResponse({
         "query": q,
         "pincode": pincode,
         "results": all_products,
         "lowest_price": lowest,
-        "total_platforms": len([p for p in platform_results if not isinstance(p, Exception) and p])
-    }
-
-
-async def search_platform(platform_name: str, scraper, query: str):
-    """Search a single platform."""
-    try:
-        print(f"{platform_name}: Searching for '{query}'...")
-        products = await scraper.search(query)
-        print(f"{platform_name}: Found {len(products)} products")
-        return products
-    except Exception as e:
-        print(f"{platform_name}: Error - {e}")
-        return []
+        "total_platforms": len([answer for answer in answers if answer.results]),
+        "stale_platforms": [answer.platform for answer in answers if answer.degraded],
+        "pending_platforms": [name for name in orchestrator.platforms if name not in answered],
+    })
 
 
 @app.get("/api/platforms")
 async def get_platforms():
     """Get list of all supported platforms."""
-    return {
-        "platforms": [
-            {"name": "Amazon Fresh", "delivery_time": "2-4 hours"},
-            {"name": "Flipkart Minutes", "delivery_time": "10-45 mins"},
-            {"name": "JioMart Quick", "delivery_time": "10-30 mins"},
-            {"name": "BigBasket", "delivery_time": "2-4 hours"},
-            {"name": "Zepto", "delivery_time": "10-15 mins"},
-            {"name": "Amazon", "delivery_time": "1-3 days"},
-            {"name": "Flipkart", "delivery_time": "2-4 days"},
-            {"name": "JioMart", "delivery_time": "2-5 days"},
-            {"name": "Blinkit", "delivery_time": "10-20 mins"},
-            {"name": "Instamart", "delivery_time": "15-30 mins"},
-        ]
-    }
+    return {"platforms": ANDROID_PLATFORMS}
 
 
 @app.get("/")
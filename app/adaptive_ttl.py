@@ -0,0 +1,169 @@
+"""
+Volatility-adaptive TTLs per (platform, query).
+
+Each successful scrape is compared with the previous one for the same
+platform, query and pincode (prices and availability, via a fingerprint). Unchanged
+data stretches that key's TTL; changed data shrinks it. TTLs stay within
+[min_ttl, max_ttl] and, when a key has not been observed for a while, decay
+back toward the platform default with a configurable half-life.
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.histogram import Histogram
+from app.scrapers.base import ProductResult
+
+
+def fingerprint(results: List[ProductResult]) -> int:
+    """Hash of what a refresh is meant to catch: each product's price and availability."""
+    return hash(tuple(sorted((r.url, r.price, r.available) for r in results)))
+
+
+@dataclass
+class _Volatility:
+    ttl: float
+    fingerprints: Dict[str, int]   # pincode -> fingerprint of the last scrape
+    observed_at: float
+    changes: int = 0
+    unchanged: int = 0
+
+
+class AdaptiveTTL:
+    """
+    Learns a TTL per (platform, query) from how often refreshes change the data.
+    
+    Features:
+    - Multiplicative grow (unchanged) / shrink (changed) updates
+    - Bounded to [min_ttl, max_ttl]
+    - Decay toward the default TTL with half_life seconds of inactivity
+    - Bounded key table (least recently observed keys are forgotten); the
+      TTL is shared by all pincodes, but each pincode is compared only with
+      its own previous scrape
+    - Per-platform TTL histograms, maintained incrementally
+    """
+    
+    def __init__(
+        self,
+        min_ttl: float = 60,
+        max_ttl: float = 2 * 3600,
+        grow: float = 1.2,
+        shrink: float = 0.25,
+        half_life: float = 6 * 3600,
+        max_keys: int = 20000,
+        max_pincodes: int = 8,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize with TTL bounds and update factors (clock is injectable for replays)."""
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.grow = grow
+        self.shrink = shrink
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self.max_pincodes = max_pincodes
+        self.clock = clock
+        self._keys: "OrderedDict[Tuple[str, Hashable], _Volatility]" = OrderedDict()
+        self._platforms: Dict[str, Histogram] = {}   # platform -> learned TTLs of its keys
+        self._stats = {
+            "observations": 0,
+            "changed": 0,
+            "unchanged": 0,
+        }
+    
+    def _clamp(self, ttl: float) -> float:
+        return min(self.max_ttl, max(self.min_ttl, ttl))
+    
+    def _decayed(self, state: _Volatility, default_ttl: float, now: float) -> float:
+        """Learned TTL pulled back toward the default by time since the last observation."""
+        weight = 0.5 ** ((now - state.observed_at) / self.half_life)
+        return default_ttl + (state.ttl - default_ttl) * weight
+    
+    def observe(
+        self,
+        platform: str,
+        query: Hashable,
+        pincode: str,
+        results: List[ProductResult],
+        default_ttl: float,
+    ) -> float:
+        """
+        Record a successful scrape and return the TTL to cache it with.
+        
+        Args:
+            platform: Platform name
+            query: Normalised query
+            pincode: Delivery pincode
+            results: Fresh results
+            default_ttl: Platform default TTL (used for unseen keys and as the decay target)
+        """
+        now = self.clock()
+        key = (platform, query)
+        current = fingerprint(results)
+        state = self._keys.get(key)
+        self._stats["observations"] += 1
+        
+        if state is None:
+            state = _Volatility(ttl=self._clamp(default_ttl), fingerprints={pincode: current}, observed_at=now)
+            self._keys[key] = state
+            self._histogram(platform).add(state.ttl)
+            while len(self._keys) > self.max_keys:
+                (forgotten, _), old = self._keys.popitem(last=False)
+                self._platforms[forgotten].remove(old.ttl)
+            return state.ttl
+        
+        ttl = self._decayed(state, default_ttl, now)
+        previous = state.fingerprints.pop(pincode, None)
+        state.fingerprints[pincode] = current
+        while len(state.fingerprints) > self.max_pincodes:
+            del state.fingerprints[next(iter(state.fingerprints))]
+        # A pincode's first scrape has nothing to compare against
+        if previous is not None and current == previous:
+            ttl *= self.grow
+            state.unchanged += 1
+            self._stats["unchanged"] += 1
+        elif previous is not None:
+            ttl *= self.shrink
+            state.changes += 1
+            self._stats["changed"] += 1
+        
+        histogram = self._histogram(platform)
+        histogram.remove(state.ttl)
+        state.ttl = self._clamp(ttl)
+        histogram.add(state.ttl)
+        state.observed_at = now
+        self._keys.move_to_end(key)
+        return state.ttl
+    
+    def _histogram(self, platform: str) -> Histogram:
+        histogram = self._platforms.get(platform)
+        if histogram is None:
+            histogram = self._platforms[platform] = Histogram()
+        return histogram
+    
+    def ttl_for(self, platform: str, query: Hashable, default_ttl: float) -> Optional[float]:
+        """Current learned TTL for a key (decayed), or None if it has not been observed."""
+        state = self._keys.get((platform, query))
+        if state is None:
+            return None
+        return self._clamp(self._decayed(state, default_ttl, self.clock()))
+    
+    def clear(self):
+        """Forget everything learned."""
+        self._keys.clear()
+        self._platforms.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-platform summaries of the learned TTLs."""
+        return {
+            "keys": len(self._keys),
+            "min_ttl": self.min_ttl,
+            "max_ttl": self.max_ttl,
+            **self._stats,
+            "platforms": {
+                platform: histogram.to_dict()
+                for platform, histogram in self._platforms.items()
+                if histogram.count
+            },
+        }
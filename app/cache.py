@@ -1,206 +1,1082 @@
 """
 Smart caching system for price comparator.
-Provides per-platform caching with TTL and stale-while-revalidate support.
+Provides per-platform caching with TTL and stale-while-revalidate support,
+plus pre-encoded SSE frames and assembled /api/search response bodies.
+Entries are held as compact JSON bytes (optionally zlib-compressed) and the
+cache is bounded by a memory budget in bytes. The in-memory LRU can be
+backed by a persistent or cross-worker second tier (SQLite, shared memory
+or Redis) - see app/cache_store.py. Memory is split into independently
+locked shards so concurrent requests rarely contend.
 """
+import asyncio
+import itertools
+import os
 import time
+import zlib
 import hashlib
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, Iterable, List, Optional, Any, Set, Tuple
 from dataclasses import dataclass, field
 from collections import OrderedDict
 import threading
+import weakref
+
+from app.scrapers.base import PriceRecord, ProductResult, ScrapeOutcome
+from app.encoding import dumps, loads_results, sse_results_event
+from app.cache_store import CacheBackend, create_store
+from app.query import canonical_query
+from app.cache_policy import make_policy
+from app.adaptive_ttl import AdaptiveTTL
+from app.product_catalog import ProductCatalog, apply_prices, split_volatile
+from app.histogram import Histogram
+from app.geo import KeyScopePolicy, default_key_scopes
+from app.scrapers.store_map import store_map
+
+
+# Approximate fixed cost of an entry (object, key, index slots) on top of its payload
+ENTRY_OVERHEAD = 400
+
+# Entries older than this fraction of their TTL are served as stale and refreshed
+STALE_FRACTION = 0.8
+
+# (platform, canonical query, location) - see CacheManager.flight_key
+CacheKey = Tuple[str, str, str]
+
+
+def _monotonic_from_wall(wall: float) -> float:
+    """Convert a wall-clock timestamp (e.g. read from the L2 store) to the monotonic clock."""
+    return time.monotonic() - max(0.0, time.time() - wall)
 
 
 @dataclass
 class CacheEntry:
-    """Single cache entry with metadata."""
-    data: List[Dict]
-    timestamp: float
+    """
+    Single cache entry with metadata. Results are kept as encoded JSON.
+    
+    With a ProductCatalog the payload holds only each result's volatile
+    fields (price, original price, discount, availability) and `products`
+    the catalog keys of the static ones; reads join the two. The entry
+    references its products for as long as the object lives, so an entry
+    handed out before it was evicted or replaced still reads in full.
+    
+    Expiry and ages use time.monotonic(), so wall-clock jumps (NTP, manual
+    changes) cannot expire or resurrect entries; created_at keeps the wall
+    time for the L2 store.
+    """
+    payload: bytes       # JSON-encoded results (or volatile fields), zlib-compressed if `compressed`
+    timestamp: float     # time.monotonic() when cached
     ttl: float
+    count: int = 0       # number of results in the payload
+    compressed: bool = False
     hits: int = 0
+    generation: int = 0
+    frames: Dict[bool, bytes] = field(default_factory=dict)  # is_stale -> encoded "platform" SSE frame
+    platform: str = ""
+    query: str = ""      # normalised query
+    pincode: str = ""    # location the entry is keyed by: the pincode, or a zone / "IN" (see app.geo)
+    size: int = 0        # bytes held by the entry (payload, frames and ENTRY_OVERHEAD)
+    outcome: ScrapeOutcome = ScrapeOutcome.OK
+    good_at: float = 0.0   # monotonic time `data` was last scraped successfully
+    fallback: bool = False  # scrape failed or came back empty; `data` is the last good result, served as stale
+    created_at: float = 0.0  # wall-clock time of the scrape
+    prefetched: bool = False  # written by the prefetch scheduler rather than a user request
+    products: Tuple[str, ...] = ()  # catalog keys of the results, when split
+    repriced: int = 0     # reprice() refreshes since the last full scrape
+    catalog: Optional[ProductCatalog] = field(default=None, repr=False, compare=False)
+    
+    @property
+    def decoded_payload(self) -> bytes:
+        """The payload, decompressed."""
+        return zlib.decompress(self.payload) if self.compressed else self.payload
+    
+    @property
+    def results_json(self) -> bytes:
+        """The results as a JSON array."""
+        if self.catalog is None:
+            return self.decoded_payload
+        return dumps(self.data)
+    
+    @property
+    def data(self) -> List[ProductResult]:
+        """The results, decoded (and joined with the catalog) on each access."""
+        if self.catalog is None:
+            return loads_results(self.decoded_payload)
+        return self.catalog.join_payload(self.platform, self.products, self.decoded_payload)
     
     @property
     def is_expired(self) -> bool:
         """Check if entry has exceeded its TTL."""
-        return time.time() - self.timestamp > self.ttl
+        return time.monotonic() - self.timestamp > self.ttl
     
     @property
     def is_stale(self) -> bool:
-        """Check if entry is stale (past 80% of TTL) but not expired."""
-        age = time.time() - self.timestamp
-        return age > (self.ttl * 0.8) and age <= self.ttl
+        """Check if entry is stale (past STALE_FRACTION of TTL) but not expired."""
+        age = time.monotonic() - self.timestamp
+        return age > (self.ttl * STALE_FRACTION) and age <= self.ttl
+    
+    @property
+    def stale_in(self) -> float:
+        """Seconds until the entry turns stale (negative once it has)."""
+        return self.ttl * STALE_FRACTION - (time.monotonic() - self.timestamp)
+    
+    @property
+    def is_negative(self) -> bool:
+        """Check if the entry records an empty or failed scrape."""
+        return self.outcome is not ScrapeOutcome.OK
     
     @property
     def age_seconds(self) -> float:
         """Get age of entry in seconds."""
-        return time.time() - self.timestamp
+        return time.monotonic() - self.timestamp
+
+class CacheShard:
+    """
+    One independently locked partition of the cache.
+    
+    Features:
+    - Own lock, entry dict and eviction policy, with its share of the
+      entry cap and byte budget (the product catalog's bytes included)
+    - Own secondary indexes (platform / pincode / query -> keys) and
+      incrementally maintained statistics, merged by CacheManager.get_stats
+    """
+    
+    # Counters kept for each platform as well as for the shard
+    PLATFORM_COUNTERS = ("hits", "stale_hits", "misses", "evictions", "expirations")
+    
+    def __init__(
+        self,
+        policy: str = "lru",
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        catalog: Optional[ProductCatalog] = None,
+        catalog_share: float = 1.0,
+    ):
+        """Initialize an empty shard; catalog_share is the part of the shared catalog's bytes it is charged for."""
+        self.lock = threading.RLock()
+        self.entries: Dict[CacheKey, CacheEntry] = {}
+        self.policy = make_policy(policy)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.catalog = catalog
+        self.catalog_share = catalog_share
+        self.bytes = 0
+        self.by_platform: Dict[str, Set[CacheKey]] = {}
+        self.by_pincode: Dict[str, Set[CacheKey]] = {}
+        self.by_query: Dict[str, Set[CacheKey]] = {}
+        self.platform_bytes: Dict[str, int] = {}
+        self.reset_stats()
+    
+    def reset_stats(self):
+        """Zero every counter and histogram."""
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "stale_hits": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "negative_sets": 0,
+            "fallbacks": 0,
+            "prefetch_hits": 0,
+            "reprices": 0,
+        }
+        self.platform_stats: Dict[str, Dict[str, int]] = {}
+        self.hit_ages = Histogram()                    # age of the data served by each hit
+        self.platform_hit_ages: Dict[str, Histogram] = {}
+        self.ttls = Histogram()                        # TTLs of live entries
+        self.negative_entries = 0
+    
+    def count(self, platform: str, name: str):
+        """Bump a counter for the shard and for a platform."""
+        self.stats[name] += 1
+        counters = self.platform_stats.get(platform)
+        if counters is None:
+            counters = self.platform_stats[platform] = dict.fromkeys(self.PLATFORM_COUNTERS, 0)
+        counters[name] += 1
+    
+    def record_hit_age(self, platform: str, age: float):
+        """Add the age of the data served by a hit to the histograms."""
+        self.hit_ages.add(age)
+        histogram = self.platform_hit_ages.get(platform)
+        if histogram is None:
+            histogram = self.platform_hit_ages[platform] = Histogram()
+        histogram.add(age)
+    
+    def insert(self, key: CacheKey, entry: CacheEntry):
+        """Store an entry and add it to the secondary indexes."""
+        if key in self.entries:
+            self.remove(key)
+        self.entries[key] = entry
+        self.policy.on_insert(key)
+        self.by_platform.setdefault(entry.platform, set()).add(key)
+        self.by_pincode.setdefault(entry.pincode, set()).add(key)
+        self.by_query.setdefault(entry.query, set()).add(key)
+        self.platform_bytes[entry.platform] = self.platform_bytes.get(entry.platform, 0) + entry.size
+        self.bytes += entry.size
+        self.ttls.add(entry.ttl)
+        if entry.is_negative:
+            self.negative_entries += 1
+    
+    def remove(self, key: CacheKey) -> Optional[CacheEntry]:
+        """Remove an entry and drop it from the secondary indexes."""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+        self.policy.on_remove(key)
+        for index, value in (
+            (self.by_platform, entry.platform),
+            (self.by_pincode, entry.pincode),
+            (self.by_query, entry.query),
+        ):
+            keys = index.get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[value]
+        self.platform_bytes[entry.platform] -= entry.size
+        if not self.platform_bytes[entry.platform]:
+            del self.platform_bytes[entry.platform]
+        self.bytes -= entry.size
+        self.ttls.remove(entry.ttl)
+        if entry.is_negative:
+            self.negative_entries -= 1
+        return entry
+    
+    def charged_bytes(self) -> int:
+        """Bytes counted against the budget: the entries', plus this shard's share of the catalog's."""
+        if self.catalog is None:
+            return self.bytes
+        return self.bytes + int(self.catalog.memory_bytes * self.catalog_share)
+    
+    def evict_if_needed(self, incoming: int = 0):
+        """
+        Evict entries (in policy order) until an entry of `incoming` bytes fits.
+        
+        Evicting an entry no reader holds also drops the catalog products only
+        it listed, so the loop frees catalog bytes as well as entry bytes.
+        """
+        while self.entries and (
+            (self.max_entries is not None and len(self.entries) >= self.max_entries)
+            or (self.max_bytes is not None and self.charged_bytes() + incoming > self.max_bytes)
+        ):
+            self.count(self.remove(self.policy.select_victim()).platform, "evictions")
+    
+    def add_frame(self, entry: CacheEntry, frame_size: int):
+        """Account the bytes of an SSE frame kept on an entry."""
+        entry.size += frame_size
+        self.platform_bytes[entry.platform] += frame_size
+        self.bytes += frame_size
+    
+    def clear(self):
+        """Drop every entry and statistic."""
+        self.entries.clear()
+        self.policy.clear()
+        self.by_platform.clear()
+        self.by_pincode.clear()
+        self.by_query.clear()
+        self.platform_bytes.clear()
+        self.bytes = 0
+        self.reset_stats()
+
+
+def _merge_policy_stats(stats: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum the numeric statistics of several shards' eviction policies."""
+    merged = dict(stats[0])
+    for shard_stats in stats[1:]:
+        for name, value in shard_stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                merged[name] += value
+    if "admission_rate" in merged:
+        contests = merged["admitted"] + merged["rejected"]
+        merged["admission_rate"] = round(merged["admitted"] / contests * 100, 1) if contests else 0
+    return merged
 
 
 class CacheManager:
     """
-    LRU cache manager with per-platform TTL support.
+    Sharded LRU cache manager with per-platform TTL support.
     
     Features:
-    - Per-platform cache entries
+    - Per-platform cache entries keyed by (platform, canonical query, location)
+      tuples - no per-lookup string formatting or hashing beyond the tuple's own
+    - N independently locked shards (CacheShard), chosen by the key's hash, so
+      concurrent requests rarely contend; batch get_many / set_many take each
+      shard's lock once for a whole 8-platform fan-out
+    - Async API (apreload / aget_many / aset_many) that moves L2 store I/O off
+      the event loop
     - Different TTLs for quick-commerce vs e-commerce
-    - LRU eviction when max entries reached
+    - Optional volatility-adaptive TTLs (AdaptiveTTL): keys whose prices rarely
+      change are cached longer, volatile ones shorter
+    - Eviction against a byte budget (max_bytes) and/or an entry cap (max_entries),
+      split evenly between shards, in LRU order or with W-TinyLFU admission
+      (policy="w-tinylfu")
+    - Compact storage: results held as JSON bytes, optionally zlib-compressed
+    - Optional two-tier storage (ProductCatalog): static product fields are kept
+      once per product while an entry lists it, within the byte budget;
+      entries hold only the volatile ones, and reprice() refreshes an entry
+      from price records alone
     - Thread-safe operations
-    - Cache statistics tracking
+    - Cache statistics maintained incrementally per shard (global and per
+      platform, with histograms of served data age and of live entries' TTLs),
+      so get_stats is O(shards x platforms) rather than O(entries)
+    - Encoded SSE frames kept per entry
+    - Assembled response bodies, valid only while every component entry is unchanged
+    - Secondary indexes (platform / pincode / query -> keys) for bulk invalidation
+    - Per-platform key scope (KeyScopePolicy): e-commerce results can be shared
+      by every pincode of a zone, or nationally, instead of cached per pincode
+    - Negative caching: empty and failed scrapes are cached with short TTLs
+    - Stale-if-error: a failed or empty scrape serves the last good data
+      (marked stale) for up to STALE_IF_ERROR seconds after it was scraped
+    - Optional L2 store (CacheBackend): L1 misses fall through to it; with a
+      shared backend every worker process sees every other worker's scrapes
+      (each worker's L1 copy still lives until its own TTL)
     """
     
     # TTL settings (in seconds)
     QUICK_COMMERCE_TTL = 300  # 5 minutes for quick commerce (prices change more often)
     ECOMMERCE_TTL = 900       # 15 minutes for e-commerce
     
+    # Short TTLs for scrapes that returned nothing, so doomed queries are not re-scraped on every request
+    NEGATIVE_TTLS = {
+        ScrapeOutcome.EMPTY: 120,
+        ScrapeOutcome.TIMEOUT: 30,
+        ScrapeOutcome.BLOCKED: 300,
+        ScrapeOutcome.ERROR: 60,
+    }
+    
+    # How long after a successful scrape its data may still stand in for a failed one
+    STALE_IF_ERROR = 3600
+    
     # Platform categorization
     QUICK_COMMERCE_PLATFORMS = {"Amazon Fresh", "Flipkart Minutes", "JioMart Quick", "BigBasket", "Zepto", "Instamart", "Blinkit"}
     ECOMMERCE_PLATFORMS = {"Amazon", "Flipkart", "JioMart"}
     
-    def __init__(self, max_entries: int = 1000):
-        """Initialize cache manager."""
+    # Counters kept for each platform as well as globally
+    PLATFORM_COUNTERS = CacheShard.PLATFORM_COUNTERS
+    
+    def __init__(
+        self,
+        max_entries: Optional[int] = 1000,
+        max_responses: int = 200,
+        store: Optional[CacheBackend] = None,
+        max_bytes: Optional[int] = None,
+        compress: bool = False,
+        policy: str = "lru",
+        adaptive_ttl: Optional[AdaptiveTTL] = None,
+        key_scopes: Optional[KeyScopePolicy] = None,
+        catalog: Optional[ProductCatalog] = None,
+        shards: int = 1,
+    ):
+        """
+        Initialize cache manager.
+        
+        Args:
+            max_entries: Entry cap, or None for no cap
+            max_responses: Cap on assembled response bodies
+            store: Optional second tier
+            max_bytes: Memory budget in bytes for entries and catalog products, or None for no budget
+            compress: zlib-compress entry payloads (smaller, slower hits)
+            policy: Eviction policy, "lru" or "w-tinylfu" (scan resistant)
+            adaptive_ttl: Learns OK-result TTLs per (platform, query); None uses the fixed platform TTLs
+            key_scopes: Per-platform key scope; None keys every platform by exact pincode
+            catalog: Product metadata store; None keeps whole results in each entry
+            shards: Independently locked partitions; the cap and budget are split between them
+        """
         self.max_entries = max_entries
-        self._cache: OrderedDict[str, CacheEntry] = OrderedDict()
-        self._lock = threading.RLock()
+        self.max_responses = max_responses
+        self.store = store
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.adaptive_ttl = adaptive_ttl
+        self.key_scopes = key_scopes or KeyScopePolicy()
+        self.catalog = catalog
+        self._shards = [
+            CacheShard(
+                policy,
+                max_entries=-(-max_entries // shards) if max_entries is not None else None,
+                max_bytes=max_bytes // shards if max_bytes is not None else None,
+                catalog=catalog,
+                catalog_share=1 / shards,
+            )
+            for _ in range(shards)
+        ]
+        self._generations = itertools.count(1)   # next() is atomic, so shards need no shared lock
         
-        # Statistics
-        self._stats = {
-            "hits": 0,
-            "misses": 0,
-            "stale_hits": 0,
-            "evictions": 0,
-        }
+        # (query, pincode, platform-set version) -> (encoded body, {component key: generation})
+        self._responses: OrderedDict[Tuple[str, str, str], Tuple[bytes, Dict[CacheKey, int]]] = OrderedDict()
+        self._responses_lock = threading.Lock()
+        self._response_bytes = 0
+        self._response_stats = {"response_hits": 0, "response_misses": 0}
+    
+    def _shard(self, key: CacheKey) -> CacheShard:
+        """Shard holding a key."""
+        return self._shards[hash(key) % len(self._shards)]
+    
+    def _normalize_query(self, query: str) -> str:
+        """Normalize query to its canonical form (case, spacing, punctuation, word order, units)."""
+        return canonical_query(query)
+    
+    def flight_key(self, platform: str, query: str, pincode: str) -> CacheKey:
+        """Key identifying the scrape that fills an entry (for single-flight coalescing)."""
+        return platform, self._normalize_query(query), self.key_scopes.location(platform, pincode)
     
-    def _make_key(self, platform: str, query: str, pincode: str) -> str:
-        """Generate cache key from platform, query, and pincode."""
-        # Normalize query (lowercase, strip whitespace)
-        normalized_query = query.lower().strip()
-        key_string = f"{platform}:{normalized_query}:{pincode}"
-        # Use hash for consistent key length
-        return hashlib.md5(key_string.encode()).hexdigest()
+    # Cache entries are keyed exactly like the scrapes that fill them
+    _make_key = flight_key
     
-    def _get_ttl(self, platform: str) -> float:
-        """Get appropriate TTL for platform."""
+    def _make_keys(self, platforms: Iterable[str], query: str, pincode: str) -> Dict[str, CacheKey]:
+        """_make_key() for several platforms, normalizing the query once."""
+        normalized = self._normalize_query(query)
+        return {platform: (platform, normalized, self.key_scopes.location(platform, pincode)) for platform in platforms}
+    
+    @staticmethod
+    def _store_key(key: CacheKey) -> str:
+        """Key of an entry in the L2 store (fixed length, stable across processes)."""
+        return hashlib.md5(":".join(key).encode()).hexdigest()
+    
+    def _get_ttl(self, platform: str, outcome: ScrapeOutcome = ScrapeOutcome.OK) -> float:
+        """Get appropriate TTL for platform and scrape outcome."""
+        if outcome is not ScrapeOutcome.OK:
+            return self.NEGATIVE_TTLS[outcome]
         if platform in self.QUICK_COMMERCE_PLATFORMS:
             return self.QUICK_COMMERCE_TTL
         return self.ECOMMERCE_TTL
     
-    def _evict_if_needed(self):
-        """Evict oldest entries if cache is full."""
-        while len(self._cache) >= self.max_entries:
-            # Remove oldest (first) item
-            self._cache.popitem(last=False)
-            self._stats["evictions"] += 1
+    def _encode(self, results: List[ProductResult]) -> bytes:
+        """Encode results to the stored payload form."""
+        payload = dumps(results)
+        return zlib.compress(payload, 1) if self.compress else payload
     
-    def get(self, platform: str, query: str, pincode: str) -> Tuple[Optional[List[Dict]], bool]:
+    def _split(self, results: List[ProductResult]) -> Tuple[bytes, Tuple[str, ...]]:
+        """
+        Encode results to a payload and catalog keys.
+        
+        With a catalog, static fields go to it (each key referenced once, for
+        the entry built from the payload) and the payload holds the volatile
+        fields.
+        """
+        if self.catalog is None:
+            return self._encode(results), ()
+        products = tuple(self.catalog.put(result) for result in results)
+        payload = dumps(split_volatile(results))
+        return (zlib.compress(payload, 1) if self.compress else payload), products
+    
+    def _new_entry(self, payload: bytes, count: int, products: Tuple[str, ...] = (), **fields) -> CacheEntry:
+        """
+        Build an entry for an encoded payload and account its size.
+        
+        The references to `products` (taken by _split or retain) are released
+        when the entry object is garbage collected, not when it leaves the
+        cache, so readers holding it can still join its results.
+        """
+        entry = CacheEntry(
+            payload=payload,
+            count=count,
+            compressed=self.compress,
+            generation=next(self._generations),
+            size=len(payload) + ENTRY_OVERHEAD + 8 * len(products),
+            products=products,
+            catalog=self.catalog,
+            **fields,
+        )
+        if products:
+            weakref.finalize(entry, self.catalog.release, products)
+        return entry
+    
+    def _promote(self, shard: CacheShard, key: CacheKey, row: Tuple[List[ProductResult], float, float, str, str, str]):
+        """Insert an entry read from the L2 store into memory (shard lock held)."""
+        results, created_at, ttl, platform, query, pincode = row
+        timestamp = _monotonic_from_wall(created_at)
+        payload, products = self._split(results)
+        entry = self._new_entry(
+            payload,
+            len(results),
+            products,
+            timestamp=timestamp,
+            created_at=created_at,
+            ttl=ttl,
+            good_at=timestamp,
+            platform=platform,
+            query=query,
+            pincode=pincode,
+        )
+        shard.evict_if_needed(entry.size)
+        shard.insert(key, entry)
+    
+    def preload(self, platforms: List[str], query: str, pincode: str) -> int:
+        """
+        Promote a query's entries for several platforms from the L2 store.
+        
+        Reads every platform missing from memory in one get_many call (a
+        single pipelined round trip for Redis), so the per-platform lookups
+        that follow are memory hits. No shard lock is held during the read.
+        
+        Returns:
+            Number of entries promoted
+        """
+        if self.store is None:
+            return 0
+        
+        keys = [
+            key for key in self._make_keys(platforms, query, pincode).values()
+            if key not in self._shard(key).entries
+        ]
+        if not keys:
+            return 0
+        
+        rows = self.store.get_many([self._store_key(key) for key in keys])
+        promoted = 0
+        for key, row in zip(keys, rows):
+            if row is None:
+                continue
+            shard = self._shard(key)
+            with shard.lock:
+                # A scrape may have landed while the store was being read
+                if key not in shard.entries:
+                    self._promote(shard, key, row)
+                    promoted += 1
+        return promoted
+    
+    async def apreload(self, platforms: List[str], query: str, pincode: str) -> int:
+        """preload() with the L2 store read in a worker thread, off the event loop."""
+        if self.store is None:
+            return 0
+        return await asyncio.to_thread(self.preload, platforms, query, pincode)
+    
+    def _lookup(self, shard: CacheShard, key: CacheKey) -> Tuple[Optional[CacheEntry], bool]:
+        """Look up a key in its shard, counting the hit or miss (shard lock held)."""
+        platform = key[0]
+        entry = shard.entries.get(key)
+        if entry is None:
+            shard.count(platform, "misses")
+            return None, False
+        
+        # Check if expired - good data is kept (unserved) through the
+        # stale-if-error window in case the refetch fails
+        if entry.is_expired:
+            if not self._usable_fallback(entry):
+                shard.remove(key)
+                shard.count(platform, "expirations")
+            shard.count(platform, "misses")
+            return None, False
+        
+        shard.policy.on_access(key)
+        entry.hits += 1
+        
+        is_stale = entry.is_stale
+        shard.count(platform, "stale_hits" if is_stale else "hits")
+        if entry.prefetched:
+            shard.stats["prefetch_hits"] += 1
+        shard.record_hit_age(platform, time.monotonic() - entry.good_at)
+        return entry, is_stale
+    
+    def lookup(self, platform: str, query: str, pincode: str) -> Tuple[Optional[CacheEntry], bool]:
+        """
+        Get the cache entry for a platform/query/pincode combination.
+        
+        Returns:
+            Tuple of (entry, is_stale)
+            - entry: CacheEntry or None if not found/expired
+            - is_stale: True if the entry is stale (should revalidate in background)
+        """
+        key = self._make_key(platform, query, pincode)
+        shard = self._shard(key)
+        
+        if self.store is not None and key not in shard.entries:
+            row = self.store.get(self._store_key(key))
+            if row is not None:
+                with shard.lock:
+                    if key not in shard.entries:
+                        self._promote(shard, key, row)
+        
+        with shard.lock:
+            return self._lookup(shard, key)
+    
+    def get_many(self, platforms: List[str], query: str, pincode: str) -> Dict[str, Tuple[Optional[CacheEntry], bool]]:
+        """
+        lookup() for several platforms of one query.
+        
+        L1 misses are read from the L2 store in one batch, and each shard's
+        lock is taken once for all the platforms it holds.
+        
+        Returns:
+            platform -> (entry, is_stale), in the order given
+        """
+        self.preload(platforms, query, pincode)
+        return self._get_many_l1(platforms, query, pincode)
+    
+    def _get_many_l1(self, platforms: List[str], query: str, pincode: str) -> Dict[str, Tuple[Optional[CacheEntry], bool]]:
+        """get_many() against memory only."""
+        keys = self._make_keys(platforms, query, pincode)
+        by_shard: Dict[int, List[str]] = {}
+        for platform, key in keys.items():
+            by_shard.setdefault(id(self._shard(key)), []).append(platform)
+        
+        found: Dict[str, Tuple[Optional[CacheEntry], bool]] = {}
+        for shard_platforms in by_shard.values():
+            shard = self._shard(keys[shard_platforms[0]])
+            with shard.lock:
+                for platform in shard_platforms:
+                    found[platform] = self._lookup(shard, keys[platform])
+        return {platform: found[platform] for platform in platforms}
+    
+    async def aget_many(self, platforms: List[str], query: str, pincode: str) -> Dict[str, Tuple[Optional[CacheEntry], bool]]:
+        """get_many() with the L2 store read off the event loop."""
+        await self.apreload(platforms, query, pincode)
+        return self._get_many_l1(platforms, query, pincode)
+    
+    def peek(self, platform: str, query: str, pincode: str) -> Optional[CacheEntry]:
+        """Get the in-memory entry (even if expired) without counting a lookup or touching eviction order."""
+        key = self._make_key(platform, query, pincode)
+        shard = self._shard(key)
+        with shard.lock:
+            return shard.entries.get(key)
+    
+    def get(self, platform: str, query: str, pincode: str) -> Tuple[Optional[List[ProductResult]], bool]:
         """
         Get cached results for a platform/query/pincode combination.
         
         Returns:
             Tuple of (results, is_stale)
-            - results: List of product dicts or None if not found/expired
+            - results: List of ProductResult or None if not found/expired
             - is_stale: True if results are stale (should revalidate in background)
         """
+        entry, is_stale = self.lookup(platform, query, pincode)
+        return (entry.data if entry else None), is_stale
+    
+    def get_frame(self, platform: str, query: str, pincode: str) -> Tuple[Optional[bytes], bool]:
+        """
+        Get the encoded cached-result SSE frame ("event: platform") for an entry.
+        
+        The frame is encoded on first use and kept on the entry, so repeat
+        hits are a dictionary lookup.
+        
+        Returns:
+            Tuple of (frame, is_stale) - frame is None if not found/expired
+        """
+        entry, is_stale = self.lookup(platform, query, pincode)
+        if entry is None:
+            return None, False
+        return self.frame_for(entry, is_stale), is_stale
+    
+    def frame_for(self, entry: CacheEntry, is_stale: bool) -> bytes:
+        """The cached-result SSE frame of an entry returned by a lookup."""
+        frame = entry.frames.get(is_stale)
+        if frame is None:
+            # Spliced from the stored JSON - the results are never decoded
+            frame = sse_results_event("platform", entry.platform, entry.results_json, entry.count, {
+                "cached": True,
+                "stale": is_stale or entry.fallback,
+                "outcome": entry.outcome.value,
+            })
+            key = (entry.platform, entry.query, entry.pincode)
+            shard = self._shard(key)
+            with shard.lock:
+                if shard.entries.get(key) is entry:
+                    entry.frames[is_stale] = frame
+                    shard.add_frame(entry, len(frame))
+        return frame
+    
+    def _usable_fallback(self, entry: CacheEntry) -> bool:
+        """Check if an entry holds good data still inside the stale-if-error window."""
+        return entry.count > 0 and time.monotonic() - entry.good_at <= self.STALE_IF_ERROR
+    
+    def set(
+        self,
+        platform: str,
+        query: str,
+        pincode: str,
+        results: List[ProductResult],
+        outcome: ScrapeOutcome = ScrapeOutcome.OK,
+    ) -> CacheEntry:
+        """
+        Cache the outcome of a scrape for a platform/query/pincode combination.
+        
+        Results with outcome OK get the platform TTL (or the learned one, with
+        adaptive_ttl). EMPTY, TIMEOUT, BLOCKED
+        and ERROR get short negative TTLs; the last good data for the key (if
+        inside the stale-if-error window) is kept and served as stale instead
+        of an empty list. That includes EMPTY: browser scrapers report a crash
+        or a bot wall as an empty page, so no results where there were some
+        is treated as a failure until the window has passed.
+        """
+        return self.set_many([(platform, query, pincode, results, outcome)])[0]
+    
+    def set_many(self, items: Iterable[Tuple[str, str, str, List[ProductResult], ScrapeOutcome]]) -> List[CacheEntry]:
+        """
+        Cache several scrape outcomes, as set() does for one.
+        
+        Items are (platform, query, pincode, results, outcome). Entries are
+        encoded outside any lock, and each shard's lock is taken once for all
+        the entries it receives.
+        
+        Returns:
+            The new entries, in item order
+        """
+        prepared = []
+        for platform, query, pincode, results, outcome in items:
+            key = self._make_key(platform, query, pincode)
+            if outcome is ScrapeOutcome.OK and not results:
+                outcome = ScrapeOutcome.EMPTY
+            ttl = self._get_ttl(platform, outcome)
+            if self.adaptive_ttl is not None and outcome is ScrapeOutcome.OK:
+                ttl = self.adaptive_ttl.observe(platform, key[1], key[2], results, ttl)
+            prepared.append((key, results, outcome, ttl))
+        
+        by_shard: Dict[int, List[int]] = {}
+        for index, (key, _, _, _) in enumerate(prepared):
+            by_shard.setdefault(id(self._shard(key)), []).append(index)
+        
+        entries: List[Optional[CacheEntry]] = [None] * len(prepared)
+        for indexes in by_shard.values():
+            shard = self._shard(prepared[indexes[0]][0])
+            with shard.lock:
+                for index in indexes:
+                    entries[index] = self._commit(shard, *prepared[index])
+        
+        # Only good results are persisted; negative entries are short-lived and per process
+        if self.store is not None:
+            for (key, results, outcome, ttl), entry in zip(prepared, entries):
+                if outcome is ScrapeOutcome.OK:
+                    self.store.set(self._store_key(key), results, entry.created_at, ttl, *key)
+        
+        return entries
+    
+    async def aset_many(self, items: Iterable[Tuple[str, str, str, List[ProductResult], ScrapeOutcome]]) -> List[CacheEntry]:
+        """set_many() with the L2 store writes in a worker thread, off the event loop."""
+        if self.store is None:
+            return self.set_many(items)
+        return await asyncio.to_thread(self.set_many, list(items))
+    
+    def _commit(
+        self,
+        shard: CacheShard,
+        key: CacheKey,
+        results: List[ProductResult],
+        outcome: ScrapeOutcome,
+        ttl: float,
+    ) -> CacheEntry:
+        """Replace a key's entry with a scrape outcome (shard lock held)."""
+        platform, query, location = key
+        now = time.monotonic()
+        good_at, fallback = now, False
+        payload, products = self._split(results)
+        count = len(results)
+        
+        if outcome is not ScrapeOutcome.OK:
+            previous = shard.entries.get(key)
+            if previous is not None and self._usable_fallback(previous):
+                if products:
+                    self.catalog.release(products)
+                payload, count, products = previous.payload, previous.count, previous.products
+                if products:
+                    self.catalog.retain(products)
+                good_at, fallback = previous.good_at, True
+                shard.stats["fallbacks"] += 1
+        if outcome is not ScrapeOutcome.OK:
+            shard.stats["negative_sets"] += 1
+        
+        entry = self._new_entry(
+            payload,
+            count,
+            products,
+            timestamp=now,
+            created_at=time.time(),
+            ttl=ttl,
+            platform=platform,
+            query=query,
+            pincode=location,
+            outcome=outcome,
+            good_at=good_at,
+            fallback=fallback,
+        )
+        shard.remove(key)
+        shard.evict_if_needed(entry.size)
+        shard.insert(key, entry)
+        return entry
+    
+    def reprice(self, platform: str, query: str, pincode: str, prices: Dict[str, PriceRecord]) -> Optional[CacheEntry]:
+        """
+        Refresh an entry from price records (by product URL) instead of a full scrape.
+        
+        Results whose URL is in `prices` take its price, discount and
+        availability; the rest keep theirs. The entry is rewritten as a fresh
+        OK scrape (new TTL, generation and L2 copy). With a catalog only the
+        volatile payload is rebuilt - the product metadata is reused as is.
+        
+        Returns:
+            The new entry, or None if there is no good entry to reprice
+        """
         key = self._make_key(platform, query, pincode)
+        shard = self._shard(key)
+        with shard.lock:
+            previous = shard.entries.get(key)
+            if previous is None or previous.is_negative or previous.fallback:
+                return None
+            results = previous.data
+        entry = self.set(platform, query, pincode, apply_prices(results, prices))
+        entry.repriced = previous.repriced + 1
+        with shard.lock:
+            shard.stats["reprices"] += 1
+        return entry
+    
+    async def areprice(self, platform: str, query: str, pincode: str, prices: Dict[str, PriceRecord]) -> Optional[CacheEntry]:
+        """reprice() with the L2 store write in a worker thread, off the event loop."""
+        if self.store is None:
+            return self.reprice(platform, query, pincode, prices)
+        return await asyncio.to_thread(self.reprice, platform, query, pincode, prices)
+    
+    def get_response(self, query: str, pincode: str, version: str) -> Optional[bytes]:
+        """
+        Get an assembled response body for a query.
         
-        with self._lock:
-            if key not in self._cache:
-                self._stats["misses"] += 1
-                return None, False
-            
-            entry = self._cache[key]
-            
-            # Check if expired
-            if entry.is_expired:
-                del self._cache[key]
-                self._stats["misses"] += 1
-                return None, False
-            
-            # Move to end (most recently used)
-            self._cache.move_to_end(key)
-            entry.hits += 1
+        The body is only returned while every component entry it was built
+        from is still cached, unexpired and unchanged (same generation). Once
+        any component is stale it is treated as a miss, so the caller takes the
+        per-platform path and schedules the refresh.
+        """
+        response_key = (self._normalize_query(query), pincode, version)
+        
+        with self._responses_lock:
+            cached = self._responses.get(response_key)
+            if cached is None:
+                self._response_stats["response_misses"] += 1
+                return None
             
-            is_stale = entry.is_stale
-            if is_stale:
-                self._stats["stale_hits"] += 1
-            else:
-                self._stats["hits"] += 1
+            body, components = cached
+            for key, generation in components.items():
+                # A lock-free dict read: the entry is only compared, never mutated
+                entry = self._shard(key).entries.get(key)
+                if entry is None or entry.generation != generation or entry.is_expired:
+                    del self._responses[response_key]
+                    self._response_bytes -= len(body)
+                    self._response_stats["response_misses"] += 1
+                    return None
+                if entry.is_stale:
+                    self._response_stats["response_misses"] += 1
+                    return None
             
-            return entry.data, is_stale
+            self._responses.move_to_end(response_key)
+            self._response_stats["response_hits"] += 1
+            return body
     
-    def set(self, platform: str, query: str, pincode: str, results: List[Dict]):
-        """Cache results for a platform/query/pincode combination."""
-        key = self._make_key(platform, query, pincode)
-        ttl = self._get_ttl(platform)
+    def set_response(self, query: str, pincode: str, version: str, body: bytes, components: Dict[str, int]):
+        """
+        Cache an assembled response body.
         
-        with self._lock:
-            self._evict_if_needed()
-            
-            self._cache[key] = CacheEntry(
-                data=results,
-                timestamp=time.time(),
-                ttl=ttl
-            )
-            # Move to end (most recently used)
-            self._cache.move_to_end(key)
+        Args:
+            components: platform -> generation of the cache entry each
+                platform's results were taken from
+        """
+        response_key = (self._normalize_query(query), pincode, version)
+        component_keys = {
+            self._make_key(platform, query, pincode): generation
+            for platform, generation in components.items()
+        }
+        
+        with self._responses_lock:
+            previous = self._responses.pop(response_key, None)
+            if previous is not None:
+                self._response_bytes -= len(previous[0])
+            while len(self._responses) >= self.max_responses:
+                _, (evicted, _) = self._responses.popitem(last=False)
+                self._response_bytes -= len(evicted)
+            self._responses[response_key] = (body, component_keys)
+            self._response_bytes += len(body)
     
     def invalidate(self, platform: str, query: str, pincode: str):
         """Invalidate a specific cache entry."""
         key = self._make_key(platform, query, pincode)
+        shard = self._shard(key)
         
-        with self._lock:
-            if key in self._cache:
-                del self._cache[key]
+        with shard.lock:
+            shard.remove(key)
+        
+        if self.store is not None:
+            self.store.delete(self._store_key(key))
     
-    def invalidate_platform(self, platform: str):
+    def invalidate_where(
+        self,
+        platform: Optional[str] = None,
+        pincode: Optional[str] = None,
+        query: Optional[str] = None,
+    ) -> int:
+        """
+        Invalidate every entry matching all of the given fields.
+        
+        Uses each shard's secondary indexes, so the cost is proportional to
+        the number of matching entries (plus the shard count) rather than the
+        size of the cache. A pincode also matches the zone and national
+        entries it is served from.
+        
+        Returns:
+            Number of entries removed
+        """
+        if (platform, pincode, query) == (None, None, None):
+            return 0
+        
+        locations: List[Optional[str]] = [None]
+        if pincode is not None:
+            locations = (
+                [self.key_scopes.location(platform, pincode)] if platform is not None
+                else self.key_scopes.locations_serving(pincode)
+            )
+        normalized = self._normalize_query(query) if query is not None else None
+        
+        if self.store is not None:
+            for location in locations:
+                self.store.delete_where(platform=platform, pincode=location, query=normalized)
+        
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                selections = []
+                if platform is not None:
+                    selections.append(shard.by_platform.get(platform, set()))
+                if pincode is not None:
+                    selections.append(set().union(*(shard.by_pincode.get(location, ()) for location in locations)))
+                if normalized is not None:
+                    selections.append(shard.by_query.get(normalized, set()))
+                
+                keys = set.intersection(*sorted(selections, key=len))
+                for key in keys:
+                    shard.remove(key)
+                removed += len(keys)
+        return removed
+    
+    def invalidate_platform(self, platform: str) -> int:
         """Invalidate all entries for a specific platform."""
-        with self._lock:
-            keys_to_delete = [
-                key for key, entry in self._cache.items()
-                # We can't easily reverse the hash, so we'll need to store platform in entry
-            ]
-            # Note: This is a simplified version - in production, 
-            # you'd want to store platform in the entry for efficient invalidation
+        return self.invalidate_where(platform=platform)
+    
+    def invalidate_pincode(self, pincode: str) -> int:
+        """Invalidate all entries serving a specific pincode (including zone and national ones)."""
+        return self.invalidate_where(pincode=pincode)
+    
+    def invalidate_query(self, query: str) -> int:
+        """Invalidate all entries for a specific query (every platform and pincode)."""
+        return self.invalidate_where(query=query)
     
     def clear(self):
-        """Clear all cache entries."""
-        with self._lock:
-            self._cache.clear()
-            self._stats = {
-                "hits": 0,
-                "misses": 0,
-                "stale_hits": 0,
-                "evictions": 0,
-            }
+        """Clear all cache entries (including the L2 store)."""
+        if self.store is not None:
+            self.store.clear()
+        
+        for shard in self._shards:
+            with shard.lock:
+                shard.clear()
+        with self._responses_lock:
+            self._responses.clear()
+            self._response_bytes = 0
+            self._response_stats = {"response_hits": 0, "response_misses": 0}
     
     def get_stats(self) -> Dict[str, Any]:
-        """Get cache statistics."""
-        with self._lock:
-            total_requests = self._stats["hits"] + self._stats["misses"] + self._stats["stale_hits"]
-            hit_rate = (self._stats["hits"] + self._stats["stale_hits"]) / total_requests if total_requests > 0 else 0
-            
-            # Calculate cache size and entry ages
-            entries = []
-            current_time = time.time()
-            for key, entry in self._cache.items():
-                entries.append({
-                    "age_seconds": round(current_time - entry.timestamp, 1),
-                    "hits": entry.hits,
-                    "is_stale": entry.is_stale,
-                    "ttl_remaining": round(entry.ttl - (current_time - entry.timestamp), 1)
-                })
-            
-            return {
-                "entries": len(self._cache),
-                "max_entries": self.max_entries,
-                "hits": self._stats["hits"],
-                "misses": self._stats["misses"],
-                "stale_hits": self._stats["stale_hits"],
-                "evictions": self._stats["evictions"],
-                "hit_rate": round(hit_rate * 100, 1),
-                "quick_commerce_ttl": self.QUICK_COMMERCE_TTL,
-                "ecommerce_ttl": self.ECOMMERCE_TTL,
+        """
+        Get cache statistics.
+        
+        Everything is read from incrementally maintained counters, merged
+        over the shards, so each shard's lock is held for O(platforms) work
+        however many entries are cached.
+        """
+        counters = dict.fromkeys(self._shards[0].stats, 0)
+        platform_counters: Dict[str, Dict[str, int]] = {}
+        platform_entries: Dict[str, int] = {}
+        platform_bytes: Dict[str, int] = {}
+        platform_hit_ages: Dict[str, Histogram] = {}
+        hit_ages, ttls = Histogram(), Histogram()
+        entries = memory_bytes = negative_entries = 0
+        pincodes: Set[str] = set()
+        queries: Set[str] = set()
+        policy_stats = []
+        
+        for shard in self._shards:
+            with shard.lock:
+                for name, value in shard.stats.items():
+                    counters[name] += value
+                for platform, shard_counters in shard.platform_stats.items():
+                    merged = platform_counters.setdefault(platform, dict.fromkeys(self.PLATFORM_COUNTERS, 0))
+                    for name, value in shard_counters.items():
+                        merged[name] += value
+                for platform, keys in shard.by_platform.items():
+                    platform_entries[platform] = platform_entries.get(platform, 0) + len(keys)
+                for platform, size in shard.platform_bytes.items():
+                    platform_bytes[platform] = platform_bytes.get(platform, 0) + size
+                for platform, histogram in shard.platform_hit_ages.items():
+                    platform_hit_ages.setdefault(platform, Histogram()).update(histogram)
+                hit_ages.update(shard.hit_ages)
+                ttls.update(shard.ttls)
+                entries += len(shard.entries)
+                memory_bytes += shard.bytes
+                negative_entries += shard.negative_entries
+                pincodes.update(shard.by_pincode)
+                queries.update(shard.by_query)
+                policy_stats.append(shard.policy.get_stats())
+        
+        total_requests = counters["hits"] + counters["misses"] + counters["stale_hits"]
+        hit_rate = (counters["hits"] + counters["stale_hits"]) / total_requests if total_requests > 0 else 0
+        
+        platforms = {}
+        for platform in platform_entries.keys() | platform_counters.keys():
+            platform_stats = platform_counters.get(platform) or dict.fromkeys(self.PLATFORM_COUNTERS, 0)
+            lookups = platform_stats["hits"] + platform_stats["stale_hits"] + platform_stats["misses"]
+            histogram = platform_hit_ages.get(platform)
+            platforms[platform] = {
+                "entries": platform_entries.get(platform, 0),
+                "memory_bytes": platform_bytes.get(platform, 0),
+                **platform_stats,
+                "hit_rate": round((lookups - platform_stats["misses"]) / lookups * 100, 1) if lookups else 0,
+                "hit_age": histogram.to_dict() if histogram is not None else None,
             }
+        
+        with self._responses_lock:
+            responses = len(self._responses)
+            response_bytes = self._response_bytes
+            response_stats = dict(self._response_stats)
+        
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "memory_bytes": memory_bytes,
+            "max_bytes": self.max_bytes,
+            "shards": len(self._shards),
+            "compressed": self.compress,
+            "eviction_policy": _merge_policy_stats(policy_stats),
+            "response_bytes": response_bytes,
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "stale_hits": counters["stale_hits"],
+            "evictions": counters["evictions"],
+            "expirations": counters["expirations"],
+            "hit_rate": round(hit_rate * 100, 1),
+            "hit_age": hit_ages.to_dict(),
+            "ttls": ttls.to_dict(),
+            "negative_entries": negative_entries,
+            "platforms": platforms,
+            "pincodes": len(pincodes),
+            "key_scopes": self.key_scopes.get_stats(),
+            "queries": len(queries),
+            "responses": responses,
+            **response_stats,
+            "negative_sets": counters["negative_sets"],
+            "fallbacks": counters["fallbacks"],
+            "prefetch_hits": counters["prefetch_hits"],
+            "reprices": counters["reprices"],
+            "quick_commerce_ttl": self.QUICK_COMMERCE_TTL,
+            "ecommerce_ttl": self.ECOMMERCE_TTL,
+            "adaptive_ttl": self.adaptive_ttl.get_stats() if self.adaptive_ttl is not None else None,
+            "catalog": self.catalog.get_stats() if self.catalog is not None else None,
+            "l2": self.store.get_stats() if self.store is not None else None,
+        }
 
 
 # Global cache instance
-cache = CacheManager(max_entries=500)
-
+cache = CacheManager(
+    max_entries=None,
+    max_bytes=int(os.environ.get("PRICEHUNT_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+    compress=os.environ.get("PRICEHUNT_CACHE_COMPRESS", "").lower() in ("1", "true", "yes"),
+    policy=os.environ.get("PRICEHUNT_CACHE_POLICY", "w-tinylfu"),
+    key_scopes=default_key_scopes(stores=store_map),
+    adaptive_ttl=AdaptiveTTL(
+        min_ttl=float(os.environ.get("PRICEHUNT_TTL_MIN", 60)),
+        max_ttl=float(os.environ.get("PRICEHUNT_TTL_MAX", 2 * 3600)),
+    ) if os.environ.get("PRICEHUNT_ADAPTIVE_TTL", "1").lower() in ("1", "true", "yes") else None,
+    catalog=ProductCatalog() if os.environ.get("PRICEHUNT_PRODUCT_CATALOG", "1").lower() in ("1", "true", "yes") else None,
+    shards=int(os.environ.get("PRICEHUNT_CACHE_SHARDS", 1)),
+    store=create_store(),
+)
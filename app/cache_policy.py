@@ -0,0 +1,218 @@
+"""
+Eviction / admission policies for CacheManager.
+
+- LRUPolicy: plain least-recently-used order (the original behaviour).
+- WTinyLFUPolicy: W-TinyLFU. New keys enter a small LRU window; keys leaving
+  the window must beat the main segment's LRU victim on estimated access
+  frequency (count-min sketch) to stay, so a burst of one-off keys (e.g. a
+  50-item bulk search) cannot flush the popular ones. The main segment is a
+  segmented LRU (probation + protected).
+
+Policies only track keys; CacheManager owns the entries and decides when to
+evict (entry cap or byte budget) by asking the policy for a victim.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List
+
+
+class LRUPolicy:
+    """Least-recently-used eviction order."""
+    
+    name = "lru"
+    
+    def __init__(self):
+        self._order: "OrderedDict[Hashable, None]" = OrderedDict()
+    
+    def on_insert(self, key: Hashable):
+        """Track a newly stored key."""
+        self._order[key] = None
+    
+    def on_access(self, key: Hashable):
+        """Record a hit."""
+        self._order.move_to_end(key)
+    
+    def on_remove(self, key: Hashable):
+        """Stop tracking a key."""
+        self._order.pop(key, None)
+    
+    def select_victim(self) -> Hashable:
+        """Key to evict next."""
+        return next(iter(self._order))
+    
+    def clear(self):
+        """Forget every key."""
+        self._order.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get policy statistics."""
+        return {"policy": self.name}
+
+
+class CountMinSketch:
+    """
+    Approximate frequency counter with periodic aging.
+    
+    depth rows of `width` small counters (capped at 15). After
+    sample_size increments every counter is halved, so estimates follow
+    recent popularity.
+    """
+    
+    SEEDS = (0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D, 0x27D4EB2F)
+    MAX_COUNT = 15
+    
+    def __init__(self, width: int = 4096, sample_factor: int = 10):
+        """Initialize with `width` counters per row (rounded up to a power of two)."""
+        self.width = 1 << max(width - 1, 1).bit_length()
+        self._mask = self.width - 1
+        self._rows: List[bytearray] = [bytearray(self.width) for _ in self.SEEDS]
+        self.sample_size = self.width * sample_factor
+        self._additions = 0
+        self.resets = 0
+    
+    def _indexes(self, key: Hashable):
+        h = hash(key)
+        return [((h ^ seed) * 0x01000193 >> (8 * i)) & self._mask for i, seed in enumerate(self.SEEDS)]
+    
+    def increment(self, key: Hashable):
+        """Count one access to key."""
+        for row, index in zip(self._rows, self._indexes(key)):
+            if row[index] < self.MAX_COUNT:
+                row[index] += 1
+        self._additions += 1
+        if self._additions >= self.sample_size:
+            self._age()
+    
+    def estimate(self, key: Hashable) -> int:
+        """Estimated recent access count for key."""
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+    
+    def _age(self):
+        """Halve every counter."""
+        for row in self._rows:
+            for index in range(self.width):
+                row[index] >>= 1
+        self._additions //= 2
+        self.resets += 1
+
+
+class WTinyLFUPolicy:
+    """
+    W-TinyLFU admission and eviction.
+    
+    Features:
+    - Window LRU (window_fraction of tracked keys) that admits every new key
+    - Segmented main LRU: probation, and protected (protected_fraction of main)
+    - Frequency-based admission between the window's candidate and main's victim
+    - Admission, rejection and per-segment eviction counters
+    """
+    
+    name = "w-tinylfu"
+    
+    def __init__(self, window_fraction: float = 0.01, protected_fraction: float = 0.8, sketch_width: int = 4096):
+        """Initialize empty segments and sketch."""
+        self.window_fraction = window_fraction
+        self.protected_fraction = protected_fraction
+        self.sketch = CountMinSketch(sketch_width)
+        self._window: "OrderedDict[Hashable, None]" = OrderedDict()
+        self._probation: "OrderedDict[Hashable, None]" = OrderedDict()
+        self._protected: "OrderedDict[Hashable, None]" = OrderedDict()
+        self._stats = {
+            "admitted": 0,
+            "rejected": 0,
+            "window_evictions": 0,
+            "main_evictions": 0,
+        }
+    
+    def _size(self) -> int:
+        return len(self._window) + len(self._probation) + len(self._protected)
+    
+    def on_insert(self, key: Hashable):
+        """New keys always enter the window; its overflow moves to probation."""
+        self.sketch.increment(key)
+        self._window[key] = None
+        window_cap = max(1, int(self._size() * self.window_fraction))
+        while len(self._window) > window_cap:
+            moved, _ = self._window.popitem(last=False)
+            self._probation[moved] = None
+    
+    def on_access(self, key: Hashable):
+        """Count the hit and promote probation keys to protected."""
+        self.sketch.increment(key)
+        if key in self._window:
+            self._window.move_to_end(key)
+        elif key in self._probation:
+            del self._probation[key]
+            self._protected[key] = None
+            protected_cap = max(1, int((len(self._probation) + len(self._protected)) * self.protected_fraction))
+            while len(self._protected) > protected_cap:
+                demoted, _ = self._protected.popitem(last=False)
+                self._probation[demoted] = None
+        elif key in self._protected:
+            self._protected.move_to_end(key)
+    
+    def on_remove(self, key: Hashable):
+        """Stop tracking a key (frequency history stays in the sketch)."""
+        self._window.pop(key, None)
+        self._probation.pop(key, None)
+        self._protected.pop(key, None)
+    
+    def select_victim(self) -> Hashable:
+        """
+        Key to evict next.
+        
+        The window's oldest key (candidate) contends with main's oldest
+        (victim); the less frequently used one is evicted.
+        """
+        main = self._probation or self._protected
+        if not self._window:
+            self._stats["main_evictions"] += 1
+            return next(iter(main))
+        candidate = next(iter(self._window))
+        if not main:
+            self._stats["window_evictions"] += 1
+            return candidate
+        
+        victim = next(iter(main))
+        if self.sketch.estimate(candidate) > self.sketch.estimate(victim):
+            # Candidate wins: it moves to probation and the victim goes
+            del self._window[candidate]
+            self._probation[candidate] = None
+            self._stats["admitted"] += 1
+            self._stats["main_evictions"] += 1
+            return victim
+        
+        self._stats["rejected"] += 1
+        self._stats["window_evictions"] += 1
+        return candidate
+    
+    def clear(self):
+        """Forget every key (the sketch is kept)."""
+        self._window.clear()
+        self._probation.clear()
+        self._protected.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get policy statistics."""
+        contests = self._stats["admitted"] + self._stats["rejected"]
+        return {
+            "policy": self.name,
+            "window": len(self._window),
+            "probation": len(self._probation),
+            "protected": len(self._protected),
+            **self._stats,
+            "admission_rate": round(self._stats["admitted"] / contests * 100, 1) if contests else 0,
+            "sketch_resets": self.sketch.resets,
+        }
+
+
+POLICIES = {
+    LRUPolicy.name: LRUPolicy,
+    WTinyLFUPolicy.name: WTinyLFUPolicy,
+}
+
+
+def make_policy(name: str):
+    """Create a policy by name ("lru" or "w-tinylfu")."""
+    if name not in POLICIES:
+        raise ValueError(f"Unknown cache policy {name!r}, expected one of {list(POLICIES)}")
+    return POLICIES[name]()
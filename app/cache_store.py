@@ -0,0 +1,527 @@
+"""
+Second cache tiers behind the in-memory CacheManager.
+
+Every tier implements CacheBackend and stores compact (JSON + zlib) copies of
+cache entries:
+- SQLiteStore: SQLite database in WAL mode, so a restarted process comes up
+  warm. Writes, deletes and expiry sweeps are queued and applied in batches by
+  a background writer thread, off the event loop.
+- SharedMemoryStore: SQLiteStore on /dev/shm, shared by every worker process
+  on one host.
+- RedisStore: Redis (or any Redis-protocol server), shared by workers across
+  hosts. Multi-key reads are a single pipelined round trip.
+
+create_store() builds the tier selected by environment variables:
+    PRICEHUNT_CACHE_BACKEND=sqlite|shm|redis
+    PRICEHUNT_CACHE_DB=<path>          (sqlite; setting it alone selects sqlite)
+    PRICEHUNT_REDIS_URL=redis://...    (redis; setting it alone selects redis)
+"""
+import atexit
+from abc import ABC, abstractmethod
+import json
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from app.encoding import dumps
+from app.scrapers.base import ProductResult
+
+
+def encode_results(results: List[ProductResult]) -> bytes:
+    """Serialise results to compressed JSON."""
+    return zlib.compress(dumps(results), 1)
+
+
+def decode_results(payload: bytes) -> List[ProductResult]:
+    """Inverse of encode_results."""
+    return [ProductResult(**row) for row in json.loads(zlib.decompress(payload))]
+
+
+def redact_url(url: str) -> str:
+    """A connection URL reduced to scheme, host, port and database - no credentials or options."""
+    parts = urlsplit(url)
+    host = parts.netloc.rsplit("@", 1)[-1]
+    return f"{parts.scheme}://{host}{parts.path}"
+
+
+# (results, created_at, ttl, platform, query, pincode)
+StoredEntry = Tuple[List[ProductResult], float, float, str, str, str]
+
+
+class CacheBackend(ABC):
+    """
+    Interface for a second cache tier.
+    
+    Keys are the CacheManager's cache keys. Timestamps are wall-clock
+    (time.time()) so they stay meaningful across processes and restarts.
+    """
+    
+    name = "base"
+    
+    @abstractmethod
+    def get_many(self, keys: Sequence[str]) -> List[Optional[StoredEntry]]:
+        """Read unexpired entries, one result (or None) per key."""
+        pass
+    
+    def get(self, key: str) -> Optional[StoredEntry]:
+        """Read a single unexpired entry."""
+        return self.get_many([key])[0]
+    
+    @abstractmethod
+    def set(self, key: str, results: List[ProductResult], created_at: float, ttl: float,
+            platform: str, query: str, pincode: str):
+        """Store an entry."""
+        pass
+    
+    @abstractmethod
+    def delete(self, key: str):
+        """Delete a single entry."""
+        pass
+    
+    @abstractmethod
+    def delete_where(self, platform: Optional[str] = None, pincode: Optional[str] = None,
+                     query: Optional[str] = None):
+        """Delete every entry matching all given fields."""
+        pass
+    
+    @abstractmethod
+    def clear(self):
+        """Delete every entry."""
+        pass
+    
+    def flush(self, timeout: float = 5.0):
+        """Block until pending writes are visible to readers."""
+    
+    def close(self):
+        """Release connections and background threads."""
+    
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tier statistics."""
+        pass
+
+
+class SQLiteStore(CacheBackend):
+    """
+    SQLite-backed L2 cache tier.
+    
+    Features:
+    - WAL mode, so reads never wait for the writer
+    - Write-behind: set/delete calls are queued and flushed in batches
+    - Periodic sweep of expired rows
+    - Hit/miss/write statistics; the row count is maintained by the writer,
+      so get_stats never scans the table
+    """
+    
+    FLUSH_INTERVAL = 0.5    # seconds between write batches
+    BATCH_SIZE = 200        # max queued operations per transaction
+    SWEEP_INTERVAL = 60.0   # seconds between expired-row sweeps
+    
+    name = "sqlite"
+    
+    def __init__(self, path: str):
+        """Open (or create) the database and start the writer thread."""
+        self.path = path
+        self._queue: "queue.Queue[Tuple[str, Any]]" = queue.Queue()
+        self._read_lock = threading.Lock()
+        self._reader = self._connect()
+        self._reader.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                platform TEXT NOT NULL,
+                query TEXT NOT NULL,
+                pincode TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                ttl REAL NOT NULL,
+                payload BLOB NOT NULL
+            )
+        """)
+        self._reader.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries (expires_at)")
+        self._reader.execute("CREATE INDEX IF NOT EXISTS idx_cache_platform ON cache_entries (platform)")
+        self._reader.execute("CREATE INDEX IF NOT EXISTS idx_cache_pincode ON cache_entries (pincode)")
+        self._reader.execute("CREATE INDEX IF NOT EXISTS idx_cache_query ON cache_entries (query)")
+        self._rows = self._reader.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "deletes": 0,
+            "batches": 0,
+            "swept": 0,
+            "errors": 0,
+        }
+        
+        self._closed = threading.Event()
+        self._writer = threading.Thread(target=self._run_writer, name="cache-store-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    def get_many(self, keys: Sequence[str]) -> List[Optional[StoredEntry]]:
+        """Read unexpired entries with one query, one result (or None) per key."""
+        if not keys:
+            return []
+        
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT key, payload, created_at, ttl, platform, query, pincode FROM cache_entries "
+                f"WHERE key IN ({','.join('?' * len(keys))}) AND expires_at > ?",
+                (*keys, time.time()),
+            ).fetchall()
+        
+        found = {
+            key: (decode_results(payload), created_at, ttl, platform, query, pincode)
+            for key, payload, created_at, ttl, platform, query, pincode in rows
+        }
+        self._stats["hits"] += len(found)
+        self._stats["misses"] += len(keys) - len(found)
+        return [found.get(key) for key in keys]
+    
+    def set(self, key: str, results: List[ProductResult], created_at: float, ttl: float,
+            platform: str, query: str, pincode: str):
+        """Queue an entry for writing."""
+        row = (key, platform, query, pincode, created_at, created_at + ttl, ttl, encode_results(results))
+        self._queue.put(("set", row))
+    
+    def delete(self, key: str):
+        """Queue a single-entry delete."""
+        self._queue.put(("delete", key))
+    
+    def delete_where(self, platform: Optional[str] = None, pincode: Optional[str] = None,
+                     query: Optional[str] = None):
+        """Queue a delete of every row matching all given fields."""
+        self._queue.put(("delete_where", (platform, pincode, query)))
+    
+    def clear(self):
+        """Queue a delete of every row."""
+        self._queue.put(("clear", None))
+    
+    def flush(self, timeout: float = 5.0):
+        """Block until everything queued so far has been written."""
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        done.wait(timeout)
+    
+    def _run_writer(self):
+        """Writer thread: apply queued operations in batches and sweep expired rows."""
+        conn = self._connect()
+        last_sweep = float("-inf")
+        
+        while not self._closed.is_set() or not self._queue.empty():
+            try:
+                ops = [self._queue.get(timeout=self.FLUSH_INTERVAL)]
+            except queue.Empty:
+                ops = []
+            while ops and len(ops) < self.BATCH_SIZE:
+                try:
+                    ops.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            if ops:
+                self._apply(conn, ops)
+            
+            if time.monotonic() - last_sweep >= self.SWEEP_INTERVAL:
+                last_sweep = time.monotonic()
+                try:
+                    cursor = conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+                    self._stats["swept"] += cursor.rowcount
+                    # Resync with rows written by other processes sharing the file
+                    self._rows = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+                except sqlite3.Error as e:
+                    self._stats["errors"] += 1
+                    print(f"Cache store sweep error: {e}")
+        
+        conn.close()
+    
+    def _apply(self, conn: sqlite3.Connection, ops: List[Tuple[str, Any]]):
+        """Apply a batch of queued operations in one transaction."""
+        waiters = []
+        rows = self._rows
+        try:
+            conn.execute("BEGIN")
+            for op, arg in ops:
+                if op == "set":
+                    if conn.execute("SELECT 1 FROM cache_entries WHERE key = ?", (arg[0],)).fetchone() is None:
+                        rows += 1
+                    conn.execute("INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", arg)
+                    self._stats["writes"] += 1
+                elif op == "delete":
+                    rows -= conn.execute("DELETE FROM cache_entries WHERE key = ?", (arg,)).rowcount
+                    self._stats["deletes"] += 1
+                elif op == "delete_where":
+                    clauses, params = [], []
+                    for column, value in zip(("platform", "pincode", "query"), arg):
+                        if value is not None:
+                            clauses.append(f"{column} = ?")
+                            params.append(value)
+                    if clauses:
+                        cursor = conn.execute(f"DELETE FROM cache_entries WHERE {' AND '.join(clauses)}", params)
+                        self._stats["deletes"] += cursor.rowcount
+                        rows -= cursor.rowcount
+                elif op == "clear":
+                    conn.execute("DELETE FROM cache_entries")
+                    rows = 0
+                elif op == "flush":
+                    waiters.append(arg)
+            conn.execute("COMMIT")
+            self._rows = rows
+            self._stats["batches"] += 1
+        except sqlite3.Error as e:
+            self._stats["errors"] += 1
+            print(f"Cache store write error: {e}")
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+        finally:
+            for waiter in waiters:
+                waiter.set()
+    
+    def close(self):
+        """Flush pending writes and stop the writer thread."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._writer.join(timeout=10)
+        with self._read_lock:
+            self._reader.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get L2 tier statistics."""
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "rows": self._rows,
+            "pending_writes": self._queue.qsize(),
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups * 100, 1) if lookups else 0,
+        }
+
+
+class SharedMemoryStore(SQLiteStore):
+    """
+    SQLiteStore kept in shared memory (/dev/shm) for single-host deployments.
+    
+    Every uvicorn worker on the host opens the same database, so a page
+    scraped by one worker is a hit for all of them. Contents do not survive
+    a reboot.
+    """
+    
+    name = "shm"
+    
+    def __init__(self, name: str = "pricehunt-cache"):
+        """Open the shared database named `name`."""
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        super().__init__(os.path.join(directory, f"{name}.sqlite3"))
+
+
+class RedisStore(CacheBackend):
+    """
+    Redis-backed cache tier shared by every worker process.
+    
+    Features:
+    - Pipelined multi-get: all platforms of a query in one round trip
+    - Expiry handled by Redis (SET ... PX), no sweep needed
+    - Platform / pincode / query indexes for bulk invalidation: sorted sets
+      scored by entry expiry, pruned of expired members on every write and
+      expiring with their longest-lived member
+    - Errors are logged and treated as misses, so Redis outages degrade to L1 only
+    """
+    
+    name = "redis"
+    PREFIX = "pricehunt:"
+    INDEX_GRACE_MS = 60_000   # indexes outlive their last member by this much
+    
+    def __init__(self, url: str = "redis://localhost:6379/0", client: Any = None):
+        """
+        Connect to Redis.
+        
+        Args:
+            url: Redis URL (ignored when client is given)
+            client: Existing redis-py compatible client (e.g. fakeredis in tests)
+        """
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.url = redact_url(url)   # reported by get_stats(), so never with the password
+        self._client = client
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "deletes": 0,
+            "errors": 0,
+        }
+    
+    def _entry_key(self, key: str) -> str:
+        return f"{self.PREFIX}entry:{key}"
+    
+    def _index_keys(self, platform: Optional[str], pincode: Optional[str], query: Optional[str]) -> List[str]:
+        return [
+            f"{self.PREFIX}{field}:{value}"
+            for field, value in (("platform", platform), ("pincode", pincode), ("query", query))
+            if value is not None
+        ]
+    
+    def get_many(self, keys: Sequence[str]) -> List[Optional[StoredEntry]]:
+        """Read entries with a single MGET, one result (or None) per key."""
+        if not keys:
+            return []
+        
+        try:
+            payloads = self._client.mget([self._entry_key(key) for key in keys])
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"Redis cache read error: {e}")
+            payloads = [None] * len(keys)
+        
+        entries = []
+        for payload in payloads:
+            if payload is None:
+                self._stats["misses"] += 1
+                entries.append(None)
+                continue
+            record = json.loads(zlib.decompress(payload))
+            self._stats["hits"] += 1
+            entries.append((
+                [ProductResult(**row) for row in record["results"]],
+                record["created_at"],
+                record["ttl"],
+                record["platform"],
+                record["query"],
+                record["pincode"],
+            ))
+        return entries
+    
+    def set(self, key: str, results: List[ProductResult], created_at: float, ttl: float,
+            platform: str, query: str, pincode: str):
+        """Store an entry, expiring with its TTL, and add it to the indexes."""
+        now_ms = int(time.time() * 1000)
+        expires_ms = int((created_at + ttl) * 1000)
+        remaining_ms = expires_ms - now_ms
+        if remaining_ms <= 0:
+            return
+        
+        payload = zlib.compress(dumps({
+            "results": results,
+            "created_at": created_at,
+            "ttl": ttl,
+            "platform": platform,
+            "query": query,
+            "pincode": pincode,
+        }), 1)
+        
+        index_keys = self._index_keys(platform, pincode, query)
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            pipe.set(self._entry_key(key), payload, px=remaining_ms)
+            for index_key in index_keys:
+                pipe.zadd(index_key, {key: expires_ms})
+                pipe.zremrangebyscore(index_key, "-inf", now_ms)
+                pipe.zrange(index_key, -1, -1, withscores=True)
+            replies = pipe.execute()
+            
+            # Each index lives as long as its longest-lived member
+            pipe = self._client.pipeline(transaction=False)
+            for index_key, last in zip(index_keys, replies[3::3]):
+                pipe.pexpireat(index_key, int(last[0][1]) + self.INDEX_GRACE_MS if last else expires_ms)
+            pipe.execute()
+            self._stats["writes"] += 1
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"Redis cache write error: {e}")
+    
+    def delete(self, key: str):
+        """Delete a single entry."""
+        try:
+            self._stats["deletes"] += self._client.delete(self._entry_key(key))
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"Redis cache delete error: {e}")
+    
+    def delete_where(self, platform: Optional[str] = None, pincode: Optional[str] = None,
+                     query: Optional[str] = None):
+        """Delete every unexpired entry in the intersection of the matching indexes."""
+        index_keys = self._index_keys(platform, pincode, query)
+        if not index_keys:
+            return
+        
+        try:
+            now_ms = int(time.time() * 1000)
+            pipe = self._client.pipeline(transaction=False)
+            for index_key in index_keys:
+                pipe.zremrangebyscore(index_key, "-inf", now_ms)
+                pipe.zrangebyscore(index_key, now_ms, "+inf")
+            members = [
+                {k.decode() if isinstance(k, bytes) else k for k in reply}
+                for reply in pipe.execute()[1::2]
+            ]
+            keys = sorted(set.intersection(*members))
+            if keys:
+                pipe = self._client.pipeline(transaction=False)
+                pipe.delete(*[self._entry_key(key) for key in keys])
+                for index_key in index_keys:
+                    pipe.zrem(index_key, *keys)
+                self._stats["deletes"] += pipe.execute()[0]
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"Redis cache delete error: {e}")
+    
+    def clear(self):
+        """Delete every key under this store's prefix."""
+        try:
+            keys = list(self._client.scan_iter(match=f"{self.PREFIX}*", count=500))
+            if keys:
+                self._client.delete(*keys)
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"Redis cache clear error: {e}")
+    
+    def close(self):
+        """Close the connection pool."""
+        try:
+            self._client.close()
+        except Exception:
+            pass
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tier statistics."""
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "backend": self.name,
+            "url": self.url,
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups * 100, 1) if lookups else 0,
+        }
+
+
+def create_store() -> Optional[CacheBackend]:
+    """Build the second cache tier selected by the environment, or None."""
+    db_path = os.environ.get("PRICEHUNT_CACHE_DB")
+    redis_url = os.environ.get("PRICEHUNT_REDIS_URL")
+    backend = os.environ.get("PRICEHUNT_CACHE_BACKEND") or ("redis" if redis_url else "sqlite" if db_path else None)
+    
+    if backend is None:
+        return None
+    if backend == "sqlite":
+        return SQLiteStore(db_path or "pricehunt-cache.sqlite3")
+    if backend == "shm":
+        return SharedMemoryStore()
+    if backend == "redis":
+        return RedisStore(redis_url or "redis://localhost:6379/0")
+    raise ValueError(f"Unknown cache backend {backend!r}, expected sqlite, shm or redis")
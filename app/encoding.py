@@ -0,0 +1,132 @@
+"""
+Fast JSON encoding for API responses and SSE events.
+
+Uses the fastest available backend: msgspec, then orjson, then the standard
+library json module. Both msgspec and orjson serialise ProductResult (a
+slotted dataclass) natively, so results are encoded without building dicts.
+Set PRICEHUNT_JSON_BACKEND=msgspec|orjson|json to force a backend; see
+benchmarks/bench_json.py for relative costs.
+"""
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.responses import JSONResponse
+
+from app.scrapers.base import ProductResult, to_jsonable
+
+
+def _load_orjson() -> Callable[[Any], bytes]:
+    import orjson
+    
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=to_jsonable)
+    
+    return dumps
+
+
+def _load_msgspec() -> Callable[[Any], bytes]:
+    import msgspec
+    
+    return msgspec.json.Encoder(enc_hook=to_jsonable).encode
+
+
+def _load_stdlib() -> Callable[[Any], bytes]:
+    encoder = json.JSONEncoder(default=to_jsonable, ensure_ascii=False, separators=(",", ":"))
+    
+    def dumps(obj: Any) -> bytes:
+        return encoder.encode(obj).encode()
+    
+    return dumps
+
+
+def _stdlib_results_decoder(payload: bytes) -> List[ProductResult]:
+    return [ProductResult(**row) for row in json.loads(payload)]
+
+
+def _load_results_decoder() -> Callable[[bytes], List[ProductResult]]:
+    """Decoder for JSON-encoded result lists; msgspec decodes straight into ProductResult."""
+    try:
+        import msgspec
+    except ImportError:
+        return _stdlib_results_decoder
+    return msgspec.json.Decoder(List[ProductResult]).decode
+
+
+# Backends in order of preference
+BACKENDS: Dict[str, Callable[[], Callable[[Any], bytes]]] = {
+    "msgspec": _load_msgspec,
+    "orjson": _load_orjson,
+    "json": _load_stdlib,
+}
+
+backend_name = "json"
+_dumps = _load_stdlib()
+_loads_results = _load_results_decoder()
+
+
+def set_backend(name: Optional[str] = None) -> str:
+    """
+    Select the JSON backend.
+    
+    With no name, picks the first importable backend in BACKENDS order.
+    Returns the name of the backend in use.
+    """
+    global backend_name, _dumps
+    
+    if name and name not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend {name!r}, expected one of {list(BACKENDS)}")
+    
+    candidates = [name] if name else list(BACKENDS)
+    for candidate in candidates:
+        try:
+            _dumps = BACKENDS[candidate]()
+            backend_name = candidate
+            break
+        except ImportError:
+            continue
+    
+    return backend_name
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode an object to JSON bytes with the active backend."""
+    return _dumps(obj)
+
+
+def loads_results(payload: bytes) -> List[ProductResult]:
+    """Decode a JSON list of results (as written by dumps) back into ProductResult objects."""
+    return _loads_results(payload)
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """Encode a single Server-Sent Events frame."""
+    return b"event: " + event.encode() + b"\ndata: " + _dumps(data) + b"\n\n"
+
+
+def sse_results_event(event: str, platform: str, results_json: bytes, count: int, fields: Dict[str, Any]) -> bytes:
+    """
+    Encode a platform-results SSE frame around results that are already JSON.
+    
+    The frame's data is {"platform", "results", "count", **fields}; the
+    results array is spliced in as is, never decoded or re-encoded.
+    """
+    return (
+        b"event: " + event.encode() + b'\ndata: {"platform":' + _dumps(platform)
+        + b',"results":' + results_json
+        + b',"count":' + str(count).encode()
+        + b"," + _dumps(fields)[1:] + b"\n\n"
+    )
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fast encoder.
+    
+    Return it directly from endpoints so FastAPI skips jsonable_encoder.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return _dumps(content)
+
+
+set_backend(os.environ.get("PRICEHUNT_JSON_BACKEND") or None)
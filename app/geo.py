@@ -0,0 +1,164 @@
+"""
+Pincode geography for cache keys.
+
+Regular e-commerce listings (Amazon, Flipkart, JioMart) barely change
+between pincodes of a city, so caching them per pincode scrapes the same page
+once per pincode served. Each platform gets a key scope instead:
+
+- national: one entry per query for the whole country
+- zone: one entry per city/zone (see ZONES)
+- store: one entry per serving dark store, learned per pincode
+  (app.scrapers.store_map); pincodes with no known store are keyed by pincode
+- pincode: one entry per pincode
+
+The cache and single-flight keys use the scoped location in place of the
+pincode; scrapes still run with the requesting user's pincode.
+"""
+import os
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from app.scrapers.store_map import StoreMap
+
+
+class KeyScope(str, Enum):
+    """How widely one platform's cached results are shared."""
+    NATIONAL = "national"
+    ZONE = "zone"
+    STORE = "store"
+    PINCODE = "pincode"
+
+
+# Location used for every national-scope entry
+NATIONAL_LOCATION = "IN"
+
+# Pincode prefix (sorting district) -> zone, for metros spanning several prefixes.
+# Other pincodes fall back to their 3-digit sorting district as the zone.
+ZONES = {
+    "110": "delhi-ncr", "121": "delhi-ncr", "122": "delhi-ncr", "201": "delhi-ncr",
+    "400": "mumbai", "401": "mumbai", "410": "mumbai", "421": "mumbai",
+    "560": "bengaluru", "562": "bengaluru",
+    "600": "chennai", "603": "chennai",
+    "500": "hyderabad", "501": "hyderabad", "502": "hyderabad",
+    "700": "kolkata", "711": "kolkata", "743": "kolkata",
+    "411": "pune", "412": "pune",
+    "380": "ahmedabad", "382": "ahmedabad",
+    "302": "jaipur", "303": "jaipur",
+    "226": "lucknow",
+    "160": "chandigarh", "140": "chandigarh", "134": "chandigarh",
+}
+
+# Approximate city centres, for locating a pincode whose own coordinates are unknown
+ZONE_CENTROIDS: Dict[str, Tuple[float, float]] = {
+    "delhi-ncr": (28.6139, 77.2090),
+    "mumbai": (19.0760, 72.8777),
+    "bengaluru": (12.9716, 77.5946),
+    "chennai": (13.0827, 80.2707),
+    "hyderabad": (17.3850, 78.4867),
+    "kolkata": (22.5726, 88.3639),
+    "pune": (18.5204, 73.8567),
+    "ahmedabad": (23.0225, 72.5714),
+    "jaipur": (26.9124, 75.7873),
+    "lucknow": (26.8467, 80.9462),
+    "chandigarh": (30.7333, 76.7794),
+}
+DEFAULT_COORDINATES = ZONE_CENTROIDS["bengaluru"]
+
+# E-commerce listings are shared city-wide; quick commerce per serving dark store
+DEFAULT_KEY_SCOPES = {
+    "Amazon": KeyScope.ZONE,
+    "Flipkart": KeyScope.ZONE,
+    "JioMart": KeyScope.ZONE,
+    "Zepto": KeyScope.STORE,
+    "BigBasket": KeyScope.STORE,
+    "Flipkart Minutes": KeyScope.STORE,
+    "JioMart Quick": KeyScope.STORE,
+}
+
+
+def zone_for(pincode: str) -> Optional[str]:
+    """Zone of a pincode, or None if it is not a 6-digit pincode."""
+    if len(pincode) != 6 or not pincode.isdigit():
+        return None
+    prefix = pincode[:3]
+    return ZONES.get(prefix, prefix)
+
+
+def parse_scopes(spec: str) -> Dict[str, KeyScope]:
+    """Parse "Amazon=national,Flipkart=zone" into a platform -> scope mapping."""
+    scopes = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        platform, _, scope = item.partition("=")
+        scopes[platform.strip()] = KeyScope(scope.strip().lower())
+    return scopes
+
+
+class KeyScopePolicy:
+    """
+    Per-platform key scope.
+    
+    Features:
+    - location(): the string that stands in for the pincode in cache keys
+    - locations_serving(): every location whose entries a pincode can be served
+      from, for pincode invalidation
+    - Platforms without a configured scope use `default`
+    - Store scope resolves through a StoreMap; without one it acts as pincode scope
+    """
+    
+    def __init__(
+        self,
+        scopes: Optional[Dict[str, KeyScope]] = None,
+        default: KeyScope = KeyScope.PINCODE,
+        stores: Optional["StoreMap"] = None,
+    ):
+        """Initialize with platform -> scope overrides and the store map for store scope."""
+        self.scopes = dict(scopes or {})
+        self.default = default
+        self.stores = stores
+    
+    def scope(self, platform: str) -> KeyScope:
+        """Key scope of a platform."""
+        return self.scopes.get(platform, self.default)
+    
+    def location(self, platform: str, pincode: str) -> str:
+        """Cache location of a platform's results for a pincode."""
+        scope = self.scope(platform)
+        if scope is KeyScope.NATIONAL:
+            return NATIONAL_LOCATION
+        if scope is KeyScope.ZONE:
+            zone = zone_for(pincode)
+            if zone is not None:
+                return f"zone:{zone}"
+        if scope is KeyScope.STORE and self.stores is not None:
+            location = self.stores.location(platform, pincode)
+            if location is not None:
+                return location
+        return pincode
+    
+    def locations_serving(self, pincode: str) -> List[str]:
+        """Every location a pincode's results may be cached under."""
+        locations = [pincode]
+        if self.stores is not None:
+            locations.extend(self.stores.locations(pincode))
+        zone = zone_for(pincode)
+        if zone is not None:
+            locations.append(f"zone:{zone}")
+        locations.append(NATIONAL_LOCATION)
+        return locations
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the configured scopes."""
+        return {
+            "default": self.default.value,
+            "platforms": {platform: scope.value for platform, scope in self.scopes.items()},
+        }
+
+
+def default_key_scopes(stores: Optional["StoreMap"] = None) -> KeyScopePolicy:
+    """DEFAULT_KEY_SCOPES with overrides from PRICEHUNT_KEY_SCOPES ("Amazon=national,Zepto=pincode")."""
+    scopes = dict(DEFAULT_KEY_SCOPES)
+    scopes.update(parse_scopes(os.environ.get("PRICEHUNT_KEY_SCOPES", "")))
+    return KeyScopePolicy(scopes, stores=stores)
@@ -0,0 +1,63 @@
+"""
+Fixed-bucket histograms for cheap, incrementally maintained statistics.
+
+Adding or removing a sample is a bisect over a handful of bounds, and
+reporting never touches the samples themselves, so stats endpoints stay
+O(buckets) however many entries the cache holds.
+"""
+from bisect import bisect_left
+from typing import Dict, Sequence
+
+
+# Upper bounds (seconds) used for cache entry ages and TTLs
+SECONDS_BUCKETS = (10, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200)
+
+
+class Histogram:
+    """
+    Counts of samples per bucket.
+    
+    Features:
+    - Buckets are (previous bound, bound]; one overflow bucket past the last bound
+    - add() / remove() for populations that change (e.g. live entries' TTLs)
+    - Running count and sum for the mean
+    - update() merges another histogram (e.g. per-shard ones)
+    """
+    
+    def __init__(self, bounds: Sequence[float] = SECONDS_BUCKETS):
+        """Initialize empty buckets for ascending `bounds`."""
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+    
+    def add(self, value: float, n: int = 1):
+        """Record `n` samples of `value` (negative n removes them)."""
+        self.counts[bisect_left(self.bounds, value)] += n
+        self.count += n
+        self.total += value * n
+    
+    def remove(self, value: float):
+        """Forget one sample previously added."""
+        self.add(value, -1)
+    
+    def update(self, other: "Histogram"):
+        """Add every sample of another histogram with the same bounds."""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+    
+    def clear(self):
+        """Forget every sample."""
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+    
+    def to_dict(self) -> Dict[str, object]:
+        """Bucket counts keyed "<=bound" (and ">last bound"), with count and mean."""
+        labels = [f"<={bound:g}" for bound in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 1) if self.count else 0,
+            "buckets": dict(zip(labels, self.counts)),
+        }
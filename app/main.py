@@ -1,44 +1,59 @@
 """FastAPI Price Comparator Application."""
 import asyncio
-import json
-from typing import Optional, List, Dict, AsyncGenerator
-from dataclasses import asdict
-from fastapi import FastAPI, Request, Query
+import os
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, AsyncGenerator, Tuple
+from fastapi import FastAPI, Request, Query, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, StreamingResponse
-from pydantic import BaseModel
-
-from app.scrapers import (
-    AmazonScraper,
-    AmazonFreshScraper,
-    FlipkartScraper,
-    FlipkartMinutesScraper,
-    ZeptoScraper,
-    InstamartScraper,
-    BlinkitScraper,
-    BigBasketScraper,
-    JioMartQuickScraper,
-    JioMartScraper,
-)
-from app.scrapers.base import ProductResult
+from fastapi.responses import HTMLResponse, StreamingResponse, Response
+from pydantic import BaseModel, Field
+
+from app.scrapers.selector_cache import selector_cache
+from app.scrapers.store_map import store_map
+from app.scrapers.deadline import Deadline
 from app.cache import cache
+from app.query import canonical_query
+from app.singleflight import scrape_flights
+from app.refresh import refresh_queue
+from app.scrape_slots import scrape_slots
+from app.orchestrator import (
+    BROWSER_PLATFORMS,
+    PLATFORM_SET_VERSION,
+    PLATFORMS,
+    SEARCH_PLATFORMS,
+    orchestrator,
+    schedule_refresh,
+)
+from app.prefetch import PrefetchScheduler, popular_queries
+from app.encoding import FastJSONResponse, dumps, sse_event, sse_results_event
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start cache warming for popular queries when PRICEHUNT_PREFETCH is set."""
+    if os.environ.get("PRICEHUNT_PREFETCH", "").lower() in ("1", "true", "yes"):
+        prefetcher.start()
+    yield
+    prefetcher.stop()
+
 
 app = FastAPI(
     title="Price Comparator",
     description="Compare prices across Amazon, Flipkart, Zepto, Instamart, and Blinkit",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
 )
 
 # Mount static files and templates
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates")
 
-
 class SearchRequest(BaseModel):
     """Search request model."""
     products: List[str]
     pincode: str = "560087"
+    max_wait_ms: Optional[int] = Field(None, ge=1)  # latency budget for the whole list
 
 
 class ProductComparison(BaseModel):
@@ -58,21 +73,39 @@ async def home(request: Request):
 @app.get("/api/search")
 async def search_single(
     q: str = Query(..., description="Product search query"),
-    pincode: str = Query("560087", description="Delivery pincode")
+    pincode: str = Query("560087", description="Delivery pincode"),
+    max_wait_ms: Optional[int] = Query(None, ge=1, description="Latency budget; platforms still pending are listed"),
 ):
     """Search for a single product across all platforms."""
-    comparison = await compare_prices(q, pincode)
-    return comparison
+    deadline = Deadline.from_ms(max_wait_ms) if max_wait_ms is not None else None
+    popular_queries.record(q, pincode)
+    
+    # Hot path: fully assembled body from cache, valid while no platform entry changed
+    body = cache.get_response(q, pincode, PLATFORM_SET_VERSION)
+    
+    if body is None:
+        comparison, components = await _compare_prices(q, pincode, deadline)
+        comparison.pop("query")
+        body = dumps(comparison)
+        if len(components) == len(SEARCH_PLATFORMS):
+            cache.set_response(q, pincode, PLATFORM_SET_VERSION, body, components)
+    
+    # The body is shared by every spelling of the query - splice the caller's query in front
+    return Response(b'{"query":' + dumps(q) + b"," + body[1:], media_type="application/json")
 
 
 @app.get("/api/search/stream")
 async def search_stream(
     q: str = Query(..., description="Product search query"),
-    pincode: str = Query("560087", description="Delivery pincode")
+    pincode: str = Query("560087", description="Delivery pincode"),
+    live: bool = Query(False, description="Keep the stream open for background refreshes of stale results"),
+    max_wait_ms: Optional[int] = Query(None, ge=1, description="Latency budget; platforms still pending are listed"),
 ):
     """Stream search results as they arrive from each platform using SSE."""
+    deadline = Deadline.from_ms(max_wait_ms) if max_wait_ms is not None else None
+    popular_queries.record(q, pincode)
     return StreamingResponse(
-        stream_search_results(q, pincode),
+        stream_search_results(q, pincode, live=live, deadline=deadline),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -82,244 +115,125 @@ async def search_stream(
     )
 
 
-async def stream_search_results(query: str, pincode: str) -> AsyncGenerator[str, None]:
-    """Generator that yields SSE events as each scraper completes, with caching support."""
-    
-    # Initialize all scrapers with their configs
-    scraper_configs = [
-        ("Amazon Fresh", AmazonFreshScraper(pincode), 25.0),
-        ("Flipkart Minutes", FlipkartMinutesScraper(pincode), 25.0),
-        ("JioMart Quick", JioMartQuickScraper(pincode), 25.0),
-        ("BigBasket", BigBasketScraper(pincode), 25.0),
-        ("Amazon", AmazonScraper(pincode), 25.0),
-        ("Flipkart", FlipkartScraper(pincode), 25.0),
-        ("JioMart", JioMartScraper(pincode), 25.0),
-        ("Zepto", ZeptoScraper(pincode), 40.0),
-    ]
+# Keeps the most searched queries warm; started on app startup when PRICEHUNT_PREFETCH is set
+prefetcher = PrefetchScheduler(
+    popular_queries,
+    cache,
+    refresh_queue,
+    schedule=schedule_refresh,
+    platforms=SEARCH_PLATFORMS,
+    browser_platforms=BROWSER_PLATFORMS,
+    top_n=int(os.environ.get("PRICEHUNT_PREFETCH_TOP_N", 200)),
+    budget_per_hour=float(os.environ.get("PRICEHUNT_PREFETCH_BUDGET", 600)),
+    peak_hours=[int(hour) for hour in os.environ.get("PRICEHUNT_PREFETCH_PEAK_HOURS", "").split(",") if hour.strip()],
+    peak_budget_per_hour=float(os.environ.get("PRICEHUNT_PREFETCH_PEAK_BUDGET", 0)),
+    max_in_flight=refresh_queue.workers,
+    browser_slots=int(os.environ.get("PRICEHUNT_PREFETCH_BROWSER_SLOTS", 1)),
+)
+
+
+
+async def stream_search_results(
+    query: str,
+    pincode: str,
+    live: bool = False,
+    deadline: Optional[Deadline] = None,
+) -> AsyncGenerator[bytes, None]:
+    """
+    Generator that yields SSE events as each platform's results arrive, with caching support.
     
-    # Send initial event with platform list
-    platforms = [name for name, _, _ in scraper_configs]
-    yield f"event: init\ndata: {json.dumps({'query': query, 'platforms': platforms})}\n\n"
+    Stale cached results are sent immediately and refreshed in the background;
+    with live=True the stream stays open and sends a "refresh" event for each.
+    With a deadline, the "complete" event is sent when it passes and lists
+    the platforms still pending.
+    """
+    yield sse_event("init", {"query": query, "platforms": orchestrator.platforms})
     
-    # Check cache for each platform and separate cached vs non-cached
-    cached_results = []
-    platforms_to_fetch = []
+    refreshes: List[asyncio.Future] = []
+    answered = set()
+    all_cached = True
     
-    for name, scraper, timeout in scraper_configs:
-        cached_data, is_stale = cache.get(name, query, pincode)
+    async for answer in orchestrator.stream(query, pincode, deadline):
+        answered.add(answer.platform)
+        if answer.cached:
+            # Pre-encoded frame, sent as is
+            yield cache.frame_for(answer.entry, answer.stale)
+            if answer.refresh is not None:
+                refreshes.append(answer.refresh)
+            continue
         
-        if cached_data is not None:
-            # We have cached data - send it immediately
-            cached_results.append((name, cached_data, is_stale))
-            
-            # If stale, also add to fetch list for background refresh
-            if is_stale:
-                platforms_to_fetch.append((name, scraper, timeout))
-        else:
-            # No cache - need to fetch
-            platforms_to_fetch.append((name, scraper, timeout))
-    
-    # Send cached results immediately (super fast!)
-    for name, results, is_stale in cached_results:
-        event_data = {
-            "platform": name,
-            "results": results,
-            "count": len(results),
-            "cached": True,
-            "stale": is_stale
-        }
-        yield f"event: platform\ndata: {json.dumps(event_data)}\n\n"
+        all_cached = False
+        entry = answer.entry
+        yield sse_results_event("platform", entry.platform, entry.results_json, entry.count, {
+            "cached": False,
+            "stale": entry.fallback,  # last good results, served because this scrape failed
+            "outcome": entry.outcome.value,
+        })
     
-    # If all results were cached and fresh, we're done!
-    if not platforms_to_fetch:
-        yield f"event: complete\ndata: {json.dumps({'status': 'done', 'all_cached': True})}\n\n"
-        return
-    
-    # Fetch fresh data for non-cached or stale platforms
-    async def run_scraper(name: str, scraper, timeout: float):
-        """Run a single scraper with timeout and cache the results."""
-        try:
-            results = await asyncio.wait_for(scraper.search(query), timeout=timeout)
-            results_list = [asdict(r) for r in results] if results else []
-            
-            # Cache the fresh results
-            cache.set(name, query, pincode, results_list)
-            
-            return name, results_list
-        except asyncio.TimeoutError:
-            print(f"{name}: TIMEOUT")
-            return name, []
-        except Exception as e:
-            print(f"{name}: ERROR - {e}")
-            return name, []
-    
-    # Create tasks for platforms that need fetching
-    tasks = {
-        asyncio.create_task(run_scraper(name, scraper, timeout)): name
-        for name, scraper, timeout in platforms_to_fetch
-    }
-    
-    # Track which platforms already had cached data sent (for stale-while-revalidate)
-    cached_platform_names = {name for name, _, is_stale in cached_results if is_stale}
-    
-    # Yield fresh results as each scraper completes
-    for completed_task in asyncio.as_completed(tasks.keys()):
-        name, results = await completed_task
-        
-        # For stale-while-revalidate: only send if results are different or better
-        # For non-cached: always send
-        if name in cached_platform_names:
-            # This was a background refresh - send update event
-            event_data = {
-                "platform": name,
-                "results": results,
-                "count": len(results),
+    # Live clients also get the background refreshes of stale platforms
+    if live and refreshes:
+        for completed in asyncio.as_completed(refreshes):
+            entry = await completed
+            if entry is None or entry.fallback:
+                continue
+            yield sse_results_event("refresh", entry.platform, entry.results_json, entry.count, {
                 "cached": False,
-                "refreshed": True  # Indicates this is a refresh of stale data
-            }
-            yield f"event: refresh\ndata: {json.dumps(event_data)}\n\n"
-        else:
-            # Fresh fetch - send normal platform event
-            event_data = {
-                "platform": name,
-                "results": results,
-                "count": len(results),
-                "cached": False
-            }
-            yield f"event: platform\ndata: {json.dumps(event_data)}\n\n"
+                "refreshed": True,  # Indicates this is a refresh of stale data
+            })
     
     # Send completion event
-    yield f"event: complete\ndata: {json.dumps({'status': 'done', 'all_cached': False})}\n\n"
+    pending = [name for name in orchestrator.platforms if name not in answered]
+    yield sse_event("complete", {"status": "done", "all_cached": all_cached, "pending": pending})
 
 
 @app.post("/api/search/bulk")
 async def search_bulk(request: SearchRequest):
-    """Search for multiple products across all platforms."""
-    results = []
-    
-    for product in request.products:
-        if product.strip():
-            comparison = await compare_prices(product.strip(), request.pincode)
-            results.append(comparison)
-    
-    return {"comparisons": results}
+    """Search for multiple products across all platforms, concurrently and once per distinct product."""
+    deadline = Deadline.from_ms(request.max_wait_ms) if request.max_wait_ms is not None else None
+    products = [product.strip() for product in request.products if product.strip()]
+    comparisons = await orchestrator.search_many(products, request.pincode, deadline)
+    return FastJSONResponse({"comparisons": [comparison.to_dict() for comparison in comparisons]})
 
 
 async def compare_prices(query: str, pincode: str = "560087") -> dict:
     """Compare prices for a product across all platforms."""
+    comparison, _ = await _compare_prices(query, pincode)
+    return comparison
+
+
+async def _compare_prices(query: str, pincode: str, deadline: Optional[Deadline] = None) -> Tuple[dict, Dict[str, int]]:
+    """
+    Compare prices across all platforms, using cached platform results where available.
     
-    combined_results = []
-    platforms_with_results = 0
-    
-    # Initialize all scrapers
-    amazon = AmazonScraper(pincode)
-    amazon_fresh = AmazonFreshScraper(pincode)
-    flipkart = FlipkartScraper(pincode)
-    flipkart_minutes = FlipkartMinutesScraper(pincode)
-    zepto = ZeptoScraper(pincode)
-    bigbasket = BigBasketScraper(pincode)
-    jiomart_quick = JioMartQuickScraper(pincode)
-    jiomart = JioMartScraper(pincode)
-    
-    # Helper to add results
-    def add_results(name: str, results: list):
-        nonlocal platforms_with_results
-        if results:
-            platforms_with_results += 1
-            for result in results:
-                combined_results.append(asdict(result))
-    
-    # Run all HTTP-based scrapers concurrently
-    async def run_scraper(name, scraper):
-        try:
-            results = await asyncio.wait_for(scraper.search(query), timeout=25.0)
-            return name, results
-        except asyncio.TimeoutError:
-            print(f"{name}: TIMEOUT")
-            return name, []
-        except Exception as e:
-            print(f"{name}: ERROR - {e}")
-            return name, []
-    
-    # Create tasks for all scrapers
-    tasks = [
-        run_scraper("Amazon Fresh", amazon_fresh),
-        run_scraper("Flipkart Minutes", flipkart_minutes),
-        run_scraper("JioMart Quick", jiomart_quick),
-        run_scraper("BigBasket", bigbasket),
-        run_scraper("Amazon", amazon),
-        run_scraper("Flipkart", flipkart),
-        run_scraper("JioMart", jiomart),
-    ]
-    
-    # Run HTTP scrapers concurrently
-    http_results = await asyncio.gather(*tasks)
-    
-    for name, results in http_results:
-        add_results(name, results)
-    
-    # Run Zepto separately (uses Playwright browser)
-    try:
-        zepto_results = await asyncio.wait_for(zepto.search(query), timeout=40.0)
-        add_results("Zepto", zepto_results)
-    except asyncio.TimeoutError:
-        print("Zepto: TIMEOUT")
-    except Exception as e:
-        print(f"Zepto: ERROR - {e}")
-    
-    # Sort results by platform in desired order
-    platform_order = {
-        "Amazon Fresh": 1,
-        "Flipkart Minutes": 2,
-        "JioMart Quick": 3,
-        "BigBasket": 4,
-        "Zepto": 5,
-        "Amazon": 6,
-        "Flipkart": 7,
-        "JioMart": 8,
-        "Blinkit": 9,
-        "Instamart": 10,
-    }
-    combined_results.sort(key=lambda x: (platform_order.get(x.get("platform", ""), 99), x.get("price", 0)))
-    
-    # Find lowest price
-    lowest_price = None
-    if combined_results:
-        available_results = [r for r in combined_results if r.get("available", True) and r.get("price", 0) > 0]
-        if available_results:
-            lowest_price = min(available_results, key=lambda x: x["price"])
-    
-    return {
-        "query": query,
-        "results": combined_results,
-        "lowest_price": lowest_price,
-        "total_platforms": platforms_with_results
-    }
+    Returns:
+        Tuple of (comparison, components) - components maps each platform whose
+        fresh (not stale, not failed) cached results were used to the generation
+        of that entry. comparison["stale_platforms"] lists platforms served
+        stale data, either pending a background refresh or because the latest
+        scrape failed; comparison["pending_platforms"] lists platforms that
+        had not answered when the deadline passed.
+    """
+    comparison = await orchestrator.search(query, pincode, deadline)
+    return comparison.to_dict(), comparison.components
 
 
 @app.get("/api/platforms")
 async def get_platforms():
     """Get list of supported platforms."""
-    return {
-        "platforms": [
-            {"name": "Amazon Fresh", "type": "quick-commerce", "delivery": "2-4 hours", "color": "#5EA03E"},
-            {"name": "Flipkart Minutes", "type": "quick-commerce", "delivery": "10-45 mins", "color": "#FFCE00"},
-            {"name": "JioMart Quick", "type": "quick-commerce", "delivery": "10-30 mins", "color": "#0078AD"},
-            {"name": "BigBasket", "type": "quick-commerce", "delivery": "2-4 hours", "color": "#84C225"},
-            {"name": "Zepto", "type": "quick-commerce", "delivery": "10-15 mins", "color": "#8B5CF6"},
-            {"name": "Amazon", "type": "e-commerce", "delivery": "1-3 days", "color": "#FF9900"},
-            {"name": "Flipkart", "type": "e-commerce", "delivery": "2-4 days", "color": "#2874F0"},
-            {"name": "JioMart", "type": "e-commerce", "delivery": "1-3 days", "color": "#0078AD"},
-            {"name": "Instamart", "type": "quick-commerce", "delivery": "15-30 mins", "color": "#FC8019"},
-            {"name": "Blinkit", "type": "quick-commerce", "delivery": "8-12 mins", "color": "#F8CB46"},
-        ]
-    }
+    return {"platforms": [platform.to_dict() for platform in PLATFORMS.values()]}
 
 
 @app.get("/api/cache/stats")
 async def cache_stats():
     """Get cache statistics."""
-    return cache.get_stats()
+    stats = cache.get_stats()
+    stats["singleflight"] = scrape_flights.get_stats()
+    stats["refresh"] = refresh_queue.get_stats()
+    stats["query_canonicalization"] = canonical_query.get_stats()
+    stats["prefetch"] = prefetcher.get_stats(cache_stats=stats)
+    stats["store_map"] = store_map.get_stats()
+    stats["scrape_slots"] = scrape_slots.get_stats()
+    return stats
 
 
 @app.post("/api/cache/clear")
@@ -329,6 +243,26 @@ async def cache_clear():
     return {"status": "cleared", "message": "Cache cleared successfully"}
 
 
+@app.post("/api/cache/invalidate")
+async def cache_invalidate(
+    platform: Optional[str] = Query(None, description="Platform name, e.g. Zepto"),
+    pincode: Optional[str] = Query(None, description="Delivery pincode"),
+    q: Optional[str] = Query(None, description="Search query"),
+):
+    """Invalidate cache entries matching a platform, pincode and/or query."""
+    if platform is None and pincode is None and q is None:
+        raise HTTPException(status_code=400, detail="Provide at least one of platform, pincode or q")
+    
+    removed = cache.invalidate_where(platform=platform, pincode=pincode, query=q)
+    return {"status": "invalidated", "removed": removed}
+
+
+@app.get("/api/selectors/stats")
+async def selector_stats():
+    """Get selector memoization statistics per platform."""
+    return selector_cache.get_stats()
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
@@ -0,0 +1,411 @@
+"""
+Search orchestration shared by every entry point.
+
+The web app (/api/search, /api/search/stream), the mobile API server and the
+CLI all fan a query out to the same platforms. PLATFORMS is the single
+registry of them - scraper class, timeout and display details - and
+SearchOrchestrator runs the fan-out: cached platforms are answered from the
+cache (stale ones refreshed in the background), the rest are scraped
+concurrently, each under its own timeout and through single-flight, and
+their outcomes are cached. Callers either await the merged Comparison
+(search) or consume each platform's result as it lands (stream).
+
+A search may carry a Deadline: scrapers shrink their timeouts and waits to
+fit it, and platforms that have not answered when it passes are reported as
+pending alongside the partial results.
+"""
+import asyncio
+import dataclasses
+import hashlib
+import os
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple, Type
+
+from app.cache import CacheEntry, cache
+from app.query import canonical_query
+from app.refresh import REFRESH_PRIORITY, refresh_queue
+from app.scrape_slots import scrape_slots
+from app.singleflight import scrape_flights
+from app.scrapers import (
+    AmazonScraper,
+    AmazonFreshScraper,
+    FlipkartScraper,
+    FlipkartMinutesScraper,
+    ZeptoScraper,
+    InstamartScraper,
+    BlinkitScraper,
+    BigBasketScraper,
+    JioMartQuickScraper,
+    JioMartScraper,
+)
+from app.scrapers.base import BaseScraper, ProductResult, ScrapeOutcome, ScraperBlockedError
+from app.scrapers.deadline import Deadline
+from app.scrapers.store_map import store_map
+
+
+@dataclass(frozen=True)
+class Platform:
+    """A supported platform: how to scrape it and how to present it."""
+    name: str
+    scraper_class: Type[BaseScraper]
+    timeout: float           # seconds a scrape may take
+    kind: str                # "quick-commerce" or "e-commerce"
+    delivery: str
+    color: str
+    searchable: bool = True  # False for platforms whose scrapers no longer work
+    
+    def to_dict(self) -> dict:
+        """Public description of the platform."""
+        return {"name": self.name, "type": self.kind, "delivery": self.delivery, "color": self.color}
+
+
+# Every supported platform, in display (and result sort) order
+PLATFORMS: Dict[str, Platform] = {
+    platform.name: platform for platform in [
+        Platform("Amazon Fresh", AmazonFreshScraper, 25.0, "quick-commerce", "2-4 hours", "#5EA03E"),
+        Platform("Flipkart Minutes", FlipkartMinutesScraper, 25.0, "quick-commerce", "10-45 mins", "#FFCE00"),
+        Platform("JioMart Quick", JioMartQuickScraper, 25.0, "quick-commerce", "10-30 mins", "#0078AD"),
+        Platform("BigBasket", BigBasketScraper, 25.0, "quick-commerce", "2-4 hours", "#84C225"),
+        Platform("Zepto", ZeptoScraper, 40.0, "quick-commerce", "10-15 mins", "#8B5CF6"),
+        Platform("Amazon", AmazonScraper, 25.0, "e-commerce", "1-3 days", "#FF9900"),
+        Platform("Flipkart", FlipkartScraper, 25.0, "e-commerce", "2-4 days", "#2874F0"),
+        Platform("JioMart", JioMartScraper, 25.0, "e-commerce", "1-3 days", "#0078AD"),
+        # Their scrapers return nothing (anti-bot protection) - listed, never searched
+        Platform("Instamart", InstamartScraper, 25.0, "quick-commerce", "15-30 mins", "#FC8019", searchable=False),
+        Platform("Blinkit", BlinkitScraper, 25.0, "quick-commerce", "8-12 mins", "#F8CB46", searchable=False),
+    ]
+}
+
+# Platforms every search fans out to
+SEARCH_PLATFORMS = [name for name, platform in PLATFORMS.items() if platform.searchable]
+
+# Platforms whose scrapes hold a Playwright browser
+BROWSER_PLATFORMS = {name for name in SEARCH_PLATFORMS if PLATFORMS[name].scraper_class.USE_BROWSER}
+
+# Sort order for combined results
+PLATFORM_ORDER = {name: rank for rank, name in enumerate(PLATFORMS, 1)}
+
+# Cached /api/search bodies are keyed by this, so a change to the platform set never serves old bodies
+PLATFORM_SET_VERSION = hashlib.md5("|".join(SEARCH_PLATFORMS).encode()).hexdigest()[:8]
+
+# Queries of one bulk search searched at once (their scrapes are further bounded by scrape_slots)
+BULK_CONCURRENCY = int(os.environ.get("PRICEHUNT_BULK_CONCURRENCY", 8))
+
+# Re-pricing refreshes in a row before a stale entry is searched again in full (new listings, ranking)
+MAX_REPRICES = int(os.environ.get("PRICEHUNT_MAX_REPRICES", 3))
+
+
+async def fetch_platform(
+    name: str,
+    scraper,
+    query: str,
+    pincode: str,
+    timeout: float,
+    deadline: Optional[Deadline] = None,
+) -> Optional[CacheEntry]:
+    """
+    Scrape one platform and cache the outcome.
+    
+    Concurrent calls for the same platform, query and pincode share a single
+    scrape. Returns the new cache entry: empty and failed scrapes are cached
+    with short TTLs, and a failed scrape carries the last good results
+    (entry.fallback) when there are any.
+    
+    Each scrape holds a global scrape slot (see scrape_slots) while it runs.
+    With a deadline the scrape gets at most the time left of it. A scrape
+    that comes back empty or failed after its budget was cut short says
+    nothing about the platform, so it is not cached and None is returned.
+    A caller that joins a scrape cut short by another request's deadline,
+    with no deadline of its own or a later one, scrapes again within its own
+    budget rather than inherit that None.
+    """
+    async def scrape() -> Tuple[Optional[CacheEntry], Optional[Deadline]]:
+        results = []
+        budget = timeout
+        async with scrape_slots.hold(browser=name in BROWSER_PLATFORMS):
+            # The budget starts once a slot is free
+            if deadline is not None:
+                budget = deadline.timeout(timeout)
+                scraper.deadline = deadline
+            try:
+                results = await asyncio.wait_for(scraper.search(query), timeout=budget)
+                results = list(results) if results else []
+                outcome = ScrapeOutcome.OK if results else ScrapeOutcome.EMPTY
+            except asyncio.TimeoutError:
+                print(f"{name}: TIMEOUT")
+                outcome = ScrapeOutcome.TIMEOUT
+            except ScraperBlockedError as e:
+                print(f"{name}: BLOCKED - {e}")
+                outcome = ScrapeOutcome.BLOCKED
+            except Exception as e:
+                print(f"{name}: ERROR - {e}")
+                outcome = ScrapeOutcome.ERROR
+        # Learn the serving dark store first, so the entry is keyed by it
+        store_id = getattr(scraper, "store_id", None)
+        if store_id:
+            await store_map.alearn(name, pincode, store_id)
+        if outcome is not ScrapeOutcome.OK and (budget < timeout or getattr(scraper, "budget_cut", False)):
+            return None, deadline   # the deadline that cut the scrape short
+        (entry,) = await cache.aset_many([(name, query, pincode, results, outcome)])
+        return entry, None
+    
+    key = cache.flight_key(name, query, pincode)
+    while True:
+        entry, cut_by = await scrape_flights.do(key, scrape)
+        # A shared scrape cut short by another request's tighter deadline is
+        # run again within this caller's budget
+        retry = (
+            entry is None and cut_by is not None and cut_by is not deadline
+            and (deadline is None or deadline.at > cut_by.at)
+        )
+        if not retry:
+            return entry
+
+
+async def refresh_platform(name: str, scraper, query: str, pincode: str, timeout: float) -> CacheEntry:
+    """
+    Refresh a cached platform entry, re-pricing its known products when possible.
+    
+    If every result of a good entry links to a product page the scraper can
+    read, their prices are fetched over HTTP and the entry is rewritten from
+    them - a few small requests instead of a browser search. After
+    MAX_REPRICES re-pricings in a row, or if any product could not be priced,
+    this falls back to a full fetch_platform scrape.
+    """
+    entry = cache.peek(name, query, pincode)
+    can_reprice = getattr(scraper, "can_reprice", None)
+    if (
+        can_reprice is not None and entry is not None and entry.count
+        and not entry.is_negative and not entry.fallback and entry.repriced < MAX_REPRICES
+    ):
+        urls = [result.url for result in entry.data]
+        if all(can_reprice(url) for url in urls):
+            try:
+                prices = await asyncio.wait_for(scraper.reprice(urls), timeout=timeout)
+            except Exception as e:
+                print(f"{name}: REPRICE FAILED - {e}")
+                prices = {}
+            if prices and len(prices) == len(set(urls)):
+                repriced = await cache.areprice(name, query, pincode, prices)
+                if repriced is not None:
+                    return repriced
+    
+    return await fetch_platform(name, scraper, query, pincode, timeout)
+
+
+def schedule_refresh(
+    name: str,
+    query: str,
+    pincode: str,
+    priority: int = REFRESH_PRIORITY,
+) -> Optional[asyncio.Future]:
+    """
+    Queue a background refresh (re-pricing where possible) of a stale platform entry.
+    
+    Returns a Future resolving to the refreshed cache entry, or None if the
+    refresh queue is full.
+    """
+    platform = PLATFORMS[name]
+    return refresh_queue.enqueue(
+        cache.flight_key(name, query, pincode),
+        lambda: refresh_platform(name, platform.scraper_class(pincode), query, pincode, platform.timeout),
+        priority,
+    )
+
+
+@dataclass
+class PlatformResult:
+    """One platform's answer to a search."""
+    entry: CacheEntry
+    cached: bool                                # answered from the cache, not scraped for this search
+    stale: bool = False                         # a stale cache hit, being refreshed in the background
+    refresh: Optional[asyncio.Future] = None    # resolves to the refreshed entry (stale hits only)
+    
+    @property
+    def platform(self) -> str:
+        return self.entry.platform
+    
+    @property
+    def results(self) -> List[ProductResult]:
+        return self.entry.data
+    
+    @property
+    def degraded(self) -> bool:
+        """Served data is not current: a stale hit, or the last good data after a failed scrape."""
+        return self.stale or self.entry.fallback
+
+
+@dataclass
+class Comparison:
+    """Merged results of a search across platforms."""
+    query: str
+    results: List[ProductResult]
+    lowest_price: Optional[ProductResult]
+    total_platforms: int
+    stale_platforms: List[str]
+    pending_platforms: List[str] = field(default_factory=list)   # not answered by the deadline
+    # Platform -> generation of each fresh, successful entry used (see CacheManager.set_response)
+    components: Dict[str, int] = field(default_factory=dict)
+    
+    def to_dict(self) -> dict:
+        """The comparison as returned by the search APIs."""
+        return {
+            "query": self.query,
+            "results": self.results,
+            "lowest_price": self.lowest_price,
+            "total_platforms": self.total_platforms,
+            "stale_platforms": self.stale_platforms,
+            "pending_platforms": self.pending_platforms,
+        }
+
+
+def merge(query: str, answers: Iterable[PlatformResult], pending: Iterable[str] = ()) -> Comparison:
+    """Combine platform answers into one comparison, sorted by platform then price."""
+    answers = sorted(answers, key=lambda answer: PLATFORM_ORDER.get(answer.platform, 99))
+    combined: List[ProductResult] = []
+    components: Dict[str, int] = {}
+    stale_platforms: List[str] = []
+    platforms_with_results = 0
+    
+    for answer in answers:
+        # Only fresh, successful entries may back a cached response body
+        if answer.degraded:
+            stale_platforms.append(answer.platform)
+        elif answer.entry.outcome in (ScrapeOutcome.OK, ScrapeOutcome.EMPTY):
+            components[answer.platform] = answer.entry.generation
+        results = answer.results
+        if results:
+            platforms_with_results += 1
+            combined.extend(results)
+    
+    combined.sort(key=lambda r: (PLATFORM_ORDER.get(r.platform, 99), r.price))
+    available = [r for r in combined if r.available and r.price > 0]
+    
+    return Comparison(
+        query=query,
+        results=combined,
+        lowest_price=min(available, key=lambda r: r.price) if available else None,
+        total_platforms=platforms_with_results,
+        stale_platforms=stale_platforms,
+        pending_platforms=sorted(pending, key=lambda name: PLATFORM_ORDER.get(name, 99)),
+        components=components,
+    )
+
+
+class SearchOrchestrator:
+    """
+    Fans a search out to a set of registered platforms, through the cache.
+    
+    Features:
+    - Platforms and their timeouts come from the PLATFORMS registry
+    - Cached platforms are read in one batch (CacheManager.aget_many); stale
+      hits are served and refreshed in the background
+    - Every other platform is scraped concurrently, under its own timeout,
+      with identical in-flight scrapes shared (fetch_platform)
+    - search(): await the merged Comparison
+    - stream(): async iterator of PlatformResults, cached ones first, then
+      scrapes in completion order
+    - Optional Deadline: scrapes are sized to it and whatever has not
+      answered when it passes is left out (pending)
+    - search_many(): bulk search of de-duplicated queries, BULK_CONCURRENCY
+      at a time, every scrape within the global scrape_slots limits
+    """
+    
+    def __init__(self, platforms: Optional[Iterable[str]] = None):
+        """
+        Initialize an orchestrator.
+        
+        Args:
+            platforms: Registered platform names to search; None for SEARCH_PLATFORMS
+        """
+        self.platforms = list(platforms) if platforms is not None else list(SEARCH_PLATFORMS)
+        unknown = [name for name in self.platforms if name not in PLATFORMS]
+        if unknown:
+            raise ValueError(f"Unknown platforms: {', '.join(unknown)}")
+    
+    async def stream(self, query: str, pincode: str, deadline: Optional[Deadline] = None) -> AsyncIterator[PlatformResult]:
+        """
+        Yield each platform's result as soon as it is available.
+        
+        Scrapes for cache misses start before the cached results are yielded.
+        With a deadline, iteration ends when it passes; platforms not yielded
+        by then are pending. Closing the iterator early (or the deadline
+        passing) leaves running scrapes to finish and fill the cache for
+        whoever asks next.
+        """
+        cached = await cache.aget_many(self.platforms, query, pincode)
+        hits: List[PlatformResult] = []
+        scrapes: List[asyncio.Future] = []
+        
+        for name in self.platforms:
+            entry, is_stale = cached[name]
+            if entry is not None:
+                refresh = schedule_refresh(name, query, pincode) if is_stale else None
+                hits.append(PlatformResult(entry, cached=True, stale=is_stale, refresh=refresh))
+            else:
+                platform = PLATFORMS[name]
+                scrapes.append(asyncio.ensure_future(fetch_platform(
+                    name, platform.scraper_class(pincode), query, pincode, platform.timeout, deadline,
+                )))
+        
+        try:
+            for hit in hits:
+                yield hit
+            waiting = set(scrapes)
+            while waiting:
+                done, waiting = await asyncio.wait(
+                    waiting,
+                    timeout=deadline.remaining() if deadline is not None else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    break  # deadline passed
+                for scrape in done:
+                    entry = scrape.result()
+                    if entry is not None:
+                        yield PlatformResult(entry, cached=False)
+        finally:
+            # Our waits on the shared scrapes, not the scrapes themselves
+            for scrape in scrapes:
+                scrape.cancel()
+    
+    async def search(self, query: str, pincode: str, deadline: Optional[Deadline] = None) -> Comparison:
+        """Search every platform and merge the results; with a deadline, those still pending are listed."""
+        answers = [answer async for answer in self.stream(query, pincode, deadline)]
+        answered = {answer.platform for answer in answers}
+        return merge(query, answers, [name for name in self.platforms if name not in answered])
+    
+    async def search_many(
+        self,
+        queries: Iterable[str],
+        pincode: str,
+        deadline: Optional[Deadline] = None,
+    ) -> List[Comparison]:
+        """
+        Search several queries concurrently.
+        
+        Queries with the same canonical form are searched once. Up to
+        BULK_CONCURRENCY searches run at a time; their scrapes share the
+        global scrape and browser slots with every other search.
+        
+        Returns:
+            A comparison per query, in order - duplicates share the results
+            but each carries its own spelling
+        """
+        queries = list(queries)
+        unique: Dict[str, str] = {}
+        for query in queries:
+            unique.setdefault(canonical_query(query), query)
+        
+        semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+        
+        async def run(query: str) -> Comparison:
+            async with semaphore:
+                return await self.search(query, pincode, deadline)
+        
+        comparisons = dict(zip(unique, await asyncio.gather(*(run(query) for query in unique.values()))))
+        return [dataclasses.replace(comparisons[canonical_query(query)], query=query) for query in queries]
+
+
+# Default orchestrator: every searchable platform, through the global cache
+orchestrator = SearchOrchestrator()
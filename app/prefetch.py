@@ -0,0 +1,293 @@
+"""
+Popular-query prefetching.
+
+Traffic is dominated by a few hundred staples per pincode. PopularityTracker
+keeps a decayed request counter per (canonical query, pincode), fed by the
+search endpoints. PrefetchScheduler periodically takes the top-N and
+re-scrapes each platform entry shortly before it would turn stale (or after
+it has dropped out of the cache), so those users get warm hits instead of a
+25-40 s cold scrape.
+
+Prefetches go through the background refresh queue at a lower priority than
+user-triggered refreshes, are paced by an hourly scrape budget (with a
+separate budget for peak hours) and never hold more than `browser_slots`
+Playwright scrapes at once.
+"""
+import asyncio
+import heapq
+import time
+from typing import Any, Callable, Collection, Dict, List, Optional, Set, Tuple
+
+from app.cache import CacheManager
+from app.query import canonical_query
+from app.refresh import REFRESH_PRIORITY, RefreshQueue
+
+
+# Runs after user-triggered refreshes (lower runs sooner)
+PREFETCH_PRIORITY = REFRESH_PRIORITY + 10
+
+
+class PopularityTracker:
+    """
+    Exponentially decayed request counts per (canonical query, pincode).
+    
+    Features:
+    - Scores halve every half_life seconds without requests
+    - Remembers the latest spelling of each query, which is what gets scraped
+    - Bounded: past max_keys the lowest-scoring tenth is forgotten
+    """
+    
+    def __init__(self, half_life: float = 6 * 3600, max_keys: int = 5000, clock: Callable[[], float] = time.time):
+        """Initialize an empty tracker."""
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self.clock = clock
+        self._scores: Dict[Tuple[str, str], Tuple[float, float, str]] = {}   # key -> (score, updated_at, spelling)
+        self._recorded = 0
+    
+    def _decayed(self, score: float, updated_at: float, now: float) -> float:
+        return score * 0.5 ** ((now - updated_at) / self.half_life)
+    
+    def record(self, query: str, pincode: str):
+        """Count one search."""
+        now = self.clock()
+        key = (canonical_query(query), pincode)
+        score, updated_at, _ = self._scores.get(key, (0.0, now, query))
+        self._scores[key] = (self._decayed(score, updated_at, now) + 1, now, query)
+        self._recorded += 1
+        if len(self._scores) > self.max_keys:
+            self._prune(now)
+    
+    def _prune(self, now: float):
+        """Forget the lowest-scoring tenth of the keys."""
+        ranked = sorted(self._scores, key=lambda key: self._decayed(*self._scores[key][:2], now))
+        for key in ranked[:max(1, len(ranked) // 10)]:
+            del self._scores[key]
+    
+    def score(self, query: str, pincode: str) -> float:
+        """Current decayed score of a query in a pincode."""
+        entry = self._scores.get((canonical_query(query), pincode))
+        return self._decayed(entry[0], entry[1], self.clock()) if entry else 0.0
+    
+    def top(self, n: int) -> List[Tuple[str, str, float]]:
+        """The n most popular (query spelling, pincode, score), most popular first."""
+        now = self.clock()
+        return heapq.nlargest(
+            n,
+            ((spelling, pincode, self._decayed(score, updated_at, now))
+             for (_, pincode), (score, updated_at, spelling) in self._scores.items()),
+            key=lambda item: item[2],
+        )
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tracker statistics with the ten most popular queries."""
+        return {
+            "tracked": len(self._scores),
+            "recorded": self._recorded,
+            "top": [
+                {"query": query, "pincode": pincode, "score": round(score, 2)}
+                for query, pincode, score in self.top(10)
+            ],
+        }
+
+
+class PrefetchScheduler:
+    """
+    Keeps the most popular queries' entries warm.
+    
+    Features:
+    - Every `interval` seconds, walks the top_n queries and queues a refresh of
+      each platform entry that is missing, expired, or turns stale within `lead` seconds
+    - Token-bucket budget: budget_per_hour scrapes, or peak_budget_per_hour
+      during peak_hours (local hours of the day)
+    - At most max_in_flight prefetches queued/running, of which at most
+      browser_slots on Playwright platforms
+    - Cost (scrapes, failures, scrape seconds) and hit-rate lift statistics
+    """
+    
+    def __init__(
+        self,
+        tracker: PopularityTracker,
+        cache: CacheManager,
+        queue: RefreshQueue,
+        schedule: Callable[[str, str, str, int], Optional[asyncio.Future]],
+        platforms: List[str],
+        browser_platforms: Collection[str] = (),
+        top_n: int = 200,
+        lead: float = 60,
+        interval: float = 30,
+        budget_per_hour: float = 600,
+        peak_hours: Collection[int] = (),
+        peak_budget_per_hour: float = 0,
+        max_in_flight: int = 2,
+        browser_slots: int = 1,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Initialize the scheduler.
+        
+        Args:
+            schedule: schedule(platform, query, pincode, priority) queues a
+                refresh and returns a Future for the new cache entry (None if not queued)
+            platforms: Platforms to keep warm
+            browser_platforms: Platforms whose scrapes take a Playwright browser
+        """
+        self.tracker = tracker
+        self.cache = cache
+        self.queue = queue
+        self.schedule = schedule
+        self.platforms = platforms
+        self.browser_platforms: Set[str] = set(browser_platforms)
+        self.top_n = top_n
+        self.lead = lead
+        self.interval = interval
+        self.budget_per_hour = budget_per_hour
+        self.peak_hours = set(peak_hours)
+        self.peak_budget_per_hour = peak_budget_per_hour
+        self.max_in_flight = max_in_flight
+        self.browser_slots = browser_slots
+        self.clock = clock
+        self._tokens = 0.0
+        self._refilled_at: Optional[float] = None
+        self._in_flight = 0
+        self._browser_in_flight = 0
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "runs": 0,
+            "scheduled": 0,
+            "completed": 0,
+            "failed": 0,
+            "skipped_budget": 0,
+            "skipped_slots": 0,
+        }
+        self._scrape_seconds = 0.0
+    
+    def _hourly_budget(self, now: float) -> float:
+        return self.peak_budget_per_hour if time.localtime(now).tm_hour in self.peak_hours else self.budget_per_hour
+    
+    def _refill(self) -> float:
+        """Add the tokens earned since the last run; at most one interval's worth is banked."""
+        now = self.clock()
+        rate = self._hourly_budget(now) / 3600
+        cap = max(rate * self.interval, 1.0) if rate else 0.0
+        earned = cap if self._refilled_at is None else (now - self._refilled_at) * rate
+        self._tokens = min(self._tokens + earned, cap)
+        self._refilled_at = now
+        return self._tokens
+    
+    def _due(self, platform: str, query: str, pincode: str) -> bool:
+        """Check whether an entry should be re-scraped now."""
+        entry = self.cache.peek(platform, query, pincode)
+        if entry is None or entry.is_expired:
+            return True
+        # Negative entries are left to expire: their short TTL is the retry back-off
+        return not entry.is_negative and entry.stale_in <= self.lead
+    
+    def _started(self, platform: str, future: asyncio.Future):
+        """Track a queued prefetch until its scrape finishes."""
+        browser = platform in self.browser_platforms
+        started_at = time.monotonic()
+        self._in_flight += 1
+        self._browser_in_flight += browser
+        self._stats["scheduled"] += 1
+        
+        def finished(done: asyncio.Future):
+            self._in_flight -= 1
+            self._browser_in_flight -= browser
+            self._scrape_seconds += time.monotonic() - started_at
+            entry = None if done.cancelled() else done.result()
+            if entry is None or entry.is_negative:
+                self._stats["failed"] += 1
+            else:
+                self._stats["completed"] += 1
+                entry.prefetched = True
+        
+        future.add_done_callback(finished)
+    
+    def run_once(self) -> int:
+        """
+        Queue refreshes for due entries of the most popular queries.
+        
+        Must be called from the event loop. Returns the number of refreshes queued.
+        """
+        self._stats["runs"] += 1
+        tokens = self._refill()
+        queued = 0
+        
+        for query, pincode, _ in self.tracker.top(self.top_n):
+            for platform in self.platforms:
+                if not self._due(platform, query, pincode):
+                    continue
+                if self.queue.is_pending(self.cache.flight_key(platform, query, pincode)):
+                    continue
+                if tokens < 1:
+                    self._stats["skipped_budget"] += 1
+                    return queued
+                if self._in_flight >= self.max_in_flight:
+                    self._stats["skipped_slots"] += 1
+                    return queued
+                if platform in self.browser_platforms and self._browser_in_flight >= self.browser_slots:
+                    self._stats["skipped_slots"] += 1
+                    continue
+                
+                future = self.schedule(platform, query, pincode, PREFETCH_PRIORITY)
+                if future is None:
+                    return queued
+                self._started(platform, future)
+                tokens -= 1
+                self._tokens = tokens
+                queued += 1
+        
+        return queued
+    
+    async def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Prefetch: ERROR - {e}")
+            await asyncio.sleep(self.interval)
+    
+    def start(self):
+        """Start the periodic prefetch loop in the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    def stop(self):
+        """Stop the prefetch loop (queued refreshes still run)."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+    
+    def get_stats(self, cache_stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Get prefetch cost and hit-rate lift.
+        
+        Args:
+            cache_stats: The cache's get_stats(), if the caller already has it
+                (saves walking every shard again)
+        """
+        if cache_stats is None:
+            cache_stats = self.cache.get_stats()
+        lookups = cache_stats["hits"] + cache_stats["stale_hits"] + cache_stats["misses"]
+        scrapes = self._stats["completed"] + self._stats["failed"]
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "in_flight": self._in_flight,
+            "browser_in_flight": self._browser_in_flight,
+            "tokens": round(self._tokens, 2),
+            "budget_per_hour": self._hourly_budget(self.clock()),
+            **self._stats,
+            "scrape_seconds": round(self._scrape_seconds, 1),
+            "avg_scrape_seconds": round(self._scrape_seconds / scrapes, 2) if scrapes else 0,
+            "prefetch_hits": cache_stats["prefetch_hits"],
+            # Share of lookups answered by an entry only a prefetch had written
+            "hit_rate_lift": round(cache_stats["prefetch_hits"] / lookups * 100, 1) if lookups else 0,
+            "hits_per_prefetch": round(cache_stats["prefetch_hits"] / self._stats["completed"], 2)
+            if self._stats["completed"] else 0,
+            "popularity": self.tracker.get_stats(),
+        }
+
+
+# Global popularity tracker fed by the search endpoints
+popular_queries = PopularityTracker()
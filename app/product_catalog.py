@@ -0,0 +1,216 @@
+"""
+Product metadata catalog for the two-tier cache.
+
+A product's name, URLs, rating and delivery time hardly change between
+scrapes, while its price, discount and availability do. Cache entries keep
+only the volatile fields per result, plus the keys of the products they list;
+the static fields live here once per product - however many queries,
+pincodes and zones list it - and entries are joined with them when read.
+
+Products are keyed by platform SKU where the URL carries one (Amazon ASIN,
+Flipkart pid, ...), else by canonical URL and name. A product stays exactly as
+long as some cache entry object referencing it is alive - in the cache or
+still held by a reader after eviction - and its bytes count against the
+cache's memory budget like the entries' own.
+"""
+import json
+import re
+import sys
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.scrapers.base import PriceRecord, ProductResult
+from app.scrapers.normalize import normalize_batch
+
+
+# Fields held by the catalog; the rest of ProductResult (PriceRecord) is volatile
+STATIC_FIELDS = ("name", "url", "image_url", "rating", "delivery_time", "unit")
+
+# Platform SKUs found in product URLs
+SKU_PATTERNS = (
+    re.compile(r"/dp/([A-Z0-9]{10})"),                   # Amazon ASIN
+    re.compile(r"[?&]pid=([A-Z0-9]+)"),                  # Flipkart product id
+    re.compile(r"/pvid/([0-9a-fA-F-]{36})"),             # Zepto product variant
+    re.compile(r"bigbasket\.com/pd/(\d+)"),              # BigBasket SKU
+    re.compile(r"jiomart\.com/p/[^?#]+/(\d+)(?:[/?#]|$)"),  # JioMart item code
+)
+
+# Approximate fixed cost of a product record on top of its strings
+PRODUCT_OVERHEAD = 200
+
+
+def product_key(platform: str, url: str, name: str) -> str:
+    """Catalog key of a product: its SKU if the URL has one, else canonical URL and name."""
+    for pattern in SKU_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return sys.intern(f"{platform}|{match.group(1)}")
+    # Without a SKU the URL may be a search page shared by several products
+    canonical = url.split("#", 1)[0].split("?", 1)[0].rstrip("/")
+    return sys.intern(f"{platform}|{canonical}|{name}")
+
+
+def split_volatile(results: List[ProductResult]) -> List[list]:
+    """The volatile fields of each result, as stored in a cache entry's payload."""
+    return [[r.price, r.original_price, r.discount, r.available, r.unit_price] for r in results]
+
+
+def apply_prices(results: List[ProductResult], prices: Dict[str, PriceRecord]) -> List[ProductResult]:
+    """
+    Results with the volatile fields of those whose URL is in `prices` replaced.
+    
+    A record without an MRP keeps the result's previous one; discounts are
+    recomputed from price and MRP unless the record carries its own label,
+    and unit prices from the new price and the pack size in the name.
+    """
+    repriced = [(result, prices.get(result.url)) for result in results]
+    batch = normalize_batch(
+        [record.price if record else result.price for result, record in repriced],
+        [(record.original_price or result.original_price) if record else result.original_price
+         for result, record in repriced],
+        [result.name for result, _ in repriced],
+    )
+    
+    updated = []
+    columns = zip(repriced, batch.mrp, batch.discount_labels(), batch.unit_price)
+    for (result, record), mrp, discount, unit_price in columns:
+        if record is not None:
+            result = ProductResult(
+                name=result.name,
+                price=record.price,
+                original_price=mrp,
+                discount=record.discount or discount,
+                platform=result.platform,
+                url=result.url,
+                image_url=result.image_url,
+                rating=result.rating,
+                available=record.available,
+                delivery_time=result.delivery_time,
+                unit_price=unit_price,
+                unit=result.unit,
+            )
+        updated.append(result)
+    return updated
+
+
+class ProductCatalog:
+    """
+    Static product fields, shared by every cache entry listing the product.
+    
+    Features:
+    - put() upserts a product's static fields and returns its key
+    - put() / retain() and release() count the live cache entries referencing
+      a product; a product is dropped as soon as none does, so the catalog
+      never outgrows the entries it serves
+    - join() raises KeyError for an unknown product rather than return
+      fewer results than the entry lists
+    - memory_bytes is charged against the cache's byte budget (see
+      CacheShard.evict_if_needed)
+    - join() rebuilds full ProductResults from keys and volatile fields
+    """
+    
+    def __init__(self):
+        """Initialize an empty catalog."""
+        self._products: Dict[str, tuple] = {}   # key -> static fields
+        self._refs: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()   # release() may run from a finalizer (see CacheManager._new_entry)
+        self._stats = {
+            "puts": 0,
+            "changes": 0,
+            "dropped": 0,
+        }
+    
+    @staticmethod
+    def _size(static: tuple) -> int:
+        return PRODUCT_OVERHEAD + sum(len(value) for value in static if isinstance(value, str))
+    
+    @property
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the catalog's products."""
+        return self._bytes
+    
+    def put(self, result: ProductResult) -> str:
+        """Record a result's static fields and count a reference to it. Returns the product key."""
+        key = product_key(result.platform, result.url, result.name)
+        static = tuple(getattr(result, name) for name in STATIC_FIELDS)
+        with self._lock:
+            self._stats["puts"] += 1
+            previous = self._products.get(key)
+            if previous is None:
+                self._bytes += self._size(static)
+                self._products[key] = static
+            elif previous != static:
+                self._stats["changes"] += 1
+                self._bytes += self._size(static) - self._size(previous)
+                self._products[key] = static
+            self._refs[key] = self._refs.get(key, 0) + 1
+        return key
+    
+    def retain(self, keys: Iterable[str]):
+        """Count one more cache entry referencing each key."""
+        with self._lock:
+            for key in keys:
+                self._refs[key] = self._refs.get(key, 0) + 1
+    
+    def release(self, keys: Iterable[str]):
+        """Count one less cache entry referencing each key, dropping products no entry lists any more."""
+        with self._lock:
+            for key in keys:
+                refs = self._refs.get(key, 0) - 1
+                if refs > 0:
+                    self._refs[key] = refs
+                    continue
+                self._refs.pop(key, None)
+                static = self._products.pop(key, None)
+                if static is not None:
+                    self._bytes -= self._size(static)
+                    self._stats["dropped"] += 1
+    
+    def static(self, key: str) -> Optional[tuple]:
+        """Static fields of a product, in STATIC_FIELDS order."""
+        return self._products.get(key)
+    
+    def join(self, platform: str, keys: Iterable[str], volatile: Iterable[list]) -> List[ProductResult]:
+        """
+        Full results from product keys and their volatile fields.
+        
+        Raises:
+            KeyError: if a product is not in the catalog (its entry was not
+                holding a reference to it)
+        """
+        results = []
+        for key, (price, original_price, discount, available, unit_price) in zip(keys, volatile):
+            static = self.static(key)
+            if static is None:
+                raise KeyError(f"Product {key!r} is not in the catalog")
+            name, url, image_url, rating, delivery_time, unit = static
+            results.append(ProductResult(
+                name=name,
+                price=price,
+                original_price=original_price,
+                discount=discount,
+                platform=platform,
+                url=url,
+                image_url=image_url,
+                rating=rating,
+                available=available,
+                delivery_time=delivery_time,
+                unit_price=unit_price,
+                unit=unit,
+            ))
+        return results
+    
+    def join_payload(self, platform: str, keys: Iterable[str], payload: bytes) -> List[ProductResult]:
+        """join() for a JSON-encoded volatile payload."""
+        return self.join(platform, keys, json.loads(payload))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get catalog size and churn."""
+        with self._lock:
+            return {
+                "products": len(self._products),
+                "referenced": len(self._refs),
+                "memory_bytes": self._bytes,
+                **self._stats,
+            }
@@ -0,0 +1,92 @@
+"""
+Canonical form of search queries, used for cache and single-flight keys.
+
+"Amul Butter 500g", "amul  butter 500 g", "500g amul butter" and
+"butter, amul 500gm" all canonicalise to "500g amul butter", so they share one
+cache entry and one scrape. Only keys use the canonical form - platforms are
+always searched with the user's original query.
+"""
+import re
+from functools import lru_cache
+from typing import Any, Dict
+
+from app.scrapers.normalize import canonical_quantities
+
+
+_PUNCTUATION_RE = re.compile(r"[^\w.&'’-]+")
+# Dots outside decimals, and &, ' and - that do not join two word characters ("m&m", "haldiram's", "coca-cola")
+_STRAY_MARK_RE = re.compile(r"(?<!\d)\.|\.(?!\d)|(?<!\w)[&'’-]+|[&'’-]+(?!\w)")
+
+# Spelling variants that name the same product
+SYNONYMS = {
+    "dahi": "curd",
+    "curds": "curd",
+    "eggs": "egg",
+    "tomatoes": "tomato",
+    "potatoes": "potato",
+    "onions": "onion",
+    "bananas": "banana",
+    "biscuits": "biscuit",
+    "chocolates": "chocolate",
+}
+
+# Words that never change what a query matches
+STOP_WORDS = {"an", "the", "of"}
+
+
+@lru_cache(maxsize=4096)
+def canonicalize(query: str) -> str:
+    """
+    Canonical form of a query.
+    
+    Lowercases, rewrites pack sizes to base units ("1 ltr" -> "1000ml",
+    "1kg" -> "1000g"), drops punctuation (keeping &, ' and - inside words,
+    which brand names use) and stop words, maps synonyms and sorts the
+    remaining distinct tokens.
+    """
+    text = canonical_quantities(query.lower())
+    text = _STRAY_MARK_RE.sub(" ", _PUNCTUATION_RE.sub(" ", text))
+    tokens = {SYNONYMS.get(token, token) for token in text.split() if token not in STOP_WORDS}
+    return " ".join(sorted(tokens))
+
+
+class QueryCanonicalizer:
+    """
+    Canonicaliser that also measures how many query spellings it merges.
+    
+    Features:
+    - Canonical keys via canonicalize()
+    - Counts distinct spellings vs distinct keys (the cache entries saved)
+    - Tracks at most max_tracked spellings, so memory stays bounded
+    """
+    
+    def __init__(self, max_tracked: int = 10000):
+        """Initialize with empty statistics."""
+        self.max_tracked = max_tracked
+        self._spellings: Dict[str, str] = {}   # lowercased, whitespace-collapsed query -> canonical key
+        self._keys: Dict[str, int] = {}        # canonical key -> spellings seen
+    
+    def __call__(self, query: str) -> str:
+        """Canonicalise a query and record the spelling."""
+        key = canonicalize(query)
+        spelling = " ".join(query.lower().split())
+        if spelling not in self._spellings and len(self._spellings) < self.max_tracked:
+            self._spellings[spelling] = key
+            self._keys[key] = self._keys.get(key, 0) + 1
+        return key
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get merge statistics."""
+        spellings = len(self._spellings)
+        keys = len(self._keys)
+        return {
+            "spellings": spellings,
+            "canonical_keys": keys,
+            "merged": spellings - keys,
+            "merge_rate": round((spellings - keys) / spellings * 100, 1) if spellings else 0,
+            "largest_group": max(self._keys.values(), default=0),
+        }
+
+
+# Global canonicaliser used for cache keys
+canonical_query = QueryCanonicalizer()
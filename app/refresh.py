@@ -0,0 +1,138 @@
+"""
+Background refresh queue for stale cache entries.
+
+A stale cache hit is served immediately and a refresh job is queued here
+instead of being run inside the user's request. Jobs are deduplicated by key
+(one pending refresh per platform/query/pincode) and run by a small, bounded
+pool of worker tasks, ordered by priority. Callers that want the refreshed
+data (e.g. an SSE client that asked for live updates) await the Future
+returned by enqueue().
+"""
+import asyncio
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+
+# Lower runs sooner
+REFRESH_PRIORITY = 10
+
+
+class RefreshQueue:
+    """
+    Deduplicated priority queue drained by a bounded worker pool.
+    
+    Features:
+    - One pending job per key; repeat enqueues share its Future
+    - Fixed number of workers, so refreshes never take more than that many scrape slots
+    - Bounded backlog; jobs beyond it are dropped (the entry just expires instead)
+    - Queue wait and end-to-end refresh lag metrics
+    """
+    
+    def __init__(self, workers: int = 2, max_pending: int = 200):
+        """Initialize the queue. Workers start on first enqueue, in the running loop."""
+        self.workers = workers
+        self.max_pending = max_pending
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._seq = itertools.count()
+        self._stats = {
+            "enqueued": 0,
+            "deduplicated": 0,
+            "dropped": 0,
+            "completed": 0,
+            "failed": 0,
+        }
+        self._wait_total = 0.0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+    
+    def _ensure_workers(self) -> asyncio.AbstractEventLoop:
+        """Start the worker pool in the running loop (again, if the loop changed)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.PriorityQueue()
+            self._pending = {}
+            self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        return loop
+    
+    def enqueue(
+        self,
+        key: Hashable,
+        job: Callable[[], Awaitable[Any]],
+        priority: int = REFRESH_PRIORITY,
+    ) -> Optional[asyncio.Future]:
+        """
+        Queue job() to run in the background unless a job for key is already pending.
+        
+        Returns:
+            Future resolving to the job's result (None if it failed), or None if
+            the backlog is full and the job was dropped
+        """
+        loop = self._ensure_workers()
+        
+        future = self._pending.get(key)
+        if future is not None:
+            self._stats["deduplicated"] += 1
+            return future
+        
+        if len(self._pending) >= self.max_pending:
+            self._stats["dropped"] += 1
+            return None
+        
+        future = loop.create_future()
+        self._pending[key] = future
+        self._queue.put_nowait((priority, next(self._seq), key, job, time.monotonic()))
+        self._stats["enqueued"] += 1
+        return future
+    
+    def is_pending(self, key: Hashable) -> bool:
+        """Check whether a refresh for key is queued or running."""
+        return key in self._pending
+    
+    async def _worker(self):
+        """Run queued jobs one at a time."""
+        while True:
+            _, _, key, job, queued_at = await self._queue.get()
+            started_at = time.monotonic()
+            result = None
+            try:
+                result = await job()
+                self._stats["completed"] += 1
+            except Exception as e:
+                self._stats["failed"] += 1
+                print(f"Refresh {key}: ERROR - {e}")
+            finally:
+                lag = time.monotonic() - queued_at
+                self._wait_total += started_at - queued_at
+                self._lag_total += lag
+                self._lag_max = max(self._lag_max, lag)
+                
+                future = self._pending.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_result(result)
+                self._queue.task_done()
+    
+    async def join(self):
+        """Wait until every queued job has finished."""
+        if self._queue is not None:
+            await self._queue.join()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue statistics."""
+        finished = self._stats["completed"] + self._stats["failed"]
+        return {
+            "workers": self.workers,
+            "pending": len(self._pending),
+            **self._stats,
+            "avg_wait_ms": round(self._wait_total / finished * 1000, 1) if finished else 0,
+            "avg_lag_ms": round(self._lag_total / finished * 1000, 1) if finished else 0,
+            "max_lag_ms": round(self._lag_max * 1000, 1),
+        }
+
+
+# Global refresh queue
+refresh_queue = RefreshQueue(workers=2)
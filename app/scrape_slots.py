@@ -0,0 +1,91 @@
+"""
+Global limits on concurrent scrapes.
+
+Every search path (single, streaming, bulk, background refresh of misses)
+scrapes through fetch_platform, which holds a slot here for the duration of
+each scrape. Single-flight runs first, so identical scrapes share one slot.
+Browser (Playwright) platforms launch a Chromium each and get a smaller
+pool of their own on top of the overall cap, so a bulk search of a long
+shopping list queues its scrapes instead of starting dozens of browsers.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+
+class ScrapeSlots:
+    """
+    Counting limits on in-flight scrapes.
+    
+    Features:
+    - At most max_scrapes scrapes at once, of which at most browser_slots
+      on browser platforms
+    - Browser scrapes take their browser slot before an overall one, so they
+      never hold an overall slot while waiting for a browser
+    - Bound to the running event loop (recreated if the loop changes)
+    - In-flight, peak and queued counters
+    """
+    
+    def __init__(self, max_scrapes: int = 32, browser_slots: int = 6):
+        """Initialize the limits. Semaphores are created on first use, in the running loop."""
+        self.max_scrapes = max_scrapes
+        self.browser_slots = browser_slots
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._scrapes: Optional[asyncio.Semaphore] = None
+        self._browsers: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        self._stats = {
+            "acquired": 0,
+            "queued": 0,
+            "peak": 0,
+        }
+    
+    def _ensure_loop(self):
+        """Create the semaphores for the running loop (again, if the loop changed)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._scrapes = asyncio.Semaphore(self.max_scrapes)
+            self._browsers = asyncio.Semaphore(self.browser_slots)
+            self._in_flight = 0
+    
+    @asynccontextmanager
+    async def hold(self, browser: bool = False):
+        """Hold a scrape slot, and a browser slot first for a browser platform."""
+        self._ensure_loop()
+        limits = [self._browsers, self._scrapes] if browser else [self._scrapes]
+        if any(limit.locked() for limit in limits):
+            self._stats["queued"] += 1
+        
+        acquired = []
+        try:
+            for limit in limits:
+                await limit.acquire()
+                acquired.append(limit)
+            self._in_flight += 1
+            self._stats["acquired"] += 1
+            self._stats["peak"] = max(self._stats["peak"], self._in_flight)
+            try:
+                yield
+            finally:
+                self._in_flight -= 1
+        finally:
+            for limit in reversed(acquired):
+                limit.release()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limit and usage statistics."""
+        return {
+            "max_scrapes": self.max_scrapes,
+            "browser_slots": self.browser_slots,
+            "in_flight": self._in_flight,
+            **self._stats,
+        }
+
+
+# Global scrape limits
+scrape_slots = ScrapeSlots(
+    max_scrapes=int(os.environ.get("PRICEHUNT_MAX_SCRAPES", 32)),
+    browser_slots=int(os.environ.get("PRICEHUNT_BROWSER_SLOTS", 6)),
+)
@@ -2,7 +2,40 @@
 from typing import Optional, List
 import re
 from bs4 import BeautifulSoup
-from .base import BaseScraper, ProductResult
+from .base import BaseScraper, PriceRecord, ProductResult, ScraperBlockedError, price_from_product_page
+from .normalize import parse_price
+from .selector_cache import selector_cache
+
+
+# Buy-box price on a product page, most specific first
+PRODUCT_PRICE_SELECTORS = [
+    '#corePriceDisplay_desktop_feature_div .priceToPay .a-offscreen',
+    '#corePrice_feature_div .a-price:not(.a-text-price) .a-offscreen',
+    '#apex_desktop .a-price:not(.a-text-price) .a-offscreen',
+]
+PRODUCT_MRP_SELECTOR = '#corePriceDisplay_desktop_feature_div .a-text-price .a-offscreen, #corePrice_feature_div .a-text-price .a-offscreen'
+
+
+def parse_product_page(html: str) -> Optional[PriceRecord]:
+    """Buy-box price, M.R.P. and availability from an Amazon product page."""
+    soup = BeautifulSoup(html, "lxml")
+    price = 0.0
+    for selector in PRODUCT_PRICE_SELECTORS:
+        price_elem = soup.select_one(selector)
+        if price_elem:
+            price = parse_price(price_elem.get_text())
+            if price > 0:
+                break
+    if price <= 0:
+        return price_from_product_page(html)
+    
+    mrp_elem = soup.select_one(PRODUCT_MRP_SELECTOR)
+    availability = soup.select_one('#availability')
+    return PriceRecord(
+        price=price,
+        original_price=(parse_price(mrp_elem.get_text()) or None) if mrp_elem else None,
+        available=not (availability and "unavailable" in availability.get_text().lower()),
+    )
 
 
 class AmazonScraper(BaseScraper):
@@ -10,6 +43,8 @@ class AmazonScraper(BaseScraper):
     
     PLATFORM_NAME = "Amazon"
     BASE_URL = "https://www.amazon.in"
+    RESULT_SELECTORS = ['[data-component-type="s-search-result"]', '.s-result-item[data-asin]']
+    PRODUCT_URL_PATTERNS = ("/dp/",)
     
     def __init__(self, pincode: str = "560087"):
         super().__init__(pincode)
@@ -21,6 +56,10 @@ class AmazonScraper(BaseScraper):
             "Referer": "https://www.amazon.in/",
         })
         return headers
+    
+    def extract_price_record(self, html: str) -> Optional[PriceRecord]:
+        """Read the buy box of an Amazon product page."""
+        return parse_product_page(html)
         
     async def search(self, query: str) -> List[ProductResult]:
         """Search for products on regular Amazon India."""
@@ -36,15 +75,17 @@ class AmazonScraper(BaseScraper):
                 }
                 
                 response = await client.get(search_url, cookies=cookies)
+                self.check_blocked(response)
                 
                 if response.status_code == 200:
                     soup = BeautifulSoup(response.text, "lxml")
-                    products = soup.select('[data-component-type="s-search-result"]')[:15]
+                    _, products = selector_cache.select(
+                        self.PLATFORM_NAME,
+                        self.RESULT_SELECTORS,
+                        lambda selector: soup.select(selector)[:15],
+                    )
                     
-                    if not products:
-                        products = soup.select('.s-result-item[data-asin]')[:15]
-                    
-                    for product in products:
+                    for product in products or []:
                         try:
                             result = self._parse_product(product)
                             if result and result.price > 0:
@@ -52,10 +93,12 @@ class AmazonScraper(BaseScraper):
                         except Exception:
                             continue
                             
+        except ScraperBlockedError:
+            raise
         except Exception as e:
             print(f"Amazon search error: {e}")
         
-        return results[:5]
+        return self.finalize_results(results[:5])
     
     def _parse_product(self, product) -> Optional[ProductResult]:
         """Parse a product element from search results."""
@@ -122,19 +165,9 @@ class AmazonScraper(BaseScraper):
             if price <= 0:
                 return None
             
-            # Get original price
-            original_price = None
+            # Get original price (discount is filled in per page by finalize_results)
             orig_elem = product.select_one('.a-price.a-text-price .a-offscreen')
-            if orig_elem:
-                orig = self.parse_price(orig_elem.get_text())
-                if orig > price:
-                    original_price = orig
-            
-            # Discount
-            discount = None
-            if original_price and original_price > price:
-                discount_pct = int(((original_price - price) / original_price) * 100)
-                discount = f"{discount_pct}% off"
+            original_price = self.parse_price(orig_elem.get_text()) if orig_elem else None
             
             # Image
             image_elem = product.select_one('img.s-image')
@@ -153,7 +186,7 @@ class AmazonScraper(BaseScraper):
                 name=name[:120],
                 price=price,
                 original_price=original_price,
-                discount=discount,
+                discount=None,
                 platform=self.PLATFORM_NAME,
                 url=url,
                 image_url=image_url,
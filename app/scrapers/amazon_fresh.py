@@ -8,6 +8,7 @@ import re
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 from .base import BaseScraper, ProductResult
+from .selector_cache import selector_cache
 
 
 class AmazonFreshScraper(BaseScraper):
@@ -16,11 +17,13 @@ class AmazonFreshScraper(BaseScraper):
     PLATFORM_NAME = "Amazon Fresh"
     BASE_URL = "https://www.amazon.in"
     USE_BROWSER = True
+    RESULT_SELECTORS = ['[data-component-type="s-search-result"]', '.s-result-item[data-asin]']
+    # No PRODUCT_URL_PATTERNS: Fresh prices depend on the delivery address set on the session, which plain HTTP does not carry
     _executor = ThreadPoolExecutor(max_workers=2)
     
     def __init__(self, pincode: str = "560087"):
         super().__init__(pincode)
-        
+    
     async def search(self, query: str) -> List[ProductResult]:
         """Search for products on Amazon Fresh using nowstore."""
         try:
@@ -56,8 +59,8 @@ class AmazonFreshScraper(BaseScraper):
                 page = context.new_page()
                 
                 print(f"Amazon Fresh: Searching with URL {search_url}")
-                page.goto(search_url, wait_until='domcontentloaded', timeout=20000)
-                page.wait_for_timeout(3000)  # Give time for products to load
+                page.goto(search_url, wait_until='domcontentloaded', timeout=self.nav_timeout(20000))
+                page.wait_for_timeout(self.pause(3000))  # Give time for products to load
                 
                 # Verify we're on nowstore
                 current_url = page.url
@@ -69,10 +72,12 @@ class AmazonFreshScraper(BaseScraper):
                 soup = BeautifulSoup(html, 'lxml')
                 
                 # Find product containers
-                products = soup.select('[data-component-type="s-search-result"]')[:15]
-                
-                if not products:
-                    products = soup.select('.s-result-item[data-asin]')[:15]
+                _, products = selector_cache.select(
+                    self.PLATFORM_NAME,
+                    self.RESULT_SELECTORS,
+                    lambda selector: soup.select(selector)[:15],
+                )
+                products = products or []
                 
                 print(f"Amazon Fresh: Found {len(products)} product containers")
                 
@@ -84,6 +89,8 @@ class AmazonFreshScraper(BaseScraper):
                     except Exception as e:
                         continue
                 
+                self.finalize_results(results)
+                
                 context.close()
                 browser.close()
                 
@@ -167,19 +174,9 @@ class AmazonFreshScraper(BaseScraper):
             if price <= 0:
                 return None
             
-            # Get original price (MRP)
-            original_price = None
+            # Get original price (discount is filled in per page by finalize_results)
             orig_elem = product.select_one('.a-price.a-text-price .a-offscreen')
-            if orig_elem:
-                orig = self.parse_price(orig_elem.get_text())
-                if orig > price:
-                    original_price = orig
-            
-            # Discount
-            discount = None
-            if original_price and original_price > price:
-                discount_pct = int(((original_price - price) / original_price) * 100)
-                discount = f"{discount_pct}% off"
+            original_price = self.parse_price(orig_elem.get_text()) if orig_elem else None
             
             # Image
             image_elem = product.select_one('img.s-image')
@@ -198,7 +195,7 @@ class AmazonFreshScraper(BaseScraper):
                 name=name[:120],
                 price=price,
                 original_price=original_price,
-                discount=discount,
+                discount=None,
                 platform=self.PLATFORM_NAME,
                 url=url,
                 image_url=image_url,
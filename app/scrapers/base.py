@@ -1,15 +1,35 @@
 """Base scraper class with robust scraping support."""
 import asyncio
+import json
 import random
+import re
+import sys
 from abc import ABC, abstractmethod
-from typing import Optional, List
+from enum import Enum
+from typing import Dict, Optional, List
 from dataclasses import dataclass
 from contextlib import asynccontextmanager
 from fake_useragent import UserAgent
 import httpx
+from .normalize import parse_price, normalize_batch
+from .store_map import find_store_id
+from .deadline import Deadline
 
 
-@dataclass
+class ScrapeOutcome(str, Enum):
+    """How a platform scrape ended."""
+    OK = "ok"            # results found
+    EMPTY = "empty"      # the platform genuinely has no results
+    TIMEOUT = "timeout"
+    BLOCKED = "blocked"  # bot wall, CAPTCHA or rate limit
+    ERROR = "error"
+
+
+class ScraperBlockedError(Exception):
+    """Raised when a platform refuses to serve the scraper (bot wall, CAPTCHA, rate limit)."""
+
+
+@dataclass(slots=True)
 class ProductResult:
     """Represents a product search result."""
     name: str
@@ -22,6 +42,103 @@ class ProductResult:
     rating: Optional[float]
     available: bool = True
     delivery_time: Optional[str] = None
+    unit_price: Optional[float] = None   # price per kg / l / pc, from the pack size in the name
+    unit: Optional[str] = None           # what unit_price is quoted per: "kg", "l" or "pc"
+    
+    def __post_init__(self):
+        # Platform, delivery-time and unit strings repeat on every result - share one copy
+        self.platform = sys.intern(self.platform)
+        if self.delivery_time is not None:
+            self.delivery_time = sys.intern(self.delivery_time)
+        if self.unit is not None:
+            self.unit = sys.intern(self.unit)
+    
+    def to_dict(self) -> dict:
+        """Shallow dict of the result (no recursive copy like dataclasses.asdict)."""
+        return {
+            "name": self.name,
+            "price": self.price,
+            "original_price": self.original_price,
+            "discount": self.discount,
+            "platform": self.platform,
+            "url": self.url,
+            "image_url": self.image_url,
+            "rating": self.rating,
+            "available": self.available,
+            "delivery_time": self.delivery_time,
+            "unit_price": self.unit_price,
+            "unit": self.unit,
+        }
+
+
+@dataclass(slots=True)
+class PriceRecord:
+    """The volatile part of a ProductResult - all a re-pricing refresh carries."""
+    price: float
+    original_price: Optional[float] = None
+    discount: Optional[str] = None
+    available: bool = True
+
+
+# Structured data blocks in product pages
+_JSON_LD_RE = re.compile(r'<script[^>]+type="application/ld\+json"[^>]*>(.*?)</script>', re.S | re.I)
+_META_PRICE_RE = re.compile(
+    r'<meta[^>]+(?:property="product:price:amount"|itemprop="price")[^>]+content="([\d.,]+)"', re.I
+)
+
+
+def _find_offer(payload, depth: int = 6) -> Optional[dict]:
+    """First schema.org Offer / AggregateOffer carrying a price in a JSON-LD payload."""
+    if depth < 0:
+        return None
+    if isinstance(payload, list):
+        children = payload
+    elif isinstance(payload, dict):
+        if "price" in payload or "lowPrice" in payload:
+            return payload
+        children = [payload[key] for key in ("offers", "@graph", "mainEntity") if key in payload]
+    else:
+        return None
+    for child in children:
+        offer = _find_offer(child, depth - 1)
+        if offer is not None:
+            return offer
+    return None
+
+
+def price_from_product_page(html: str) -> Optional["PriceRecord"]:
+    """
+    Price and availability from a product page's JSON-LD Product offer,
+    falling back to price meta tags (availability then unknown, assumed in stock).
+    """
+    for block in _JSON_LD_RE.findall(html):
+        try:
+            offer = _find_offer(json.loads(block))
+        except ValueError:
+            continue
+        if offer is None:
+            continue
+        price = parse_price(str(offer.get("price") or offer.get("lowPrice") or ""))
+        if price > 0:
+            availability = str(offer.get("availability", ""))
+            return PriceRecord(
+                price=price,
+                available="OutOfStock" not in availability and "SoldOut" not in availability,
+            )
+    match = _META_PRICE_RE.search(html)
+    if match:
+        price = parse_price(match.group(1))
+        if price > 0:
+            return PriceRecord(price=price)
+    return None
+
+
+def to_jsonable(obj):
+    """`default` hook for json.dumps that serialises ProductResult without asdict."""
+    if isinstance(obj, ProductResult):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
 
 
 class BaseScraper(ABC):
@@ -31,11 +148,32 @@ class BaseScraper(ABC):
     BASE_URL: str = ""
     USE_BROWSER: bool = False  # Disabled by default - use HTTP first
     
+    # Responses that mean the platform is refusing us rather than returning a page
+    BLOCKED_STATUS_CODES = {403, 429, 503}
+    BLOCKED_MARKERS = ("captcha", "/errors/validatecaptcha", "are you a robot", "access denied")
+    
+    # URL fragments of the platform's serviceability / store-selection API calls -
+    # specific endpoints only, since a matching response's store id becomes a cache key scope
+    SERVICEABILITY_PATTERNS: tuple = ()
+    
+    # URL fragments of product pages reprice() can read over plain HTTP; empty disables it
+    PRODUCT_URL_PATTERNS: tuple = ()
+    REPRICE_CONCURRENCY = 4
+    REPRICE_TIMEOUT = 10.0
+    
+    # Under a request deadline: time kept back from navigation for extraction,
+    # and the share of the time left a fixed render wait may take
+    EXTRACT_RESERVE_MS = 1000
+    PAUSE_SHARE = 0.5
+    
     def __init__(self, pincode: str = "560087"):
         self.pincode = pincode
         self.ua = UserAgent()
         self.timeout = 30.0
         self._browser_available = None
+        self.store_id: Optional[str] = None  # serving dark store, if a serviceability response named one
+        self.deadline: Optional[Deadline] = None  # request latency budget, set by the orchestrator
+        self.budget_cut = False                   # a timeout or wait was shortened to fit the deadline
         
     def get_headers(self) -> dict:
         """Get randomized headers to avoid detection."""
@@ -56,9 +194,25 @@ class BaseScraper(ABC):
             "sec-ch-ua-platform": '"macOS"',
         }
     
+    def nav_timeout(self, cap_ms: int) -> int:
+        """Navigation / click timeout in ms: cap_ms, or less to finish inside the deadline."""
+        if self.deadline is None:
+            return cap_ms
+        timeout = self.deadline.timeout_ms(cap_ms, self.EXTRACT_RESERVE_MS)
+        self.budget_cut |= timeout < cap_ms
+        return timeout
+    
+    def pause(self, cap_ms: int) -> int:
+        """Fixed render wait in ms: cap_ms, or a share of what is left of the deadline."""
+        if self.deadline is None:
+            return cap_ms
+        wait = self.deadline.pause_ms(cap_ms, self.PAUSE_SHARE)
+        self.budget_cut |= wait < cap_ms
+        return wait
+    
     async def delay(self, min_sec: float = 0.5, max_sec: float = 1.5):
         """Add random delay to avoid rate limiting."""
-        await asyncio.sleep(random.uniform(min_sec, max_sec))
+        await asyncio.sleep(self.pause(int(random.uniform(min_sec, max_sec) * 1000)) / 1000)
     
     async def check_browser_available(self) -> bool:
         """Check if Playwright browser is available."""
@@ -104,7 +258,7 @@ class BaseScraper(ABC):
             )
             
             page = await context.new_page()
-            page.set_default_timeout(30000)
+            page.set_default_timeout(self.nav_timeout(30000))
             
             try:
                 yield page
@@ -114,34 +268,140 @@ class BaseScraper(ABC):
         finally:
             await playwright.stop()
     
+    def capture_store(self, url: str, payload) -> Optional[str]:
+        """Record the serving store id from a serviceability response payload."""
+        if any(pattern in url for pattern in self.SERVICEABILITY_PATTERNS):
+            store_id = find_store_id(payload)
+            if store_id is not None:
+                self.store_id = store_id
+        return self.store_id
+    
+    def watch_serviceability(self, page, sync: bool = False):
+        """Capture the serving store from JSON responses a Playwright page (async or sync API) receives."""
+        if not self.SERVICEABILITY_PATTERNS:
+            return
+        
+        def wanted(response) -> bool:
+            return (any(pattern in response.url for pattern in self.SERVICEABILITY_PATTERNS)
+                    and "json" in response.headers.get("content-type", ""))
+        
+        if sync:
+            def on_response(response):
+                if wanted(response):
+                    try:
+                        self.capture_store(response.url, response.json())
+                    except Exception:
+                        pass
+        else:
+            async def on_response(response):
+                if wanted(response):
+                    try:
+                        self.capture_store(response.url, await response.json())
+                    except Exception:
+                        pass
+        
+        page.on("response", on_response)
+    
     @abstractmethod
     async def search(self, query: str) -> List["ProductResult"]:
         """Search for products on the platform."""
         pass
     
+    def location_cookies(self) -> Dict[str, str]:
+        """Cookies that select the pincode's store on a plain HTTP request; sent with reprice() fetches."""
+        return {}
+    
+    def can_reprice(self, url: str) -> bool:
+        """Check if reprice() can read a result's URL (a product page, not a search page)."""
+        return any(pattern in url for pattern in self.PRODUCT_URL_PATTERNS)
+    
+    def extract_price_record(self, html: str) -> Optional["PriceRecord"]:
+        """Read price and availability from a product page."""
+        return price_from_product_page(html)
+    
+    async def reprice(self, urls: List[str]) -> Dict[str, "PriceRecord"]:
+        """
+        Current price and availability of known products, keyed by URL.
+        
+        Fetches each product page over plain HTTP - no browser, navigation or
+        waits - at most REPRICE_CONCURRENCY at a time on one connection pool,
+        carrying location_cookies() so the page is priced for the same store.
+        URLs that cannot be repriced or parsed are left out of the result.
+        
+        Raises:
+            ScraperBlockedError: if the platform refused every request
+        """
+        wanted = [url for url in dict.fromkeys(urls) if self.can_reprice(url)]
+        if not wanted:
+            return {}
+        
+        semaphore = asyncio.Semaphore(self.REPRICE_CONCURRENCY)
+        prices: Dict[str, PriceRecord] = {}
+        blocked = 0
+        
+        async with httpx.AsyncClient(
+            headers=self.get_headers(),
+            cookies=self.location_cookies(),
+            timeout=self.REPRICE_TIMEOUT,
+            follow_redirects=True,
+        ) as client:
+            async def fetch(url: str):
+                nonlocal blocked
+                async with semaphore:
+                    try:
+                        response = await client.get(url)
+                        self.check_blocked(response)
+                        response.raise_for_status()
+                    except ScraperBlockedError:
+                        blocked += 1
+                        return
+                    except httpx.HTTPError as e:
+                        print(f"{self.PLATFORM_NAME}: reprice {url} failed: {e}")
+                        return
+                record = self.extract_price_record(response.text)
+                if record is not None:
+                    prices[url] = record
+            
+            await asyncio.gather(*(fetch(url) for url in wanted))
+        
+        if blocked == len(wanted):
+            raise ScraperBlockedError(f"{self.PLATFORM_NAME}: re-pricing blocked")
+        return prices
+    
     async def get_client(self) -> httpx.AsyncClient:
         """Get an async HTTP client."""
         return httpx.AsyncClient(
             headers=self.get_headers(),
-            timeout=self.timeout,
+            timeout=self.nav_timeout(int(self.timeout * 1000)) / 1000,
             follow_redirects=True,
         )
     
+    def check_blocked(self, response: httpx.Response):
+        """Raise ScraperBlockedError if the response is a bot wall or rate limit."""
+        if response.status_code in self.BLOCKED_STATUS_CODES:
+            raise ScraperBlockedError(f"{self.PLATFORM_NAME}: HTTP {response.status_code}")
+        head = response.text[:5000].lower()
+        if any(marker in head for marker in self.BLOCKED_MARKERS):
+            raise ScraperBlockedError(f"{self.PLATFORM_NAME}: CAPTCHA page")
+    
     def parse_price(self, price_str: str) -> float:
         """Parse price string to float."""
-        if not price_str:
-            return 0.0
-        # Remove currency symbols, commas, and whitespace
-        import re
-        cleaned = re.sub(r'[₹,\s]', '', price_str)
-        # Extract first number sequence with optional decimal
-        match = re.search(r'(\d+(?:\.\d+)?)', cleaned)
-        if match:
-            try:
-                return float(match.group(1))
-            except ValueError:
-                pass
-        return 0.0
+        return parse_price(price_str)
+    
+    def finalize_results(self, results: List["ProductResult"]) -> List["ProductResult"]:
+        """Normalise MRPs, discounts and unit prices (from pack sizes in the names) for a page of results in one batch."""
+        batch = normalize_batch(
+            [r.price for r in results],
+            [r.original_price for r in results],
+            [r.name for r in results],
+        )
+        columns = zip(results, batch.mrp, batch.discount_labels(), batch.unit_price, batch.unit_labels())
+        for result, mrp, discount, unit_price, unit in columns:
+            result.original_price = mrp
+            result.discount = discount
+            result.unit_price = unit_price
+            result.unit = unit
+        return results
     
     async def safe_search(self, query: str) -> List["ProductResult"]:
         """Wrapper for search with error handling."""
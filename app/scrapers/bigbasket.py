@@ -2,8 +2,10 @@
 
 Uses Playwright for browser-based scraping to bypass anti-bot protection.
 """
-from typing import List
+from typing import Dict, List
 from .base import BaseScraper, ProductResult
+from .normalize import normalize_batch
+from .selector_cache import selector_cache
 
 
 class BigBasketScraper(BaseScraper):
@@ -11,9 +13,28 @@ class BigBasketScraper(BaseScraper):
     
     PLATFORM_NAME = "BigBasket"
     BASE_URL = "https://www.bigbasket.com"
+    USE_BROWSER = True
+    SERVICEABILITY_PATTERNS = ("serviceab", "/set-current-address", "/store-selection")
+    PRODUCT_URL_PATTERNS = ("/pd/",)
+    
+    # Product card selectors, in cascade order
+    CARD_SELECTORS = [
+        '[data-qa="product"]',
+        '[class*="PaginateItems"] > li',
+        '.product-card',
+        '[class*="ProductCard"]',
+        'li[class*="product"]',
+        '.prod-deck',
+        '[class*="SKUDeck"]',
+        '[class*="ProductListing"] > div',
+    ]
     
     def __init__(self, pincode: str = "560087"):
         super().__init__(pincode)
+    
+    def location_cookies(self) -> Dict[str, str]:
+        """BigBasket picks the store from the pincode cookie, in the browser and over plain HTTP alike."""
+        return {"_bb_pin_code": self.pincode}
         
     async def search(self, query: str) -> List[ProductResult]:
         """Search for products on BigBasket using browser automation."""
@@ -44,36 +65,35 @@ class BigBasketScraper(BaseScraper):
             
             # Set location cookie
             await context.add_cookies([{
-                'name': '_bb_pin_code',
-                'value': self.pincode,
+                'name': name,
+                'value': value,
                 'domain': '.bigbasket.com',
                 'path': '/'
-            }])
+            } for name, value in self.location_cookies().items()])
             
             page = await context.new_page()
-            await page.goto(search_url, wait_until='networkidle', timeout=20000)
-            await page.wait_for_timeout(3000)  # Wait for products to load
+            self.watch_serviceability(page)
+            await page.goto(search_url, wait_until='networkidle', timeout=self.nav_timeout(20000))
+            await page.wait_for_timeout(self.pause(3000))  # Wait for products to load
+            
+            # Try the card selector that worked last time first
+            selectors, preferred = selector_cache.order(self.PLATFORM_NAME, self.CARD_SELECTORS)
             
             # Extract product data using JavaScript
-            products_data = await page.evaluate('''() => {
+            extracted = await page.evaluate('''(selectors) => {
                 const products = [];
                 
                 // BigBasket uses a variety of selectors for product cards
-                const selectors = [
-                    '[data-qa="product"]',
-                    '[class*="PaginateItems"] > li',
-                    '.product-card',
-                    '[class*="ProductCard"]',
-                    'li[class*="product"]',
-                    '.prod-deck',
-                    '[class*="SKUDeck"]',
-                    '[class*="ProductListing"] > div'
-                ];
-                
                 let cards = [];
+                let matched = null;
+                let probes = 0;
                 for (const selector of selectors) {
+                    probes++;
                     cards = document.querySelectorAll(selector);
-                    if (cards.length > 0) break;
+                    if (cards.length > 0) {
+                        matched = selector;
+                        break;
+                    }
                 }
                 
                 // If no cards found, try finding elements with price-like text
@@ -171,28 +191,36 @@ class BigBasketScraper(BaseScraper):
                     }
                 });
                 
-                return products.slice(0, 10);
-            }''')
+                return {matched: matched, probes: probes, products: products.slice(0, 10)};
+            }''', selectors)
+            
+            selector_cache.record(self.PLATFORM_NAME, extracted.get('matched'), extracted.get('probes', 0), preferred)
+            products_data = extracted.get('products', [])
+            
+            # Normalise prices for the whole page at once
+            batch = normalize_batch(
+                [p.get('price') for p in products_data],
+                [p.get('mrp') for p in products_data],
+                [p.get('name') for p in products_data],
+            )
             
             # Parse extracted data
-            for p in products_data:
-                if p.get('name') and p.get('price', 0) > 0:
-                    original_price = p.get('mrp') if p.get('mrp', 0) > 0 else None
-                    discount = None
-                    if original_price:
-                        discount = f"{int((original_price - p['price']) / original_price * 100)}% off"
-                    
+            columns = zip(products_data, batch.price, batch.mrp, batch.discount_labels(), batch.unit_price, batch.unit_labels())
+            for p, price, mrp, discount, unit_price, unit in columns:
+                if p.get('name') and price > 0:
                     results.append(ProductResult(
                         name=p['name'][:120],
-                        price=p['price'],
-                        original_price=original_price,
+                        price=price,
+                        original_price=mrp,
                         discount=discount,
                         platform=self.PLATFORM_NAME,
                         url=p.get('url', self.BASE_URL),
                         image_url=p.get('image'),
                         rating=None,
                         available=True,
-                        delivery_time="2-4 hours"
+                        delivery_time="2-4 hours",
+                        unit_price=unit_price,
+                        unit=unit
                     ))
             
             print(f"BigBasket: Found {len(results)} products")
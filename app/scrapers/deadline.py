@@ -0,0 +1,59 @@
+"""
+Request deadlines for latency-bounded searches.
+
+A search may carry a latency budget (?max_wait_ms=). The orchestrator turns
+it into a Deadline and hands it to every scraper it starts; scrapers size
+their navigation timeouts and fixed render waits from what is left of it
+instead of from their usual constants, so a scrape either finishes inside
+the budget or gives up in time for the response to go out with the
+platforms that did answer.
+"""
+import time
+from typing import Callable
+
+
+class Deadline:
+    """
+    A monotonic point in time by which a request must be answered.
+    
+    Features:
+    - remaining() / expired for the time left
+    - timeout_ms(): a navigation/click timeout capped to the time left, less
+      a reserve for extracting results, never 0 (Playwright's "no timeout")
+    - pause_ms(): a fixed wait shrunk to a share of the time left
+    """
+    
+    # Floor for a shrunken timeout
+    MIN_TIMEOUT_MS = 100
+    
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic):
+        """Start a deadline `seconds` from now."""
+        self.clock = clock
+        self.budget = seconds
+        self.at = clock() + seconds
+    
+    @classmethod
+    def from_ms(cls, ms: int) -> "Deadline":
+        """Deadline `ms` milliseconds from now."""
+        return cls(ms / 1000)
+    
+    def remaining(self) -> float:
+        """Seconds left (0 once expired)."""
+        return max(0.0, self.at - self.clock())
+    
+    @property
+    def expired(self) -> bool:
+        return self.clock() >= self.at
+    
+    def timeout(self, cap: float) -> float:
+        """`cap` seconds, or the time left if that is shorter."""
+        return min(cap, self.remaining())
+    
+    def timeout_ms(self, cap_ms: int, reserve_ms: int = 0) -> int:
+        """A timeout of at most `cap_ms` that ends `reserve_ms` before the deadline."""
+        available = int(self.remaining() * 1000) - reserve_ms
+        return cap_ms if available >= cap_ms else max(self.MIN_TIMEOUT_MS, available)
+    
+    def pause_ms(self, cap_ms: int, share: float) -> int:
+        """A wait of at most `cap_ms`, taking no more than `share` of the time left."""
+        return min(cap_ms, int(self.remaining() * 1000 * share))
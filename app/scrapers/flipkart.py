@@ -5,7 +5,8 @@ URL format: https://www.flipkart.com/search?q={query}&marketplace=FLIPKART
 from typing import Optional, List
 import re
 from bs4 import BeautifulSoup
-from .base import BaseScraper, ProductResult
+from .base import BaseScraper, ProductResult, ScraperBlockedError
+from .normalize import extract_prices
 
 
 class FlipkartScraper(BaseScraper):
@@ -13,6 +14,7 @@ class FlipkartScraper(BaseScraper):
     
     PLATFORM_NAME = "Flipkart"
     BASE_URL = "https://www.flipkart.com"
+    PRODUCT_URL_PATTERNS = ("/p/",)
     
     def __init__(self, pincode: str = "560087"):
         super().__init__(pincode)
@@ -36,11 +38,14 @@ class FlipkartScraper(BaseScraper):
         try:
             async with await self.get_client() as client:
                 response = await client.get(search_url)
+                self.check_blocked(response)
                 
                 if response.status_code == 200:
                     soup = BeautifulSoup(response.text, "lxml")
                     results = self._parse_products(soup, query)
                     
+        except ScraperBlockedError:
+            raise
         except Exception as e:
             print(f"Flipkart search error: {e}")
         
@@ -58,19 +63,7 @@ class FlipkartScraper(BaseScraper):
                 text = container.get_text(' ', strip=True)
                 
                 # Extract price
-                price_matches = re.findall(r'₹\s*([\d,]+)', text)
-                if not price_matches:
-                    continue
-                
-                prices = []
-                for p in price_matches:
-                    try:
-                        price_val = float(p.replace(',', ''))
-                        if 0 < price_val < 500000:
-                            prices.append(price_val)
-                    except:
-                        pass
-                
+                prices = extract_prices(text, max_price=500000)
                 if not prices:
                     continue
                 
@@ -109,17 +102,11 @@ class FlipkartScraper(BaseScraper):
                 # Rating
                 rating = self._extract_rating(container)
                 
-                # Discount
-                discount = None
-                if original_price and original_price > price:
-                    discount_pct = int(((original_price - price) / original_price) * 100)
-                    discount = f"{discount_pct}% off"
-                
                 result = ProductResult(
                     name=name[:120],
                     price=price,
                     original_price=original_price,
-                    discount=discount,
+                    discount=None,
                     platform=self.PLATFORM_NAME,
                     url=url,
                     image_url=image_url,
@@ -132,7 +119,7 @@ class FlipkartScraper(BaseScraper):
             except Exception:
                 continue
         
-        return results
+        return self.finalize_results(results)
     
     def _extract_name_fallback(self, container) -> str:
         """Fallback method to extract product name."""
@@ -4,10 +4,12 @@ Searches from Flipkart Minutes store after setting location.
 URL after search: flipkart.com/search?q=...&marketplace=HYPERLOCAL
 """
 from typing import Optional, List
-import re
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 from .base import BaseScraper, ProductResult
+from .normalize import extract_prices, RUPEE_PRICE_RE
+from .selector_cache import selector_cache
+from .store_map import store_map
 
 
 class FlipkartMinutesScraper(BaseScraper):
@@ -17,18 +19,20 @@ class FlipkartMinutesScraper(BaseScraper):
     BASE_URL = "https://www.flipkart.com"
     MINUTES_STORE_URL = "https://www.flipkart.com/flipkart-minutes-store"
     USE_BROWSER = True
+    SERVICEABILITY_PATTERNS = ("serviceab", "hyperlocal")
+    # No PRODUCT_URL_PATTERNS: Minutes prices depend on the geolocated store, which plain HTTP does not carry
+    PARSE_TIERS = ["links", "containers", "text"]
     _executor = ThreadPoolExecutor(max_workers=2)
     
-    # Bangalore coordinates
-    BANGALORE_LAT = 12.9716
-    BANGALORE_LON = 77.5946
-    
     def __init__(self, pincode: str = "560087"):
         super().__init__(pincode)
+        # Geolocation the browser reports; resolved per pincode before each search
+        self.lat, self.lon = store_map.coordinates(pincode)
         
     async def search(self, query: str) -> List[ProductResult]:
         """Search for products on Flipkart Minutes."""
         try:
+            self.lat, self.lon = await store_map.resolve_coordinates(self.pincode)
             loop = asyncio.get_event_loop()
             results = await loop.run_in_executor(
                 self._executor,
@@ -54,33 +58,34 @@ class FlipkartMinutesScraper(BaseScraper):
                     viewport={'width': 1920, 'height': 1080},
                     user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                     locale='en-IN',
-                    geolocation={'latitude': self.BANGALORE_LAT, 'longitude': self.BANGALORE_LON},
+                    geolocation={'latitude': self.lat, 'longitude': self.lon},
                     permissions=['geolocation']
                 )
                 page = context.new_page()
+                self.watch_serviceability(page, sync=True)
                 
                 # Step 1: Go to Flipkart
                 print("Flipkart Minutes: Going to Flipkart...")
-                page.goto("https://www.flipkart.com", wait_until='domcontentloaded', timeout=15000)
-                page.wait_for_timeout(1500)
+                page.goto("https://www.flipkart.com", wait_until='domcontentloaded', timeout=self.nav_timeout(15000))
+                page.wait_for_timeout(self.pause(1500))
                 
                 # Close popup
                 try:
-                    page.click('button._2KpZ6l._2doB4z', timeout=2000)
+                    page.click('button._2KpZ6l._2doB4z', timeout=self.nav_timeout(2000))
                 except:
                     pass
                 
                 # Step 2: Click Minutes and set location
                 print("Flipkart Minutes: Setting location via Minutes store...")
                 try:
-                    page.click('text="Minutes"', timeout=5000)
-                    page.wait_for_timeout(2000)
-                    page.click('text="Use my current location"', timeout=5000)
-                    page.wait_for_timeout(3000)
+                    page.click('text="Minutes"', timeout=self.nav_timeout(5000))
+                    page.wait_for_timeout(self.pause(2000))
+                    page.click('text="Use my current location"', timeout=self.nav_timeout(5000))
+                    page.wait_for_timeout(self.pause(3000))
                     
                     try:
-                        page.click('text=/Confirm|Continue/i', timeout=2000)
-                        page.wait_for_timeout(2000)
+                        page.click('text=/Confirm|Continue/i', timeout=self.nav_timeout(2000))
+                        page.wait_for_timeout(self.pause(2000))
                     except:
                         pass
                 except Exception as e:
@@ -102,7 +107,7 @@ class FlipkartMinutesScraper(BaseScraper):
                     print(f"Flipkart Minutes: Searching for '{query}'...")
                     search_input.fill(query)
                     search_input.press("Enter")
-                    page.wait_for_timeout(3000)
+                    page.wait_for_timeout(self.pause(3000))
                 else:
                     print("Flipkart Minutes: No search input found")
                     context.close()
@@ -133,10 +138,29 @@ class FlipkartMinutesScraper(BaseScraper):
         return results
     
     def _parse_products(self, soup, body_text: str) -> List[ProductResult]:
-        """Parse products from page."""
+        """Parse products from page, trying the tier that worked last time first."""
         results = []
         seen_names = set()
         
+        tiers = {
+            "links": lambda: self._parse_from_links(soup, seen_names),
+            "containers": lambda: self._parse_from_containers(soup, seen_names),
+            "text": lambda: self._parse_from_text(body_text, seen_names),
+        }
+        
+        def run_tier(tier: str) -> int:
+            results.extend(tiers[tier]())
+            return len(results)
+        
+        # Stop at the first tier that gets us to 3+ products
+        selector_cache.select(self.PLATFORM_NAME, self.PARSE_TIERS, run_tier, accept=lambda count: count >= 3)
+        
+        return self.finalize_results(results[:5])
+    
+    def _parse_from_links(self, soup, seen_names: set) -> List[ProductResult]:
+        """Parse products from product links and their parent containers."""
+        results = []
+        
         # First, collect all product links with their parent containers
         product_links = soup.select('a[href*="/p/"]')[:25]
         
@@ -168,11 +192,7 @@ class FlipkartMinutesScraper(BaseScraper):
                 parent_text = container.get_text(' ', strip=True) if container else text
                 
                 # Extract price from parent
-                price_matches = re.findall(r'₹\s*([\d,]+)', parent_text)
-                if not price_matches:
-                    continue
-                
-                prices = [float(p.replace(',', '')) for p in price_matches if 0 < float(p.replace(',', '')) < 50000]
+                prices = extract_prices(parent_text, max_price=50000)
                 if not prices:
                     continue
                 
@@ -210,15 +230,11 @@ class FlipkartMinutesScraper(BaseScraper):
                 img = link.select_one('img') or (container.select_one('img') if container else None)
                 image_url = img.get('src') or img.get('data-src') if img else None
                 
-                discount = None
-                if original_price and original_price > price:
-                    discount = f"{int(((original_price - price) / original_price) * 100)}% off"
-                
                 results.append(ProductResult(
                     name=name[:120],
                     price=price,
                     original_price=original_price,
-                    discount=discount,
+                    discount=None,
                     platform=self.PLATFORM_NAME,
                     url=url,
                     image_url=image_url,
@@ -233,103 +249,86 @@ class FlipkartMinutesScraper(BaseScraper):
             except:
                 continue
         
-        # Fallback to container-based parsing if link parsing didn't work
-        if len(results) < 3:
-            containers = soup.select('div[data-id], div._1AtVbE, div._2kHMtA, div._4ddWXP')[:25]
-            
-            for container in containers:
-                try:
-                    text = container.get_text(' ', strip=True)
-                    
-                    price_matches = re.findall(r'₹\s*([\d,]+)', text)
-                    if not price_matches:
-                        continue
-                    
-                    prices = []
-                    for p in price_matches:
-                        try:
-                            val = float(p.replace(',', ''))
-                            if 0 < val < 50000:
-                                prices.append(val)
-                        except:
-                            pass
-                    
-                    if not prices:
-                        continue
-                    
-                    price = min(prices)
-                    original_price = max(prices) if len(prices) > 1 and max(prices) > price else None
-                    
-                    # Get name
-                    name = ""
-                    title_elem = container.select_one('[title]')
-                    if title_elem:
-                        name = title_elem.get('title', '')
-                    
-                    if not name or len(name) < 10:
-                        img = container.select_one('img')
-                        if img:
-                            name = img.get('alt', '')
-                    
-                    if not name or len(name) < 5:
-                        for elem in container.find_all(['a', 'div', 'span']):
-                            t = elem.get_text(strip=True)
-                            if t and len(t) > 10 and len(t) < 150 and '₹' not in t and '%' not in t:
-                                name = t
-                                break
-                    
-                    if not name or len(name) < 5:
-                        continue
-                    
-                    name_key = name[:40].lower()
-                    if name_key in seen_names:
-                        continue
-                    seen_names.add(name_key)
-                    
-                    # URL - get from link if available
-                    link = container if container.name == 'a' else container.select_one('a[href*="/p/"]')
-                    url = self.MINUTES_STORE_URL
-                    if link:
-                        href = link.get('href', '')
-                        if href:
-                            url = f"{self.BASE_URL}{href}" if href.startswith('/') else href
-                            # Only add marketplace if not already present (case-insensitive)
-                            if 'MARKETPLACE=HYPERLOCAL' not in url.upper():
-                                if '?' in url:
-                                    url = f"{url}&marketplace=HYPERLOCAL"
-                                else:
-                                    url = f"{url}?marketplace=HYPERLOCAL"
-                    
-                    # Image
+        return results
+    
+    def _parse_from_containers(self, soup, seen_names: set) -> List[ProductResult]:
+        """Parse products from known Flipkart container classes."""
+        results = []
+        
+        containers = soup.select('div[data-id], div._1AtVbE, div._2kHMtA, div._4ddWXP')[:25]
+        
+        for container in containers:
+            try:
+                text = container.get_text(' ', strip=True)
+                
+                prices = extract_prices(text, max_price=50000)
+                if not prices:
+                    continue
+                
+                price = min(prices)
+                original_price = max(prices) if len(prices) > 1 and max(prices) > price else None
+                
+                # Get name
+                name = ""
+                title_elem = container.select_one('[title]')
+                if title_elem:
+                    name = title_elem.get('title', '')
+                
+                if not name or len(name) < 10:
                     img = container.select_one('img')
-                    image_url = img.get('src') or img.get('data-src') if img else None
-                    
-                    discount = None
-                    if original_price and original_price > price:
-                        discount = f"{int(((original_price - price) / original_price) * 100)}% off"
-                    
-                    results.append(ProductResult(
-                        name=name[:120],
-                        price=price,
-                        original_price=original_price,
-                        discount=discount,
-                        platform=self.PLATFORM_NAME,
-                        url=url,
-                        image_url=image_url,
-                        rating=None,
-                        available=True,
-                        delivery_time="6-10 mins"
-                    ))
-                    
-                except:
+                    if img:
+                        name = img.get('alt', '')
+                
+                if not name or len(name) < 5:
+                    for elem in container.find_all(['a', 'div', 'span']):
+                        t = elem.get_text(strip=True)
+                        if t and len(t) > 10 and len(t) < 150 and '₹' not in t and '%' not in t:
+                            name = t
+                            break
+                
+                if not name or len(name) < 5:
                     continue
+                
+                name_key = name[:40].lower()
+                if name_key in seen_names:
+                    continue
+                seen_names.add(name_key)
+                
+                # URL - get from link if available
+                link = container if container.name == 'a' else container.select_one('a[href*="/p/"]')
+                url = self.MINUTES_STORE_URL
+                if link:
+                    href = link.get('href', '')
+                    if href:
+                        url = f"{self.BASE_URL}{href}" if href.startswith('/') else href
+                        # Only add marketplace if not already present (case-insensitive)
+                        if 'MARKETPLACE=HYPERLOCAL' not in url.upper():
+                            if '?' in url:
+                                url = f"{url}&marketplace=HYPERLOCAL"
+                            else:
+                                url = f"{url}?marketplace=HYPERLOCAL"
+                
+                # Image
+                img = container.select_one('img')
+                image_url = img.get('src') or img.get('data-src') if img else None
+                
+                results.append(ProductResult(
+                    name=name[:120],
+                    price=price,
+                    original_price=original_price,
+                    discount=None,
+                    platform=self.PLATFORM_NAME,
+                    url=url,
+                    image_url=image_url,
+                    rating=None,
+                    available=True,
+                    delivery_time="6-10 mins"
+                ))
+            
+            except:
+                continue
         
-        # Fallback to text parsing if HTML didn't work
-        if len(results) < 3:
-            text_results = self._parse_from_text(body_text, seen_names)
-            results.extend(text_results)
-        
-        return results[:5]
+        return results
     
     def _parse_from_text(self, body_text: str, seen_names: set) -> List[ProductResult]:
         """Parse from plain text as fallback."""
@@ -343,7 +342,7 @@ class FlipkartMinutesScraper(BaseScraper):
             # Look for product-like lines
             if len(line) > 15 and len(line) < 120 and '₹' not in line and '%' not in line:
                 for j in range(i + 1, min(i + 5, len(lines))):
-                    price_match = re.search(r'₹\s*([\d,]+)', lines[j])
+                    price_match = RUPEE_PRICE_RE.search(lines[j])
                     if price_match:
                         price = float(price_match.group(1).replace(',', ''))
                         if 0 < price < 5000:
@@ -5,6 +5,7 @@ Uses Playwright for browser-based scraping to avoid 403 blocks.
 """
 from typing import List
 from .base import BaseScraper, ProductResult
+from .normalize import normalize_batch
 
 
 class JioMartScraper(BaseScraper):
@@ -12,6 +13,8 @@ class JioMartScraper(BaseScraper):
     
     PLATFORM_NAME = "JioMart"
     BASE_URL = "https://www.jiomart.com"
+    USE_BROWSER = True
+    PRODUCT_URL_PATTERNS = ("jiomart.com/p/",)
     
     def __init__(self, pincode: str = "560087"):
         super().__init__(pincode)
@@ -44,8 +47,8 @@ class JioMartScraper(BaseScraper):
             )
             
             page = await context.new_page()
-            await page.goto(search_url, wait_until='networkidle', timeout=20000)
-            await page.wait_for_timeout(2000)
+            await page.goto(search_url, wait_until='networkidle', timeout=self.nav_timeout(20000))
+            await page.wait_for_timeout(self.pause(2000))
             
             # Extract product data using JavaScript
             products_data = await page.evaluate('''() => {
@@ -101,25 +104,30 @@ class JioMartScraper(BaseScraper):
                 return products.slice(0, 10);
             }''')
             
+            # Normalise prices for the whole page at once
+            batch = normalize_batch(
+                [p.get('price') for p in products_data],
+                [p.get('mrp') for p in products_data],
+                [p.get('name') for p in products_data],
+            )
+            
             # Parse extracted data
-            for p in products_data:
-                if p.get('name') and p.get('price', 0) > 0:
-                    original_price = p.get('mrp') if p.get('mrp', 0) > p.get('price', 0) else None
-                    discount = None
-                    if original_price:
-                        discount = f"{int((original_price - p['price']) / original_price * 100)}% off"
-                    
+            columns = zip(products_data, batch.price, batch.mrp, batch.discount_labels(), batch.unit_price, batch.unit_labels())
+            for p, price, mrp, discount, unit_price, unit in columns:
+                if p.get('name') and price > 0:
                     results.append(ProductResult(
                         name=p['name'][:120],
-                        price=p['price'],
-                        original_price=original_price,
+                        price=price,
+                        original_price=mrp,
                         discount=discount,
                         platform=self.PLATFORM_NAME,
                         url=p.get('url', self.BASE_URL),
                         image_url=p.get('image'),
                         rating=p.get('rating'),
                         available=True,
-                        delivery_time="1-3 days"
+                        delivery_time="1-3 days",
+                        unit_price=unit_price,
+                        unit=unit
                     ))
             
             print(f"JioMart: Found {len(results)} products")
@@ -0,0 +1,175 @@
+"""
+Shared price and pack-size normalisation for scrapers.
+
+All patterns are compiled once at import. Scrapers collect the raw price, MRP
+and name/pack-size strings for a whole results page and call normalize_batch()
+once; the result is a set of parallel columns (price, MRP, discount %,
+quantity, unit, price per standard unit) computed column-wise.
+"""
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple, Union
+
+
+PriceInput = Union[str, int, float, None]
+
+# Price patterns
+_PRICE_STRIP_RE = re.compile(r'[₹,\s]')
+_NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+RUPEE_PRICE_RE = re.compile(r'₹\s*([\d,]+)')
+
+# Pack-size patterns ("2 x 500 g", "500g", "1.5 ltr", "6 pcs")
+_UNIT_PATTERN = r'(kgs?|kilograms?|kilos?|g|gms?|grams?|grammes?|mg|l|ltrs?|litres?|liters?|ml|pcs?|pieces?|units?|nos?|pack)'
+_MULTIPACK_RE = re.compile(r'(\d+)\s*[x×]\s*(\d+(?:\.\d+)?)\s*' + _UNIT_PATTERN + r'\b', re.I)
+_QUANTITY_RE = re.compile(r'(\d+(?:\.\d+)?)\s*' + _UNIT_PATTERN + r'\b', re.I)
+
+# Unit spelling -> (base unit, multiplier to base unit)
+UNIT_ALIASES = {
+    "kg": ("g", 1000.0), "kgs": ("g", 1000.0), "kilogram": ("g", 1000.0), "kilograms": ("g", 1000.0),
+    "kilo": ("g", 1000.0), "kilos": ("g", 1000.0),
+    "g": ("g", 1.0), "gm": ("g", 1.0), "gms": ("g", 1.0), "gram": ("g", 1.0), "grams": ("g", 1.0),
+    "gramme": ("g", 1.0), "grammes": ("g", 1.0),
+    "mg": ("g", 0.001),
+    "l": ("ml", 1000.0), "ltr": ("ml", 1000.0), "ltrs": ("ml", 1000.0), "litre": ("ml", 1000.0),
+    "litres": ("ml", 1000.0), "liter": ("ml", 1000.0), "liters": ("ml", 1000.0),
+    "ml": ("ml", 1.0),
+    "pc": ("pc", 1.0), "pcs": ("pc", 1.0), "piece": ("pc", 1.0), "pieces": ("pc", 1.0),
+    "unit": ("pc", 1.0), "units": ("pc", 1.0), "no": ("pc", 1.0), "nos": ("pc", 1.0), "pack": ("pc", 1.0),
+}
+
+# Base unit -> (standard unit used for price comparison, base units per standard unit)
+STANDARD_UNITS = {
+    "g": ("kg", 1000.0),
+    "ml": ("l", 1000.0),
+    "pc": ("pc", 1.0),
+}
+
+
+def parse_price(price_str: PriceInput) -> float:
+    """Parse a price string (or number) to float, 0.0 if there is no price."""
+    if not price_str:
+        return 0.0
+    if isinstance(price_str, (int, float)):
+        return float(price_str)
+    match = _NUMBER_RE.search(_PRICE_STRIP_RE.sub('', price_str))
+    if match:
+        return float(match.group(0))
+    return 0.0
+
+
+def extract_prices(text: str, max_price: float = 500000) -> List[float]:
+    """Extract all ₹ amounts from a block of text, dropping values outside (0, max_price)."""
+    prices = []
+    for raw in RUPEE_PRICE_RE.findall(text):
+        digits = raw.replace(',', '')
+        if not digits:
+            continue
+        value = float(digits)
+        if 0 < value < max_price:
+            prices.append(value)
+    return prices
+
+
+def parse_quantity(text: Optional[str]) -> Tuple[Optional[float], Optional[str]]:
+    """
+    Parse a pack size from a product name or size label.
+    
+    Returns:
+        Tuple of (quantity, unit) in base units ("g", "ml" or "pc"),
+        or (None, None) if no pack size was found.
+    """
+    if not text:
+        return None, None
+    
+    match = _MULTIPACK_RE.search(text)
+    if match:
+        count = float(match.group(1))
+        amount, unit = float(match.group(2)), match.group(3)
+    else:
+        match = _QUANTITY_RE.search(text)
+        if not match:
+            return None, None
+        count = 1.0
+        amount, unit = float(match.group(1)), match.group(2)
+    
+    base_unit, multiplier = UNIT_ALIASES[unit.lower()]
+    return count * amount * multiplier, base_unit
+
+
+def _quantity_token(amount: float, unit: str) -> str:
+    base_unit, multiplier = UNIT_ALIASES[unit.lower()]
+    return f"{round(amount * multiplier, 3):g}{base_unit}"
+
+
+def canonical_quantities(text: str) -> str:
+    """Rewrite every pack size in text as a base-unit token ("1 ltr" -> "1000ml", "2 x 500 g" -> "1000g")."""
+    text = _MULTIPACK_RE.sub(lambda m: _quantity_token(float(m.group(1)) * float(m.group(2)), m.group(3)), text)
+    return _QUANTITY_RE.sub(lambda m: _quantity_token(float(m.group(1)), m.group(2)), text)
+
+
+def format_discount(discount_pct: Optional[int]) -> Optional[str]:
+    """Format a discount percentage the way results display it."""
+    return f"{discount_pct}% off" if discount_pct else None
+
+
+@dataclass
+class PriceBatch:
+    """Parallel columns of normalised price data for one results page."""
+    price: List[float]
+    mrp: List[Optional[float]]
+    discount_pct: List[Optional[int]]
+    quantity: List[Optional[float]]
+    unit: List[Optional[str]]
+    unit_price: List[Optional[float]]
+    
+    def __len__(self) -> int:
+        return len(self.price)
+    
+    def discount_labels(self) -> List[Optional[str]]:
+        """Discount column formatted as "N% off" labels."""
+        return [format_discount(pct) for pct in self.discount_pct]
+    
+    def unit_labels(self) -> List[Optional[str]]:
+        """Standard unit ("kg", "l" or "pc") each unit_price is quoted per."""
+        return [STANDARD_UNITS[u][0] if p is not None else None for u, p in zip(self.unit, self.unit_price)]
+
+
+def normalize_batch(
+    prices: Sequence[PriceInput],
+    mrps: Optional[Sequence[PriceInput]] = None,
+    sizes: Optional[Sequence[Optional[str]]] = None,
+) -> PriceBatch:
+    """
+    Normalise a page of raw prices, MRPs and pack sizes in one pass.
+    
+    Args:
+        prices: Raw selling prices (strings like "₹1,299" or numbers)
+        mrps: Raw MRPs, parallel to prices; an MRP not above the price is dropped
+        sizes: Pack-size strings or product names, parallel to prices
+    
+    Returns:
+        PriceBatch with one row per input price. unit_price is the price per
+        standard unit (kg, l or pc) when a pack size was found.
+    """
+    count = len(prices)
+    price = [parse_price(p) for p in prices]
+    raw_mrp = [parse_price(m) for m in mrps] if mrps is not None else [0.0] * count
+    mrp = [m if m > p > 0 else None for p, m in zip(price, raw_mrp)]
+    discount_pct = [int((m - p) / m * 100) if m else None for p, m in zip(price, mrp)]
+    
+    parsed = [parse_quantity(s) for s in sizes] if sizes is not None else [(None, None)] * count
+    quantity = [q for q, _ in parsed]
+    unit = [u for _, u in parsed]
+    unit_price = [
+        round(p / q * STANDARD_UNITS[u][1], 2) if q and p > 0 else None
+        for p, q, u in zip(price, quantity, unit)
+    ]
+    
+    return PriceBatch(
+        price=price,
+        mrp=mrp,
+        discount_pct=discount_pct,
+        quantity=quantity,
+        unit=unit,
+        unit_price=unit_price,
+    )
@@ -0,0 +1,153 @@
+"""
+Adaptive selector memoization for scraper fallback cascades.
+
+Several scrapers try a list of selectors (or parsing tiers) in order until one
+produces results. Page layouts change rarely, so the candidate that worked on
+the last search almost always works on the next one. SelectorCache remembers
+the winning candidate per platform, tries it first, and walks the full cascade
+again on a miss or every `explore_every` lookups.
+"""
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class SelectorCache:
+    """
+    Per-platform memo of the selector/tier that produced results most recently.
+    
+    Features:
+    - Remembered winner is tried first (one query in the common case)
+    - Full cascade is re-walked on a miss
+    - Scheduled re-exploration so an earlier candidate that starts working again
+      is picked back up
+    - Hit-rate and probe-count statistics per platform
+    """
+    
+    def __init__(self, explore_every: int = 50):
+        """Initialize selector cache."""
+        self.explore_every = explore_every
+        self._preferred: Dict[str, str] = {}
+        self._since_explore: Dict[str, int] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+    
+    def _platform_stats(self, platform: str) -> Dict[str, int]:
+        if platform not in self._stats:
+            self._stats[platform] = {
+                "lookups": 0,
+                "memo_hits": 0,
+                "memo_misses": 0,
+                "explorations": 0,
+                "probes": 0,
+                "failures": 0,
+            }
+        return self._stats[platform]
+    
+    def order(self, platform: str, candidates: Sequence[str]) -> Tuple[List[str], Optional[str]]:
+        """
+        Order candidates for a lookup.
+        
+        Returns:
+            Tuple of (ordered_candidates, preferred)
+            - ordered_candidates: remembered winner first, then the rest in cascade order
+            - preferred: the remembered winner being tried first, or None when
+              this lookup walks the original cascade (no memo yet, or scheduled exploration)
+        """
+        candidates = list(candidates)
+        
+        with self._lock:
+            preferred = self._preferred.get(platform)
+            count = self._since_explore.get(platform, 0) + 1
+            
+            if preferred not in candidates or count >= self.explore_every:
+                self._since_explore[platform] = 0
+                if preferred in candidates:
+                    self._platform_stats(platform)["explorations"] += 1
+                return candidates, None
+            
+            self._since_explore[platform] = count
+        
+        return [preferred] + [c for c in candidates if c != preferred], preferred
+    
+    def record(self, platform: str, winner: Optional[str], probes: int, preferred: Optional[str] = None):
+        """Record the outcome of a lookup returned by order()."""
+        with self._lock:
+            stats = self._platform_stats(platform)
+            stats["lookups"] += 1
+            stats["probes"] += probes
+            
+            if preferred is not None:
+                if winner == preferred:
+                    stats["memo_hits"] += 1
+                else:
+                    stats["memo_misses"] += 1
+            
+            if winner is None:
+                stats["failures"] += 1
+                return
+            
+            if winner != self._preferred.get(platform):
+                self._since_explore[platform] = 0
+            self._preferred[platform] = winner
+    
+    def select(
+        self,
+        platform: str,
+        candidates: Sequence[str],
+        probe: Callable[[str], Any],
+        accept: Callable[[Any], bool] = bool,
+    ) -> Tuple[Optional[str], Any]:
+        """
+        Run `probe` over candidates until `accept` says a result is good enough.
+        
+        Returns:
+            Tuple of (winner, result) - winner is None if no candidate was accepted,
+            in which case result is the last probe result (or None if none ran).
+        """
+        ordered, preferred = self.order(platform, candidates)
+        
+        result = None
+        probes = 0
+        for candidate in ordered:
+            probes += 1
+            result = probe(candidate)
+            if accept(result):
+                self.record(platform, candidate, probes, preferred)
+                return candidate, result
+        
+        self.record(platform, None, probes, preferred)
+        return None, result
+    
+    def reset(self, platform: Optional[str] = None):
+        """Forget remembered winners (for one platform or all)."""
+        with self._lock:
+            if platform is None:
+                self._preferred.clear()
+                self._since_explore.clear()
+                self._stats.clear()
+            else:
+                self._preferred.pop(platform, None)
+                self._since_explore.pop(platform, None)
+                self._stats.pop(platform, None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-platform memoization statistics."""
+        with self._lock:
+            platforms = {}
+            for platform, stats in self._stats.items():
+                memo_lookups = stats["memo_hits"] + stats["memo_misses"]
+                platforms[platform] = {
+                    **stats,
+                    "preferred": self._preferred.get(platform),
+                    "hit_rate": round(stats["memo_hits"] / memo_lookups * 100, 1) if memo_lookups else 0,
+                    "avg_probes": round(stats["probes"] / stats["lookups"], 2) if stats["lookups"] else 0,
+                }
+            
+            return {
+                "explore_every": self.explore_every,
+                "platforms": platforms,
+            }
+
+
+# Global selector cache instance
+selector_cache = SelectorCache()
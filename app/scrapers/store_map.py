@@ -0,0 +1,220 @@
+"""
+Learned pincode -> dark store mapping for quick-commerce platforms.
+
+Zepto, BigBasket, Flipkart Minutes and JioMart Quick serve many pincodes from
+one dark store, so neighbouring pincodes get identical results. Scrapers watch
+the platform's serviceability responses for the serving store id (see
+BaseScraper.watch_serviceability); StoreMap remembers it per (platform,
+pincode) and persists it as JSON, so cache and single-flight keys can be
+per store instead of per pincode.
+
+It also holds coordinates per pincode - geocoded once and persisted - for
+scrapers that locate the user by geolocation (Flipkart Minutes). Until a
+pincode's store is learned its entries stay keyed by pincode: neighbouring
+pincodes may well be served by different stores.
+"""
+import asyncio
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+
+import httpx
+
+from app.geo import DEFAULT_COORDINATES, ZONE_CENTROIDS, zone_for
+
+
+# Keys that carry the serving store in serviceability / store-selection payloads
+STORE_ID_KEYS = (
+    "store_id", "storeId", "dark_store_id", "darkStoreId", "primaryStoreId",
+    "primary_store_id", "fc_id", "fcId", "hub_id", "hubId",
+)
+
+GEOCODE_URL = "https://nominatim.openstreetmap.org/search"
+
+
+def find_store_id(payload: Any, depth: int = 6) -> Optional[str]:
+    """First store id found in a JSON payload (breadth over each level, limited depth)."""
+    if depth < 0:
+        return None
+    if isinstance(payload, dict):
+        for key in STORE_ID_KEYS:
+            value = payload.get(key)
+            if isinstance(value, (str, int)) and not isinstance(value, bool) and str(value):
+                return str(value)
+        children = payload.values()
+    elif isinstance(payload, list):
+        children = payload
+    else:
+        return None
+    for child in children:
+        found = find_store_id(child, depth - 1)
+        if found is not None:
+            return found
+    return None
+
+
+class StoreMap:
+    """
+    Pincode -> serving store per platform, plus pincode coordinates.
+    
+    Features:
+    - learn() records the store a scrape was served from; changes (a pincode
+      moved to another store) replace the old mapping
+    - location(): "store:<id>" once the serving store is learned, else None
+      (the caller keys by pincode)
+    - Coordinates: learned/geocoded per pincode, zone centroid as a fallback
+    - JSON persistence (atomic replace) when a path is given; alearn() and
+      resolve_coordinates() write it in a worker thread, off the event loop
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        """Load the mapping from `path` if it exists."""
+        self.path = path
+        self._stores: Dict[str, Dict[str, str]] = {}              # pincode -> {platform: store id}
+        self._coordinates: Dict[str, Tuple[float, float]] = {}    # pincode -> (lat, lon)
+        self._not_geocoded: Set[str] = set()                       # pincodes geocoding failed for (this process)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()   # one writer of the file (and its .tmp) at a time
+        self._stats = {
+            "learned": 0,
+            "moved": 0,
+            "geocoded": 0,
+            "geocode_failures": 0,
+        }
+        if path and os.path.exists(path):
+            self._load()
+    
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self._stores = {pincode: dict(stores) for pincode, stores in data.get("stores", {}).items()}
+            self._coordinates = {pincode: (lat, lon) for pincode, (lat, lon) in data.get("coordinates", {}).items()}
+        except (OSError, ValueError) as e:
+            print(f"Store map: could not load {self.path}: {e}")
+    
+    def save(self):
+        """Write the mapping to `path` (no-op without one)."""
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                "stores": self._stores,
+                "coordinates": {pincode: list(point) for pincode, point in self._coordinates.items()},
+            }
+        tmp_path = f"{self.path}.tmp"
+        with self._save_lock:
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(data, f, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Store map: could not save {self.path}: {e}")
+    
+    def _record(self, platform: str, pincode: str, store_id: str) -> bool:
+        """Update the in-memory mapping. Returns True if it changed."""
+        with self._lock:
+            stores = self._stores.setdefault(pincode, {})
+            previous = stores.get(platform)
+            if previous == store_id:
+                return False
+            stores[platform] = store_id
+            self._stats["moved" if previous is not None else "learned"] += 1
+        return True
+    
+    def learn(self, platform: str, pincode: str, store_id: str) -> bool:
+        """Record that a platform serves a pincode from store_id. Returns True if the mapping changed."""
+        changed = self._record(platform, pincode, store_id)
+        if changed:
+            self.save()
+        return changed
+    
+    async def alearn(self, platform: str, pincode: str, store_id: str) -> bool:
+        """learn() with the file written in a worker thread, off the event loop."""
+        changed = self._record(platform, pincode, store_id)
+        if changed and self.path:
+            await asyncio.to_thread(self.save)
+        return changed
+    
+    def store_for(self, platform: str, pincode: str) -> Optional[str]:
+        """Known serving store of a platform for a pincode."""
+        return self._stores.get(pincode, {}).get(platform)
+    
+    def location(self, platform: str, pincode: str) -> Optional[str]:
+        """Cache location shared by every pincode the same store serves, or None until it is learned."""
+        store_id = self.store_for(platform, pincode)
+        return f"store:{store_id}" if store_id is not None else None
+    
+    def locations(self, pincode: str) -> Set[str]:
+        """Every store location a pincode may be cached under."""
+        return {f"store:{store_id}" for store_id in self._stores.get(pincode, {}).values()}
+    
+    def set_coordinates(self, pincode: str, lat: float, lon: float, save: bool = True):
+        """Record a pincode's coordinates (and write the file unless save is False)."""
+        with self._lock:
+            self._coordinates[pincode] = (lat, lon)
+        if save:
+            self.save()
+    
+    def coordinates(self, pincode: str) -> Tuple[float, float]:
+        """Best known coordinates: the pincode's own, its zone's centroid, or DEFAULT_COORDINATES."""
+        point = self._coordinates.get(pincode)
+        if point is not None:
+            return point
+        return ZONE_CENTROIDS.get(zone_for(pincode), DEFAULT_COORDINATES)
+    
+    async def resolve_coordinates(self, pincode: str, timeout: float = 5.0) -> Tuple[float, float]:
+        """Coordinates of a pincode, geocoding (once, then persisted) if unknown."""
+        if pincode in self._coordinates or pincode in self._not_geocoded or zone_for(pincode) is None:
+            return self.coordinates(pincode)
+        
+        try:
+            async with httpx.AsyncClient(timeout=timeout, headers={"User-Agent": "PriceHunt/1.0"}) as client:
+                response = await client.get(GEOCODE_URL, params={
+                    "postalcode": pincode, "country": "India", "format": "json", "limit": 1,
+                })
+                response.raise_for_status()
+                places = response.json()
+            if places:
+                self._stats["geocoded"] += 1
+                self.set_coordinates(pincode, float(places[0]["lat"]), float(places[0]["lon"]), save=False)
+                if self.path:
+                    await asyncio.to_thread(self.save)
+            else:
+                self._not_geocoded.add(pincode)
+        except (httpx.HTTPError, ValueError, KeyError) as e:
+            self._not_geocoded.add(pincode)
+            self._stats["geocode_failures"] += 1
+            print(f"Store map: geocoding {pincode} failed: {e}")
+        
+        return self.coordinates(pincode)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get mapping statistics: pincodes and distinct stores per platform."""
+        with self._lock:
+            platforms: Dict[str, Dict[str, Any]] = {}
+            for stores in self._stores.values():
+                for platform, store_id in stores.items():
+                    entry = platforms.setdefault(platform, {"pincodes": 0, "stores": set()})
+                    entry["pincodes"] += 1
+                    entry["stores"].add(store_id)
+            
+            return {
+                "path": self.path,
+                "pincodes": len(self._stores),
+                "coordinates": len(self._coordinates),
+                **self._stats,
+                "platforms": {
+                    platform: {
+                        "pincodes": entry["pincodes"],
+                        "stores": len(entry["stores"]),
+                        "pincodes_per_store": round(entry["pincodes"] / len(entry["stores"]), 1),
+                    }
+                    for platform, entry in platforms.items()
+                },
+            }
+
+
+# Global store map, persisted next to the app unless PRICEHUNT_STORE_MAP says otherwise
+store_map = StoreMap(os.environ.get("PRICEHUNT_STORE_MAP", "pricehunt-stores.json"))
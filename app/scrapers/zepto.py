@@ -4,11 +4,21 @@ import re
 from .base import BaseScraper, ProductResult
 
 
+# Line patterns in Zepto product card text
+_PRICE_LINE_RE = re.compile(r'^₹(\d+)$')
+_RATING_LINE_RE = re.compile(r'^[0-4]\.[0-9]$')
+_REVIEW_COUNT_RE = re.compile(r'^\([\d.]+k?\)$')
+_QUANTITY_LINE_RE = re.compile(r'^\d+\s*(pack|ml|g|kg|L|pc|pcs|gm|units?)', re.I)
+
+
 class ZeptoScraper(BaseScraper):
     """Scraper for Zepto."""
     
     PLATFORM_NAME = "Zepto"
     BASE_URL = "https://www.zeptonow.com"
+    USE_BROWSER = True
+    SERVICEABILITY_PATTERNS = ("serviceab", "/store-selection", "/stores/nearest")
+    # No PRODUCT_URL_PATTERNS: Zepto prices depend on the dark store picked from the browser's location, which plain HTTP does not carry
     
     def __init__(self, pincode: str = "560087"):
         super().__init__(pincode)
@@ -39,8 +49,9 @@ class ZeptoScraper(BaseScraper):
             )
             
             page = await context.new_page()
-            await page.goto(search_url, wait_until='networkidle', timeout=25000)
-            await page.wait_for_timeout(2000)
+            self.watch_serviceability(page)
+            await page.goto(search_url, wait_until='networkidle', timeout=self.nav_timeout(25000))
+            await page.wait_for_timeout(self.pause(2000))
             
             # Extract product data including URLs using JavaScript
             products_data = await page.evaluate('''() => {
@@ -73,7 +84,7 @@ class ZeptoScraper(BaseScraper):
             }''')
             
             # Parse the extracted products
-            results = self._parse_products_with_urls(products_data)
+            results = self.finalize_results(self._parse_products_with_urls(products_data))
             
             # Fallback: if no products found with URLs, try text parsing
             if not results:
@@ -114,7 +125,7 @@ class ZeptoScraper(BaseScraper):
             
             for line in lines:
                 # Match price like ₹123
-                price_match = re.match(r'^₹(\d+)$', line)
+                price_match = _PRICE_LINE_RE.match(line)
                 if price_match:
                     if not price:
                         price = float(price_match.group(1))
@@ -123,12 +134,12 @@ class ZeptoScraper(BaseScraper):
                     continue
                 
                 # Match rating
-                if re.match(r'^[0-4]\.[0-9]$', line):
+                if _RATING_LINE_RE.match(line):
                     rating = float(line)
                     continue
                 
                 # Skip review count
-                if re.match(r'^\([\d.]+k?\)$', line):
+                if _REVIEW_COUNT_RE.match(line):
                     continue
                 
                 # Skip discount text
@@ -136,7 +147,7 @@ class ZeptoScraper(BaseScraper):
                     continue
                 
                 # Match quantity
-                if re.match(r'^\d+\s*(pack|ml|g|kg|L|pc|pcs|gm|units?)', line, re.I):
+                if _QUANTITY_LINE_RE.match(line):
                     quantity = line
                     continue
                 
@@ -147,15 +158,11 @@ class ZeptoScraper(BaseScraper):
             if name and price and price > 0:
                 full_name = f"{name} ({quantity})" if quantity else name
                 
-                discount = None
-                if original_price and original_price > price:
-                    discount = f"{int((original_price - price) / original_price * 100)}% off"
-                
                 result = ProductResult(
                     name=full_name[:120],
                     price=price,
                     original_price=original_price,
-                    discount=discount,
+                    discount=None,
                     platform=self.PLATFORM_NAME,
                     url=url,
                     image_url=image_url,
@@ -187,22 +194,22 @@ class ZeptoScraper(BaseScraper):
             rating = None
             
             for line in lines:
-                price_match = re.match(r'^₹(\d+)$', line)
+                price_match = _PRICE_LINE_RE.match(line)
                 if price_match and not price:
                     price = float(price_match.group(1))
                     continue
                 
-                if re.match(r'^[0-4]\.[0-9]$', line):
+                if _RATING_LINE_RE.match(line):
                     rating = float(line)
                     continue
                 
-                if re.match(r'^\([\d.]+k?\)$', line):
+                if _REVIEW_COUNT_RE.match(line):
                     continue
                 
                 if 'OFF' in line:
                     continue
                 
-                if re.match(r'^\d+\s*(pack|ml|g|kg|L|pc|pcs)', line, re.I):
+                if _QUANTITY_LINE_RE.match(line):
                     quantity = line
                     continue
                 
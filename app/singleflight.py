@@ -0,0 +1,82 @@
+"""
+Single-flight coalescing of identical in-flight work.
+
+When many requests need the same (platform, query, pincode) scrape at once,
+only the first starts it; the rest await the same task. Callers await the
+task through asyncio.shield, so a caller that disconnects never cancels the
+scrape for the others - and the scrape still finishes and fills the cache
+even if every caller has gone.
+"""
+import asyncio
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Registry of in-flight tasks keyed by what they compute.
+    
+    Features:
+    - One task per key while it runs; later callers join it
+    - Cancellation of a caller does not cancel the shared task
+    - Started / coalesced / failed counters
+    """
+    
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._stats = {
+            "started": 0,
+            "coalesced": 0,
+            "failed": 0,
+        }
+    
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await the in-flight task for key, starting it with factory() if there is none.
+        
+        Args:
+            key: Identity of the work (e.g. (platform, normalised query, pincode))
+            factory: Called with no arguments to create the coroutine when no
+                task for key is running
+        """
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(factory())
+            self._inflight[key] = task
+            task.add_done_callback(partial(self._forget, key))
+            self._stats["started"] += 1
+        else:
+            self._stats["coalesced"] += 1
+        
+        return await asyncio.shield(task)
+    
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        """Drop a finished task from the registry."""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self._stats["failed"] += 1
+    
+    def in_flight(self, key: Hashable) -> bool:
+        """Check whether work for key is currently running."""
+        task = self._inflight.get(key)
+        return task is not None and not task.done()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics."""
+        calls = self._stats["started"] + self._stats["coalesced"]
+        return {
+            "in_flight": len(self._inflight),
+            **self._stats,
+            "coalesce_rate": round(self._stats["coalesced"] / calls * 100, 1) if calls else 0,
+        }
+
+
+# Global registry for platform scrapes
+scrape_flights = SingleFlight()
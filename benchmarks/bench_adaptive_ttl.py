@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Replay a simulated day of traffic against fixed and adaptive TTLs.
+
+Each (platform, query) key has its own price-change rate: most products are
+stable for hours, some change hourly and a few (flash deals, surge-priced
+quick commerce) every few minutes. Requests for a key arrive at random; a
+request for an expired key triggers a scrape. For each TTL strategy the
+replay reports the scrapes made and the share of cache-served responses
+whose prices were still current (accuracy).
+
+Usage:
+    python benchmarks/bench_adaptive_ttl.py [--keys 2000] [--hours 24]
+"""
+import argparse
+import bisect
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.adaptive_ttl import AdaptiveTTL
+from app.scrapers.base import ProductResult
+
+
+DEFAULT_TTL = 300
+
+# (share of keys, mean seconds between price changes)
+VOLATILITY = [(0.6, 24 * 3600), (0.3, 3600), (0.1, 300)]
+
+
+def make_keys(count: int, hours: float, seed: int):
+    """Per key: sorted price-change times and sorted request times."""
+    rng = random.Random(seed)
+    horizon = hours * 3600
+    keys = []
+    for i in range(count):
+        mean_change = rng.choices([m for _, m in VOLATILITY], weights=[w for w, _ in VOLATILITY])[0]
+        changes, t = [], 0.0
+        while t < horizon:
+            t += rng.expovariate(1 / mean_change)
+            changes.append(t)
+        # Popularity: a request every 30s .. 30min on average
+        mean_gap = rng.uniform(30, 1800)
+        requests, t = [], 0.0
+        while t < horizon:
+            t += rng.expovariate(1 / mean_gap)
+            requests.append(t)
+        keys.append((f"query {i}", changes, requests))
+    return keys
+
+
+def replay(keys, adaptive: bool):
+    """Scrapes and accuracy for one strategy."""
+    now = [0.0]
+    model = AdaptiveTTL(clock=lambda: now[0]) if adaptive else None
+    scrapes = served = accurate = 0
+    events = sorted((t, i) for i, (_, _, requests) in enumerate(keys) for t in requests)
+    cached = {}  # key index -> (price version, expires_at)
+    
+    for t, i in events:
+        now[0] = t
+        query, changes, _ = keys[i]
+        version = bisect.bisect_right(changes, t)
+        entry = cached.get(i)
+        if entry is None or t >= entry[1]:
+            scrapes += 1
+            ttl = DEFAULT_TTL
+            if model is not None:
+                results = [ProductResult(
+                    name=query, price=float(version), original_price=None, discount=None,
+                    platform="Zepto", url=f"https://example.com/{i}", image_url=None, rating=None,
+                )]
+                ttl = model.observe("Zepto", query, "560087", results, DEFAULT_TTL)
+            cached[i] = (version, t + ttl)
+        else:
+            served += 1
+            accurate += entry[0] == version
+    
+    return scrapes, served, accurate / served if served else 1.0, model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=2000, help="Distinct (platform, query) keys")
+    parser.add_argument("--hours", type=float, default=24, help="Simulated hours")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    keys = make_keys(args.keys, args.hours, args.seed)
+    print(f"{args.keys} keys, {args.hours:g}h, default TTL {DEFAULT_TTL}s")
+    print(f"  {'strategy':<10}{'scrapes':>10}{'cache served':>14}{'accuracy':>10}")
+    for label, adaptive in (("fixed", False), ("adaptive", True)):
+        scrapes, served, accuracy, model = replay(keys, adaptive)
+        print(f"  {label:<10}{scrapes:>10}{served:>14}{accuracy * 100:>9.2f}%")
+        if model is not None:
+            print(f"  mean learned TTL: {model.get_stats()['platforms']['Zepto']['mean']}s")
+
+
+if __name__ == "__main__":
+    main()
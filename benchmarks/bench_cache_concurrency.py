@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Measure CacheManager lookup cost and lock contention under concurrent load.
+
+Three runs against a warm cache of popular queries x 8 platforms:
+- single-threaded cost of one lookup (ns), per shard count
+- lookups per second from N threads hammering the cache, per shard count
+- an async fan-out of concurrent searches, each reading all 8 platforms
+  either with 8 lookup() calls or with one get_many()
+
+Usage:
+    python benchmarks/bench_cache_concurrency.py [--threads 8] [--shards 1 16]
+"""
+import argparse
+import asyncio
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.cache import CacheManager
+from app.scrapers.base import ProductResult, ScrapeOutcome
+
+
+PLATFORMS = ["Amazon Fresh", "Flipkart Minutes", "JioMart Quick", "BigBasket", "Amazon", "Flipkart", "JioMart", "Zepto"]
+
+RESULTS = [ProductResult(
+    name="Amul Butter 500g",
+    price=275.0,
+    original_price=300.0,
+    discount="8% off",
+    platform="Zepto",
+    url="https://example.com/p/1",
+    image_url=None,
+    rating=4.2,
+)]
+
+
+def warm_cache(shards: int, queries: int) -> CacheManager:
+    """A cache holding every (platform, query) pair."""
+    cache = CacheManager(max_entries=None, shards=shards)
+    cache.set_many(
+        (platform, f"query {query}", "560087", RESULTS, ScrapeOutcome.OK)
+        for query in range(queries)
+        for platform in PLATFORMS
+    )
+    return cache
+
+
+def single_lookup_ns(cache: CacheManager, queries: int, lookups: int) -> float:
+    """Mean cost of one lookup() on one thread."""
+    rng = random.Random(7)
+    requests = [(rng.choice(PLATFORMS), f"query {rng.randrange(queries)}") for _ in range(lookups)]
+    started = time.perf_counter_ns()
+    for platform, query in requests:
+        cache.lookup(platform, query, "560087")
+    return (time.perf_counter_ns() - started) / lookups
+
+
+def threaded_ops(cache: CacheManager, queries: int, threads: int, seconds: float) -> float:
+    """Lookups per second from `threads` threads for `seconds`."""
+    stop = threading.Event()
+    counts = [0] * threads
+    
+    def worker(index: int):
+        rng = random.Random(index)
+        done = 0
+        while not stop.is_set():
+            for _ in range(100):
+                cache.lookup(rng.choice(PLATFORMS), f"query {rng.randrange(queries)}", "560087")
+            done += 100
+        counts[index] = done
+    
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in workers:
+        thread.join()
+    return sum(counts) / seconds
+
+
+async def fan_out(cache: CacheManager, queries: int, searches: int, batched: bool) -> float:
+    """Seconds for `searches` concurrent searches to read all 8 platforms."""
+    rng = random.Random(7)
+    
+    async def search(query: str):
+        if batched:
+            await cache.aget_many(PLATFORMS, query, "560087")
+        else:
+            for platform in PLATFORMS:
+                cache.lookup(platform, query, "560087")
+        await asyncio.sleep(0)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(search(f"query {rng.randrange(queries)}") for _ in range(searches)))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=2000, help="Distinct cached queries")
+    parser.add_argument("--lookups", type=int, default=200000, help="Single-threaded lookups")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent lookup threads")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Duration of the threaded run")
+    parser.add_argument("--searches", type=int, default=20000, help="Concurrent searches in the fan-out run")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 16])
+    args = parser.parse_args()
+    
+    print(f"{args.queries} queries x {len(PLATFORMS)} platforms cached")
+    print(f"  {'shards':>6}  {'ns/lookup':>10}  {f'{args.threads}-thread ops/s':>18}  {'8 lookups':>10}  {'get_many':>10}")
+    for shards in args.shards:
+        cache = warm_cache(shards, args.queries)
+        ns = single_lookup_ns(cache, args.queries, args.lookups)
+        ops = threaded_ops(cache, args.queries, args.threads, args.seconds)
+        single = asyncio.run(fan_out(cache, args.queries, args.searches, batched=False))
+        batched = asyncio.run(fan_out(cache, args.queries, args.searches, batched=True))
+        print(f"  {shards:>6}  {ns:>10.0f}  {ops:>18,.0f}  {single:>9.2f}s  {batched:>9.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Replay synthetic query traces against CacheManager eviction policies.
+
+Each request in a trace is one (platform, query) lookup, set on a miss.
+Query popularity is Zipfian; the "scan" traces also interleave bulk searches
+(/api/search/bulk) of unique long-tail products across all 8 platforms,
+which is the pattern that flushes popular entries out of a plain LRU.
+
+Usage:
+    python benchmarks/bench_cache_policy.py [--requests 200000] [--capacity 500]
+"""
+import argparse
+import itertools
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.cache import CacheManager
+from app.cache_policy import POLICIES
+from app.scrapers.base import ProductResult
+
+
+PLATFORMS = ["Amazon Fresh", "Flipkart Minutes", "JioMart Quick", "BigBasket", "Amazon", "Flipkart", "JioMart", "Zepto"]
+
+RESULTS = [ProductResult(
+    name="Amul Butter 500g",
+    price=275.0,
+    original_price=300.0,
+    discount="8% off",
+    platform="Zepto",
+    url="https://example.com/p/1",
+    image_url=None,
+    rating=4.2,
+)]
+
+
+def zipf_trace(requests: int, queries: int, skew: float, seed: int):
+    """(platform, query) requests with Zipf-distributed query popularity."""
+    rng = random.Random(seed)
+    weights = [1 / (rank ** skew) for rank in range(1, queries + 1)]
+    cumulative = list(itertools.accumulate(weights))
+    for query in rng.choices(range(queries), cum_weights=cumulative, k=requests):
+        yield rng.choice(PLATFORMS), f"query {query}"
+
+
+def with_scans(trace, every: int, size: int):
+    """Insert a bulk search of `size` unique products x 8 platforms every `every` requests."""
+    scan_ids = itertools.count()
+    for i, request in enumerate(trace, 1):
+        yield request
+        if i % every == 0:
+            for _ in range(size):
+                product = f"long tail {next(scan_ids)}"
+                for platform in PLATFORMS:
+                    yield platform, product
+
+
+def replay(policy: str, trace, capacity: int):
+    """Hit rate of one policy over a trace."""
+    cache = CacheManager(max_entries=capacity, policy=policy)
+    hits = total = 0
+    for platform, query in trace:
+        total += 1
+        if cache.get(platform, query, "560087")[0] is not None:
+            hits += 1
+        else:
+            cache.set(platform, query, "560087", RESULTS)
+    return hits / total, cache.get_stats()["eviction_policy"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200000, help="Requests per trace (excluding scans)")
+    parser.add_argument("--queries", type=int, default=5000, help="Distinct popular queries")
+    parser.add_argument("--capacity", type=int, default=500, help="Cache entries")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    traces = {
+        "zipf 0.8": lambda: zipf_trace(args.requests, args.queries, 0.8, args.seed),
+        "zipf 1.0": lambda: zipf_trace(args.requests, args.queries, 1.0, args.seed),
+        "zipf 0.8 + bulk scans": lambda: with_scans(
+            zipf_trace(args.requests, args.queries, 0.8, args.seed), every=2000, size=50),
+        "zipf 1.0 + bulk scans": lambda: with_scans(
+            zipf_trace(args.requests, args.queries, 1.0, args.seed), every=2000, size=50),
+    }
+    
+    print(f"Capacity {args.capacity} entries, {args.requests} requests per trace")
+    print(f"  {'trace':<24}" + "".join(f"{name:>14}" for name in POLICIES))
+    for label, make_trace in traces.items():
+        rates = []
+        for policy in POLICIES:
+            started = time.perf_counter()
+            rate, _ = replay(policy, make_trace(), args.capacity)
+            rates.append(f"{rate * 100:6.1f}% {time.perf_counter() - started:5.1f}s")
+        print(f"  {label:<24}" + "".join(f"{r:>14}" for r in rates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON encoding cost for a typical /api/search response.
+
+Builds a 40-result comparison (8 platforms x 5 products) and measures the
+per-response encode time for:
+- the old path: dataclasses.asdict + jsonable_encoder + json.dumps
+- each available backend in app.encoding (msgspec, orjson, json)
+- a full SSE "platform" frame per backend
+
+Usage:
+    python benchmarks/bench_json.py [--number 2000]
+"""
+import argparse
+import dataclasses
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+
+from app import encoding
+from app.scrapers.base import ProductResult
+
+
+PLATFORMS = [
+    ("Amazon Fresh", "2-4 hours"),
+    ("Flipkart Minutes", "6-10 mins"),
+    ("JioMart Quick", "10-30 mins"),
+    ("BigBasket", "2-4 hours"),
+    ("Zepto", "10-15 mins"),
+    ("Amazon", "1-3 days"),
+    ("Flipkart", "2-4 days"),
+    ("JioMart", "1-3 days"),
+]
+
+
+def make_comparison(per_platform: int = 5) -> dict:
+    """Build a comparison response shaped like compare_prices() output."""
+    results = []
+    for platform, delivery in PLATFORMS:
+        for i in range(per_platform):
+            results.append(ProductResult(
+                name=f"Amul Pasteurised Butter {100 * (i + 1)} g (Pack of {i + 1}) - {platform}",
+                price=55.0 + 50 * i,
+                original_price=60.0 + 55 * i,
+                discount="8% off",
+                platform=platform,
+                url=f"https://www.example.com/{platform.lower().replace(' ', '-')}/p/itm{i:06d}?pid=BTR{i:08d}&marketplace=FLIPKART",
+                image_url=f"https://img.example.com/image/416/416/xif0q/butter/{i}/amul-butter-original-imag{i:06d}.jpeg?q=70",
+                rating=4.2,
+                available=True,
+                delivery_time=delivery,
+            ))
+    return {
+        "query": "amul butter",
+        "results": results,
+        "lowest_price": min(results, key=lambda r: r.price),
+        "total_platforms": len(PLATFORMS),
+    }
+
+
+def legacy_encode(comparison: dict) -> bytes:
+    """Encode the way the endpoints used to: asdict, jsonable_encoder, json.dumps."""
+    payload = dict(comparison)
+    payload["results"] = [dataclasses.asdict(r) for r in comparison["results"]]
+    payload["lowest_price"] = dataclasses.asdict(comparison["lowest_price"])
+    return json.dumps(jsonable_encoder(payload)).encode()
+
+
+def bench(label: str, func, number: int):
+    per_call = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"  {label:<34} {per_call * 1e6:9.1f} µs")
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000, help="Encodes per timing run")
+    args = parser.parse_args()
+    
+    comparison = make_comparison()
+    platform_event = {
+        "platform": "Zepto",
+        "results": comparison["results"][:5],
+        "count": 5,
+        "cached": True,
+        "stale": False,
+    }
+    
+    print(f"Encoding a {len(comparison['results'])}-result comparison ({len(legacy_encode(comparison))} bytes)")
+    baseline = bench("legacy (asdict + jsonable_encoder)", lambda: legacy_encode(comparison), args.number)
+    
+    for name in encoding.BACKENDS:
+        if encoding.set_backend(name) != name:
+            print(f"  {name:<34} not installed")
+            continue
+        per_call = bench(f"{name} response", lambda: encoding.dumps(comparison), args.number)
+        bench(f"{name} SSE platform frame", lambda: encoding.sse_event("platform", platform_event), args.number)
+        print(f"  {'':<34} {baseline / per_call:9.1f}x faster than legacy")
+    
+    encoding.set_backend()
+
+
+if __name__ == "__main__":
+    main()
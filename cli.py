@@ -7,52 +7,28 @@ import sys
 
 async def compare_prices(query: str, pincode: str = "560087"):
     """Compare prices across all platforms including Zepto."""
-    from app.scrapers import (
-        AmazonScraper,
-        AmazonFreshScraper,
-        FlipkartScraper,
-        FlipkartMinutesScraper,
-        ZeptoScraper,
-    )
+    from app.orchestrator import merge, orchestrator
+    from app.scrapers.base import ScrapeOutcome
     
     print(f"\n🔎 Searching for '{query}' in pincode {pincode}...")
     print("=" * 60)
     
-    scrapers = [
-        ("Amazon", AmazonScraper(pincode)),
-        ("Amazon Fresh", AmazonFreshScraper(pincode)),
-        ("Flipkart", FlipkartScraper(pincode)),
-        ("Flipkart Minutes", FlipkartMinutesScraper(pincode)),
-        ("Zepto", ZeptoScraper(pincode)),
-    ]
-    
-    async def run_scraper(name, scraper, query):
-        try:
-            results = await asyncio.wait_for(scraper.search(query), timeout=35.0)
-            return name, results
-        except asyncio.TimeoutError:
-            print(f"⚠️  {name}: timeout")
-            return name, []
-        except Exception as e:
-            print(f"❌ {name}: {e}")
-            return name, []
-    
-    tasks = [run_scraper(name, scraper, query) for name, scraper in scrapers]
-    results = await asyncio.gather(*tasks)
-    
-    all_products = []
-    platforms_with_results = 0
-    
-    for name, platform_results in results:
-        if platform_results:
-            platforms_with_results += 1
-            print(f"\n📦 {name} ({len(platform_results)} products):")
-            for r in platform_results[:5]:
+    # Print each platform as soon as it answers
+    answers = []
+    async for answer in orchestrator.stream(query, pincode):
+        answers.append(answer)
+        outcome = answer.entry.outcome
+        if answer.results:
+            note = " (cached)" if answer.cached else ""
+            print(f"\n📦 {answer.platform} ({len(answer.results)} products){note}:")
+            for r in answer.results[:5]:
                 print(f"   ₹{r.price:,.0f} - {r.name[:50]}")
-                all_products.append(r)
+        elif outcome is not ScrapeOutcome.EMPTY:
+            print(f"⚠️  {answer.platform}: {outcome.value}")
     
-    if all_products:
-        lowest = min(all_products, key=lambda x: x.price)
+    comparison = merge(query, answers)
+    lowest = comparison.lowest_price
+    if lowest is not None:
         print("\n" + "=" * 60)
         print(f"🏆 LOWEST PRICE: ₹{lowest.price:,.0f}")
         print(f"   {lowest.name}")
@@ -62,12 +38,12 @@ async def compare_prices(query: str, pincode: str = "560087"):
     else:
         print("\n❌ No results found from any platform")
     
-    return all_products
+    return comparison.results
 
 
 def main():
     parser = argparse.ArgumentParser(
-        description="Compare prices across Amazon, Flipkart, and Zepto",
+        description="Compare prices across every supported platform",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
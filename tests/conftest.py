@@ -10,6 +10,7 @@ import sys
 sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
 
 from app.main import app
+from app.cache import CacheManager
 from app.scrapers.base import ProductResult
 
 
@@ -51,6 +52,12 @@ def sample_product() -> ProductResult:
     )
 
 
+@pytest.fixture
+def cache() -> CacheManager:
+    """Fresh cache manager."""
+    return CacheManager(max_entries=100)
+
+
 @pytest.fixture
 def sample_html_amazon():
     """Sample Amazon search results HTML."""
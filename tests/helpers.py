@@ -0,0 +1,41 @@
+"""Test data builders and fakes shared by the cache, catalog, orchestrator and scraper tests."""
+from typing import List, Optional
+from unittest.mock import patch
+
+import httpx
+
+from app.scrapers.base import ProductResult
+
+
+def make_results(platform: str, price: float = 99.0):
+    """Build a one-product result list for a platform."""
+    return [ProductResult(
+        name=f"Amul Butter 500g ({platform})",
+        price=price,
+        original_price=None,
+        discount=None,
+        platform=platform,
+        url="https://example.com/p/1",
+        image_url=None,
+        rating=None,
+    )]
+
+
+def mock_transport(pages: dict, requests: Optional[List[httpx.Request]] = None):
+    """
+    Patch the scrapers' httpx.AsyncClient to answer from `pages` (URL -> (status, html)).
+    
+    Unknown URLs get a 404. Requests are appended to `requests` when given.
+    """
+    real_client = httpx.AsyncClient
+    
+    def handler(request):
+        if requests is not None:
+            requests.append(request)
+        status, html = pages.get(str(request.url), (404, ""))
+        return httpx.Response(status, text=html)
+    
+    return patch(
+        "app.scrapers.base.httpx.AsyncClient",
+        lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs),
+    )
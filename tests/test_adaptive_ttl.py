@@ -0,0 +1,69 @@
+"""Unit tests for volatility-adaptive TTLs."""
+import pytest
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
+
+from app.adaptive_ttl import AdaptiveTTL
+from app.cache import CacheManager
+from app.scrapers.base import ScrapeOutcome
+from tests.helpers import make_results
+
+
+class TestAdaptiveTTL:
+    """Tests for volatility-adaptive TTLs."""
+    
+    @pytest.mark.unit
+    def test_stable_prices_stretch_ttl(self):
+        """Test that unchanged refreshes grow the TTL up to max_ttl."""
+        model = AdaptiveTTL(min_ttl=60, max_ttl=1000)
+        ttls = [model.observe("Zepto", "amul butter", "560087", make_results("Zepto"), 300) for _ in range(20)]
+        assert ttls[0] == 300
+        assert ttls[1] > 300
+        assert ttls[-1] == 1000
+    
+    @pytest.mark.unit
+    def test_price_changes_shrink_ttl(self):
+        """Test that changed refreshes shrink the TTL down to min_ttl."""
+        model = AdaptiveTTL(min_ttl=60, max_ttl=1000)
+        ttls = [model.observe("Zepto", "amul butter", "560087", make_results("Zepto", price=90 + i), 300)
+                for i in range(5)]
+        assert ttls[1] < 300
+        assert ttls[-1] == 60
+    
+    @pytest.mark.unit
+    def test_pincodes_compared_separately(self):
+        """Test that different prices in different pincodes are not counted as changes."""
+        model = AdaptiveTTL()
+        for _ in range(3):
+            model.observe("Zepto", "amul butter", "560087", make_results("Zepto", price=90), 300)
+            model.observe("Zepto", "amul butter", "110001", make_results("Zepto", price=95), 300)
+        assert model.get_stats()["changed"] == 0
+        assert model.ttl_for("Zepto", "amul butter", 300) > 300
+    
+    @pytest.mark.unit
+    def test_decays_toward_default(self):
+        """Test that a learned TTL returns toward the default when a key goes quiet."""
+        now = [0.0]
+        model = AdaptiveTTL(max_ttl=5000, half_life=3600, clock=lambda: now[0])
+        for _ in range(10):
+            model.observe("Zepto", "amul butter", "560087", make_results("Zepto"), 300)
+        learned = model.ttl_for("Zepto", "amul butter", 300)
+        now[0] = 3600
+        assert model.ttl_for("Zepto", "amul butter", 300) == pytest.approx(300 + (learned - 300) / 2)
+        now[0] = 100 * 3600
+        assert model.ttl_for("Zepto", "amul butter", 300) == pytest.approx(300)
+    
+    @pytest.mark.unit
+    def test_cache_uses_learned_ttl(self):
+        """Test that CacheManager stores OK entries with the learned TTL and reports it."""
+        cache = CacheManager(adaptive_ttl=AdaptiveTTL(max_ttl=1000))
+        for _ in range(3):
+            entry = cache.set("Zepto", "Amul Butter", "560087", make_results("Zepto"))
+        assert entry.ttl > cache.QUICK_COMMERCE_TTL
+        assert cache.set("Zepto", "nothing", "560087", []).ttl == cache.NEGATIVE_TTLS[ScrapeOutcome.EMPTY]
+        
+        stats = cache.get_stats()["adaptive_ttl"]
+        assert stats["unchanged"] == 2
+        assert stats["platforms"]["Zepto"]["count"] == 1
+        assert stats["platforms"]["Zepto"]["mean"] == round(entry.ttl, 1)
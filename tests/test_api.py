@@ -1,4 +1,5 @@
 """API tests for FastAPI endpoints."""
+import json
 import pytest
 from fastapi.testclient import TestClient
 
@@ -6,6 +7,11 @@ import sys
 sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
 
 from app.main import app
+from app import encoding
+from app.cache import cache as global_cache
+from app.orchestrator import SEARCH_PLATFORMS
+from tests.helpers import make_results
+import api_server
 
 
 @pytest.fixture
@@ -134,6 +140,38 @@ class TestPlatformsEndpoint:
             assert any(name in pn for pn in platform_names), f"{name} should be in platforms"
 
 
+class TestAndroidApi:
+    """Tests for the Android app's API server, whose responses the app depends on."""
+    
+    @pytest.mark.api
+    def test_platforms_unchanged(self):
+        """Test that the app's platform list keeps every platform and delivery time."""
+        platforms = TestClient(api_server.app).get("/api/platforms").json()["platforms"]
+        assert [p["name"] for p in platforms][-2:] == ["Blinkit", "Instamart"]
+        assert {"name": "JioMart", "delivery_time": "2-5 days"} in platforms
+    
+    @pytest.mark.api
+    def test_search_keeps_scrape_order_and_lowest_price(self):
+        """Test that results keep platform then scrape order, and lowest_price is the cheapest result."""
+        global_cache.clear()
+        for platform in SEARCH_PLATFORMS:
+            results = make_results(platform, 200.0) + make_results(platform, 150.0)
+            if platform == "JioMart":
+                results[1].available = False
+                results[1].price = 40.0
+            global_cache.set(platform, "android butter", "560001", results)
+        try:
+            data = TestClient(api_server.app).get("/api/search", params={"q": "android butter"}).json()
+        finally:
+            global_cache.clear()
+        
+        order = [p["name"] for p in api_server.ANDROID_PLATFORMS if p["name"] in SEARCH_PLATFORMS]
+        assert [r["platform"] for r in data["results"]] == [name for name in order for _ in range(2)]
+        assert [r["price"] for r in data["results"][:2]] == [200.0, 150.0]
+        assert (data["lowest_price"]["platform"], data["lowest_price"]["price"]) == ("JioMart", 40.0)
+        assert data["total_platforms"] == len(SEARCH_PLATFORMS)
+
+
 class TestCacheEndpoints:
     """Tests for cache-related endpoints."""
     
@@ -235,3 +273,51 @@ class TestErrorHandling:
         response = client.post("/api/search?q=test")
         assert response.status_code == 405
 
+
+
+class TestEncoding:
+    """Tests for the pluggable JSON encoding layer."""
+    
+    @pytest.mark.unit
+    @pytest.mark.parametrize("backend", ["msgspec", "orjson", "json"])
+    def test_backends_encode_product_results(self, backend, sample_product):
+        """Test that every backend serialises ProductResult like to_dict()."""
+        previous = encoding.backend_name
+        try:
+            if encoding.set_backend(backend) != backend:
+                pytest.skip(f"{backend} not installed")
+            payload = json.loads(encoding.dumps({"results": [sample_product]}))
+            assert payload["results"] == [sample_product.to_dict()]
+        finally:
+            encoding.set_backend(previous)
+    
+    @pytest.mark.unit
+    def test_sse_event_frame(self):
+        """Test SSE frame layout."""
+        frame = encoding.sse_event("complete", {"status": "done"})
+        assert frame.startswith(b"event: complete\ndata: ")
+        assert frame.endswith(b"\n\n")
+        assert json.loads(frame.split(b"data: ", 1)[1]) == {"status": "done"}
+    
+    @pytest.mark.unit
+    @pytest.mark.parametrize("backend", ["msgspec", "orjson", "json"])
+    def test_spliced_results_event_matches_encoded(self, backend, sample_product):
+        """Test that splicing pre-encoded results gives the frame sse_event would."""
+        previous = encoding.backend_name
+        try:
+            if encoding.set_backend(backend) != backend:
+                pytest.skip(f"{backend} not installed")
+            spliced = encoding.sse_results_event(
+                "refresh", "Zepto", encoding.dumps([sample_product]), 1, {"cached": False, "refreshed": True},
+            )
+            assert spliced == encoding.sse_event("refresh", {
+                "platform": "Zepto", "results": [sample_product], "count": 1, "cached": False, "refreshed": True,
+            })
+        finally:
+            encoding.set_backend(previous)
+    
+    @pytest.mark.unit
+    def test_unknown_backend_rejected(self):
+        """Test that an unknown backend name raises."""
+        with pytest.raises(ValueError):
+            encoding.set_backend("yaml")
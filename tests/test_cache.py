@@ -0,0 +1,388 @@
+"""Unit tests for the result cache."""
+import json
+import time
+import pytest
+from fastapi.testclient import TestClient
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
+
+from app.cache import CacheManager, cache as global_cache
+from app.cache_store import SQLiteStore
+from app.main import app
+from app.orchestrator import PLATFORM_SET_VERSION, SEARCH_PLATFORMS
+from app.scrapers.base import ScrapeOutcome, ScraperBlockedError
+from tests.helpers import make_results
+
+
+class TestCacheManager:
+    """Tests for basic get/set behaviour."""
+    
+    @pytest.mark.unit
+    def test_set_then_get(self, cache):
+        """Test that cached results are returned."""
+        cache.set("Zepto", "amul butter", "560087", make_results("Zepto"))
+        results, is_stale = cache.get("Zepto", "amul butter", "560087")
+        assert results[0].platform == "Zepto"
+        assert is_stale is False
+    
+    @pytest.mark.unit
+    def test_miss_returns_none(self, cache):
+        """Test that a miss returns None."""
+        assert cache.get("Zepto", "amul butter", "560087") == (None, False)
+
+
+class TestPreSerialisedCache:
+    """Tests for cached SSE frames and response bodies."""
+    
+    @pytest.mark.unit
+    def test_frame_is_encoded_once(self, cache):
+        """Test that the SSE frame is built once and reused."""
+        cache.set("Zepto", "amul butter", "560087", make_results("Zepto"))
+        frame, is_stale = cache.get_frame("Zepto", "amul butter", "560087")
+        again, _ = cache.get_frame("Zepto", "amul butter", "560087")
+        assert frame is again
+        assert frame.startswith(b"event: platform\ndata: ")
+        payload = json.loads(frame.split(b"data: ", 1)[1])
+        assert payload["cached"] is True
+        assert payload["count"] == 1
+    
+    @pytest.mark.unit
+    def test_response_invalidated_when_component_changes(self, cache):
+        """Test that a response body is dropped once any component entry is replaced."""
+        components = {
+            platform: cache.set(platform, "amul butter", "560087", make_results(platform)).generation
+            for platform in ["Zepto", "Amazon"]
+        }
+        cache.set_response("amul butter", "560087", "v1", b'{"results":[]}', components)
+        assert cache.get_response("Amul Butter ", "560087", "v1") == b'{"results":[]}'
+        
+        cache.set("Amazon", "amul butter", "560087", make_results("Amazon", price=89.0))
+        assert cache.get_response("amul butter", "560087", "v1") is None
+    
+    @pytest.mark.unit
+    def test_response_keyed_by_platform_set_version(self, cache):
+        """Test that a different platform-set version misses."""
+        components = {"Zepto": cache.set("Zepto", "milk", "560087", make_results("Zepto")).generation}
+        cache.set_response("milk", "560087", "v1", b'{"results":[]}', components)
+        assert cache.get_response("milk", "560087", "v2") is None
+    
+    @pytest.mark.api
+    def test_search_served_from_response_cache(self):
+        """Test that /api/search reuses the assembled body when every platform is cached."""
+        global_cache.clear()
+        for platform in SEARCH_PLATFORMS:
+            global_cache.set(platform, "amul butter", "560087", make_results(platform))
+        client = TestClient(app)
+        
+        first = client.get("/api/search?q=amul butter&pincode=560087").json()
+        assert first["total_platforms"] == len(SEARCH_PLATFORMS)
+        assert global_cache.get_response("amul butter", "560087", PLATFORM_SET_VERSION) is not None
+        
+        second = client.get("/api/search?q=Amul Butter&pincode=560087").json()
+        assert second["query"] == "Amul Butter"
+        assert second["results"] == first["results"]
+        assert global_cache.get_stats()["response_hits"] >= 1
+        global_cache.clear()
+
+
+class TestSecondaryIndexes:
+    """Tests for platform / pincode / query invalidation."""
+    
+    @pytest.fixture
+    def populated(self, cache):
+        """Cache holding two platforms x two pincodes x two queries."""
+        for platform in ["Zepto", "Amazon"]:
+            for pincode in ["560087", "400001"]:
+                for query in ["amul butter", "milk"]:
+                    cache.set(platform, query, pincode, make_results(platform))
+        return cache
+    
+    @pytest.mark.unit
+    def test_invalidate_platform(self, populated):
+        """Test dropping every entry for a platform."""
+        assert populated.invalidate_platform("Zepto") == 4
+        assert populated.get("Zepto", "milk", "560087") == (None, False)
+        assert populated.get("Amazon", "milk", "560087")[0] is not None
+        assert populated.get_stats()["platforms"]["Zepto"]["entries"] == 0
+    
+    @pytest.mark.unit
+    def test_invalidate_pincode_and_query(self, populated):
+        """Test dropping by pincode, and by normalised query."""
+        assert populated.invalidate_pincode("400001") == 4
+        assert populated.invalidate_query("  MILK ") == 2
+        assert populated.get_stats()["entries"] == 2
+    
+    @pytest.mark.unit
+    def test_invalidate_where_intersects(self, populated):
+        """Test that combined filters only drop entries matching all of them."""
+        assert populated.invalidate_where(platform="Amazon", pincode="560087") == 2
+        assert populated.get("Amazon", "milk", "400001")[0] is not None
+    
+    @pytest.mark.unit
+    def test_per_platform_stats(self, populated):
+        """Test per-platform entry counts and memory."""
+        platforms = populated.get_stats()["platforms"]
+        assert platforms["Zepto"]["entries"] == 4
+        assert platforms["Zepto"]["memory_bytes"] > 0
+    
+    @pytest.mark.unit
+    def test_eviction_updates_indexes(self):
+        """Test that LRU eviction removes entries from the indexes."""
+        cache = CacheManager(max_entries=2)
+        for query in ["a", "b", "c"]:
+            cache.set("Zepto", query, "560087", make_results("Zepto"))
+        assert cache.get_stats()["platforms"]["Zepto"]["entries"] == 2
+        assert cache.invalidate_query("a") == 0
+    
+    @pytest.mark.api
+    def test_invalidate_endpoint(self):
+        """Test the admin invalidation endpoint."""
+        client = TestClient(app)
+        global_cache.set("Zepto", "bread", "560087", make_results("Zepto"))
+        response = client.post("/api/cache/invalidate?platform=Zepto")
+        assert response.status_code == 200
+        assert response.json()["removed"] >= 1
+        assert client.post("/api/cache/invalidate").status_code == 400
+
+
+class TestNegativeCaching:
+    """Tests for typed scrape outcomes, negative TTLs and stale-if-error."""
+    
+    @pytest.mark.unit
+    def test_empty_results_get_short_ttl(self, cache):
+        """Test that an empty scrape is cached with the negative TTL."""
+        entry = cache.set("Amazon", "unobtainium", "560087", [])
+        assert entry.outcome is ScrapeOutcome.EMPTY
+        assert entry.ttl == CacheManager.NEGATIVE_TTLS[ScrapeOutcome.EMPTY]
+        assert cache.get("Amazon", "unobtainium", "560087") == ([], False)
+    
+    @pytest.mark.unit
+    def test_failed_refetch_serves_last_good_data(self, cache):
+        """Test that a failure after expiry keeps serving the expired good data as stale."""
+        good = cache.set("Zepto", "paneer", "560087", make_results("Zepto"))
+        good.timestamp -= good.ttl + 1
+        assert cache.get("Zepto", "paneer", "560087") == (None, False)
+        
+        entry = cache.set("Zepto", "paneer", "560087", [], outcome=ScrapeOutcome.TIMEOUT)
+        assert entry.fallback is True
+        assert entry.data == make_results("Zepto")
+        assert entry.ttl == CacheManager.NEGATIVE_TTLS[ScrapeOutcome.TIMEOUT]
+        
+        frame, _ = cache.get_frame("Zepto", "paneer", "560087")
+        payload = json.loads(frame.split(b"data: ", 1)[1])
+        assert payload["stale"] is True
+        assert payload["outcome"] == "timeout"
+        assert cache.get_stats()["fallbacks"] == 1
+    
+    @pytest.mark.unit
+    def test_empty_refetch_serves_last_good_data(self, cache):
+        """Test that an empty scrape (how browser scrapers report failures) does not wipe good results."""
+        cache.set("BigBasket", "paneer", "560087", make_results("BigBasket"))
+        entry = cache.set("BigBasket", "paneer", "560087", [])
+        assert (entry.outcome, entry.fallback) == (ScrapeOutcome.EMPTY, True)
+        assert entry.data == make_results("BigBasket")
+        assert entry.ttl == CacheManager.NEGATIVE_TTLS[ScrapeOutcome.EMPTY]
+        assert cache.get("BigBasket", "paneer", "560087") == (make_results("BigBasket"), False)
+    
+    @pytest.mark.unit
+    def test_no_fallback_past_grace_window(self, cache):
+        """Test that data older than STALE_IF_ERROR is not served."""
+        good = cache.set("Zepto", "paneer", "560087", make_results("Zepto"))
+        good.timestamp = good.good_at = time.monotonic() - CacheManager.STALE_IF_ERROR - 1
+        cache.get("Zepto", "paneer", "560087")
+        
+        entry = cache.set("Zepto", "paneer", "560087", [], outcome=ScrapeOutcome.ERROR)
+        assert entry.fallback is False
+        assert entry.data == []
+    
+    @pytest.mark.unit
+    async def test_blocked_scrape_is_typed(self):
+        """Test that fetch_platform records a blocked scrape as BLOCKED."""
+        from app.orchestrator import fetch_platform
+        global_cache.clear()
+        
+        class BlockedScraper:
+            async def search(self, query):
+                raise ScraperBlockedError("HTTP 429")
+        
+        entry = await fetch_platform("Amazon", BlockedScraper(), "ghee", "560087", timeout=5)
+        assert entry.outcome is ScrapeOutcome.BLOCKED
+        assert entry.ttl == CacheManager.NEGATIVE_TTLS[ScrapeOutcome.BLOCKED]
+        global_cache.clear()
+
+
+class TestByteBudget:
+    """Tests for compact entry storage and the memory budget."""
+    
+    @pytest.mark.unit
+    def test_evicts_against_byte_budget(self):
+        """Test that total entry bytes stay within max_bytes."""
+        entry_size = CacheManager().set("Zepto", "q", "560087", make_results("Zepto")).size
+        cache = CacheManager(max_entries=None, max_bytes=entry_size * 3)
+        for query in ["a", "b", "c", "d", "e"]:
+            cache.set("Zepto", query, "560087", make_results("Zepto"))
+        
+        stats = cache.get_stats()
+        assert stats["entries"] == 3
+        assert stats["evictions"] == 2
+        assert stats["memory_bytes"] <= stats["max_bytes"]
+        assert cache.get("Zepto", "a", "560087") == (None, False)
+    
+    @pytest.mark.unit
+    def test_compressed_entries_round_trip(self):
+        """Test that compressed payloads decode and splice into frames unchanged."""
+        plain = CacheManager()
+        packed = CacheManager(compress=True)
+        results = make_results("Zepto") * 10
+        plain_entry = plain.set("Zepto", "milk", "560087", results)
+        packed_entry = packed.set("Zepto", "milk", "560087", results)
+        
+        assert len(packed_entry.payload) < len(plain_entry.payload)
+        assert packed_entry.data == results
+        assert packed.get_frame("Zepto", "milk", "560087") == plain.get_frame("Zepto", "milk", "560087")
+    
+    @pytest.mark.unit
+    def test_platform_bytes_add_up(self, cache):
+        """Test that per-platform bytes (frames included) sum to the total."""
+        for platform in ["Zepto", "Amazon"]:
+            cache.set(platform, "milk", "560087", make_results(platform))
+        cache.get_frame("Zepto", "milk", "560087")
+        
+        stats = cache.get_stats()
+        assert sum(p["memory_bytes"] for p in stats["platforms"].values()) == stats["memory_bytes"]
+        assert stats["platforms"]["Zepto"]["memory_bytes"] > stats["platforms"]["Amazon"]["memory_bytes"]
+
+
+class TestIncrementalStats:
+    """Tests for incrementally maintained statistics and monotonic expiry."""
+    
+    @pytest.mark.unit
+    def test_wall_clock_jump_does_not_expire(self, cache, monkeypatch):
+        """Test that expiry ignores changes to the wall clock."""
+        cache.set("Zepto", "amul butter", "560087", make_results("Zepto"))
+        wall = time.time
+        monkeypatch.setattr(time, "time", lambda: wall() + 86400)
+        assert cache.get("Zepto", "amul butter", "560087") == (make_results("Zepto"), False)
+    
+    @pytest.mark.unit
+    def test_per_platform_counters(self, cache):
+        """Test per-platform hits, misses, expirations and hit-age histograms."""
+        cache.set("Zepto", "milk", "560087", make_results("Zepto"))
+        cache.get("Zepto", "milk", "560087")
+        cache.get("Amazon", "milk", "560087")
+        entry, _ = cache.lookup("Zepto", "milk", "560087")
+        entry.timestamp -= entry.ttl + 1
+        entry.good_at = entry.timestamp
+        entry.count = 0
+        cache.get("Zepto", "milk", "560087")
+        
+        stats = cache.get_stats()
+        zepto = stats["platforms"]["Zepto"]
+        assert (zepto["hits"], zepto["misses"], zepto["expirations"], zepto["entries"]) == (2, 1, 1, 0)
+        assert zepto["hit_age"]["count"] == 2
+        assert zepto["hit_age"]["buckets"]["<=10"] == 2
+        assert stats["platforms"]["Amazon"]["misses"] == 1
+        assert stats["hit_age"]["count"] == 2
+        assert stats["expirations"] == 1
+    
+    @pytest.mark.unit
+    def test_ttl_histogram_and_response_bytes_track_contents(self, cache):
+        """Test that live-entry and response totals follow inserts, overwrites and removals."""
+        cache.set("Zepto", "milk", "560087", make_results("Zepto"))
+        cache.set("Zepto", "milk", "560087", make_results("Zepto", price=89.0))
+        cache.set("Amazon", "milk", "560087", [])
+        cache.set_response("milk", "560087", "v1", b"12345", {})
+        cache.set_response("milk", "560087", "v1", b"123", {})
+        
+        stats = cache.get_stats()
+        assert stats["ttls"]["count"] == 2
+        assert stats["ttls"]["buckets"]["<=300"] == 1
+        assert stats["negative_entries"] == 1
+        assert stats["response_bytes"] == 3
+        
+        cache.invalidate_platform("Amazon")
+        assert cache.get_stats()["negative_entries"] == 0
+        assert cache.get_stats()["ttls"]["count"] == 1
+    
+    @pytest.mark.unit
+    def test_promoted_entries_keep_their_age(self, tmp_path):
+        """Test that an entry read from the L2 store is aged from its wall-clock scrape time."""
+        store = SQLiteStore(str(tmp_path / "cache.sqlite3"))
+        cache = CacheManager(store=store)
+        key = cache._store_key(cache._make_key("Zepto", "milk", "560087"))
+        store.set(key, make_results("Zepto"), created_at=time.time() - 280, ttl=300,
+                  platform="Zepto", query="milk", pincode="560087")
+        store.flush()
+        
+        entry, is_stale = cache.lookup("Zepto", "milk", "560087")
+        assert entry.age_seconds == pytest.approx(280, abs=5)
+        assert is_stale is True
+        assert store.get_stats()["rows"] == 1
+        store.close()
+
+
+class TestShardedCache:
+    """Tests for the sharded cache and its batch / async API."""
+    
+    @pytest.mark.unit
+    def test_keys_are_tuples(self, cache):
+        """Test that entries are keyed by (platform, canonical query, location) tuples."""
+        key = cache._make_key("Zepto", "  Amul MILK ", "560087")
+        assert key == cache.flight_key("Zepto", "milk amul", "560087")
+        assert isinstance(key, tuple) and key[0] == "Zepto"
+        assert len(cache._store_key(key)) == 32
+    
+    @pytest.mark.unit
+    def test_entries_spread_over_shards(self):
+        """Test that entries spread over the shards and stats merge back together."""
+        cache = CacheManager(max_entries=None, shards=8)
+        for i in range(200):
+            cache.set(SEARCH_PLATFORMS[i % 8], f"query {i}", "560087", make_results("Zepto"))
+            cache.get(SEARCH_PLATFORMS[i % 8], f"query {i}", "560087")
+        cache.get("Zepto", "never cached", "560087")
+        
+        assert sum(1 for shard in cache._shards if shard.entries) > 4
+        stats = cache.get_stats()
+        assert (stats["entries"], stats["shards"], stats["hits"], stats["misses"]) == (200, 8, 200, 1)
+        assert stats["hit_age"]["count"] == 200
+        assert sum(platform["entries"] for platform in stats["platforms"].values()) == 200
+        assert cache.invalidate_where(pincode="560087") == 200
+    
+    @pytest.mark.unit
+    def test_caps_are_split_between_shards(self):
+        """Test that each shard gets its share of the entry cap."""
+        cache = CacheManager(max_entries=64, shards=4)
+        for i in range(500):
+            cache.set("Zepto", f"query {i}", "560087", make_results("Zepto"))
+        assert [shard.max_entries for shard in cache._shards] == [16] * 4
+        assert cache.get_stats()["entries"] <= 64
+    
+    @pytest.mark.unit
+    def test_get_many_and_set_many(self):
+        """Test batch reads and writes for a fan-out across platforms."""
+        cache = CacheManager(shards=4)
+        entries = cache.set_many(
+            (platform, "milk", "560087", make_results(platform), ScrapeOutcome.OK)
+            for platform in SEARCH_PLATFORMS[:5]
+        )
+        assert [entry.platform for entry in entries] == SEARCH_PLATFORMS[:5]
+        
+        found = cache.get_many(SEARCH_PLATFORMS, "MILK", "560087")
+        assert list(found) == SEARCH_PLATFORMS
+        assert [platform for platform, (entry, _) in found.items() if entry is not None] == SEARCH_PLATFORMS[:5]
+        assert found[SEARCH_PLATFORMS[0]][0] is entries[0]
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["misses"]) == (5, len(SEARCH_PLATFORMS) - 5)
+    
+    @pytest.mark.unit
+    async def test_async_api_reads_l2_off_the_loop(self, tmp_path):
+        """Test that aget_many promotes L2 entries and aset_many persists them."""
+        path = str(tmp_path / "cache.db")
+        writer = CacheManager(shards=4, store=SQLiteStore(path))
+        await writer.aset_many([("Amazon", "milk", "560087", make_results("Amazon"), ScrapeOutcome.OK)])
+        
+        reader = CacheManager(shards=4, store=SQLiteStore(path))
+        found = await reader.aget_many(["Amazon", "Flipkart"], "milk", "560087")
+        assert found["Amazon"][0].data[0].platform == "Amazon"
+        assert found["Flipkart"] == (None, False)
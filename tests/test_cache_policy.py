@@ -0,0 +1,60 @@
+"""Unit tests for the cache eviction policies."""
+import pytest
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
+
+from app.cache import CacheManager
+from app.cache_policy import CountMinSketch
+from tests.helpers import make_results
+
+
+class TestEvictionPolicy:
+    """Tests for LRU and W-TinyLFU eviction."""
+    
+    def run_scan(self, policy: str) -> int:
+        """Warm 10 popular keys, then push 100 one-off keys through a 20-entry cache."""
+        cache = CacheManager(max_entries=20, policy=policy)
+        popular = [f"popular {i}" for i in range(10)]
+        for _ in range(5):
+            for query in popular:
+                if cache.get("Zepto", query, "560087")[0] is None:
+                    cache.set("Zepto", query, "560087", make_results("Zepto"))
+        for i in range(100):
+            cache.set("Zepto", f"long tail {i}", "560087", make_results("Zepto"))
+        return sum(cache.get("Zepto", query, "560087")[0] is not None for query in popular)
+    
+    @pytest.mark.unit
+    def test_tinylfu_resists_scans(self):
+        """Test that a scan of one-off keys flushes LRU but not W-TinyLFU."""
+        assert self.run_scan("lru") == 0
+        assert self.run_scan("w-tinylfu") == 10
+    
+    @pytest.mark.unit
+    def test_policy_stats(self):
+        """Test admission counters in cache stats."""
+        cache = CacheManager(max_entries=5, policy="w-tinylfu")
+        for i in range(20):
+            cache.set("Zepto", f"q{i}", "560087", make_results("Zepto"))
+        stats = cache.get_stats()["eviction_policy"]
+        assert stats["policy"] == "w-tinylfu"
+        assert stats["window"] + stats["probation"] + stats["protected"] == 5
+        assert stats["admitted"] + stats["rejected"] == 15
+    
+    @pytest.mark.unit
+    def test_sketch_estimates_and_ages(self):
+        """Test count-min estimates and halving on reset."""
+        sketch = CountMinSketch(width=64, sample_factor=1)
+        for _ in range(6):
+            sketch.increment("hot")
+        assert sketch.estimate("hot") >= 6
+        for i in range(64):
+            sketch.increment(f"k{i}")
+        assert sketch.resets >= 1
+        assert sketch.estimate("hot") <= 3
+    
+    @pytest.mark.unit
+    def test_unknown_policy(self):
+        """Test that an unknown policy name is rejected."""
+        with pytest.raises(ValueError):
+            CacheManager(policy="fifo")
@@ -0,0 +1,68 @@
+"""Unit tests for pincode zones and cache key scopes."""
+import pytest
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
+
+from app.cache import CacheManager
+from app.geo import DEFAULT_KEY_SCOPES, KeyScope, KeyScopePolicy, parse_scopes, zone_for
+from tests.helpers import make_results
+
+
+class TestKeyScopes:
+    """Tests for pincode-independent cache keys."""
+    
+    BANGALORE = ["560001", "560034", "560066", "560087", "562125"]
+    
+    @pytest.fixture
+    def scoped(self):
+        """Cache with the default e-commerce zone scopes."""
+        return CacheManager(max_entries=None, key_scopes=KeyScopePolicy(DEFAULT_KEY_SCOPES))
+    
+    @pytest.mark.unit
+    def test_zone_lookup_and_scope_parsing(self):
+        """Test the pincode -> zone table and PRICEHUNT_KEY_SCOPES parsing."""
+        assert zone_for("560087") == zone_for("562125") == "bengaluru"
+        assert zone_for("122001") == zone_for("110001") == "delhi-ncr"
+        assert zone_for("641001") == "641"
+        assert zone_for("abc") is None
+        assert parse_scopes("Amazon=national, Zepto=PINCODE,") == {
+            "Amazon": KeyScope.NATIONAL, "Zepto": KeyScope.PINCODE}
+        with pytest.raises(ValueError):
+            parse_scopes("Amazon=city")
+    
+    @pytest.mark.unit
+    def test_scrapes_drop_with_pincodes_served(self, scoped):
+        """Test that zone-scoped platforms scrape once per city, quick commerce once per pincode."""
+        scrapes = {}
+        for pincode in self.BANGALORE + ["400001"]:
+            for platform in ["Amazon", "Flipkart", "Zepto"]:
+                if scoped.get(platform, "atta", pincode)[0] is None:
+                    scrapes[platform] = scrapes.get(platform, 0) + 1
+                    scoped.set(platform, "atta", pincode, make_results(platform))
+        
+        assert scrapes == {"Amazon": 2, "Flipkart": 2, "Zepto": 6}
+        assert scoped.get_stats()["entries"] == 10
+        assert scoped.flight_key("Amazon", "atta", "560001") == scoped.flight_key("Amazon", "atta", "560087")
+        assert scoped.flight_key("Zepto", "atta", "560001") != scoped.flight_key("Zepto", "atta", "560087")
+    
+    @pytest.mark.unit
+    def test_national_scope(self):
+        """Test that a national platform shares one entry across cities."""
+        cache = CacheManager(key_scopes=KeyScopePolicy({"Amazon": KeyScope.NATIONAL}))
+        cache.set("Amazon", "atta", "560087", make_results("Amazon"))
+        assert cache.get("Amazon", "atta", "110001")[0] is not None
+        assert cache.get("Flipkart", "atta", "110001")[0] is None
+    
+    @pytest.mark.unit
+    def test_invalidate_pincode_covers_zone_entries(self, scoped):
+        """Test that invalidating a pincode drops the zone entries serving it, not other zones'."""
+        for pincode in ["560087", "400001"]:
+            for platform in ["Amazon", "Zepto"]:
+                scoped.set(platform, "atta", pincode, make_results(platform))
+        
+        assert scoped.invalidate_pincode("560001") == 1
+        assert scoped.get("Amazon", "atta", "560087")[0] is None
+        assert scoped.get("Zepto", "atta", "560087")[0] is not None
+        assert scoped.invalidate_where(platform="Zepto", pincode="560087") == 1
+        assert scoped.get("Amazon", "atta", "400001")[0] is not None
@@ -0,0 +1,62 @@
+"""Unit tests for batch price and pack-size normalisation."""
+import pytest
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
+
+from app.scrapers.amazon import AmazonScraper
+from app.scrapers.normalize import canonical_quantities, extract_prices, normalize_batch, parse_quantity
+
+
+class TestNormalize:
+    """Tests for batch price and pack-size normalisation."""
+    
+    @pytest.mark.unit
+    def test_extract_prices_filters_range(self):
+        """Test extracting ₹ amounts from text."""
+        assert extract_prices("₹1,299 ₹1,499 ₹0", max_price=50000) == [1299.0, 1499.0]
+        assert extract_prices("₹60000 ₹99", max_price=50000) == [99.0]
+    
+    @pytest.mark.unit
+    def test_parse_quantity_units(self):
+        """Test pack sizes are converted to base units."""
+        assert parse_quantity("Amul Butter 500 gm") == (500.0, "g")
+        assert parse_quantity("Aashirvaad Atta 5kg") == (5000.0, "g")
+        assert parse_quantity("Milk 1 Ltr") == (1000.0, "ml")
+        assert parse_quantity("Coke 2 x 750 ml") == (1500.0, "ml")
+        assert parse_quantity("Eggs 6 pcs") == (6.0, "pc")
+        assert parse_quantity("Good Day Cookies") == (None, None)
+    
+    @pytest.mark.unit
+    def test_canonical_quantities(self):
+        """Test pack sizes are rewritten as base-unit tokens in place."""
+        assert canonical_quantities("milk 1 ltr") == "milk 1000ml"
+        assert canonical_quantities("butter 2 x 500 g") == "butter 1000g"
+        assert canonical_quantities("atta 1.5kg pack") == "atta 1500g pack"
+    
+    @pytest.mark.unit
+    def test_normalize_batch_columns(self):
+        """Test batch normalisation returns parallel columns."""
+        batch = normalize_batch(
+            ["₹275", 58, "₹1,299"],
+            ["₹300", 50, None],
+            ["Amul Butter 500g", "Amul Butter 100 g", "Olive Oil 1 L"],
+        )
+        assert len(batch) == 3
+        assert batch.price == [275.0, 58.0, 1299.0]
+        assert batch.mrp == [300.0, None, None]
+        assert batch.discount_pct == [8, None, None]
+        assert batch.discount_labels() == ["8% off", None, None]
+        assert batch.unit == ["g", "g", "ml"]
+        assert batch.unit_price == [550.0, 580.0, 1299.0]
+        assert batch.unit_labels() == ["kg", "kg", "l"]
+    
+    @pytest.mark.unit
+    def test_finalize_results_fills_discounts(self, sample_product):
+        """Test that finalize_results computes discounts and unit prices for a page of results."""
+        sample_product.discount = None
+        results = AmazonScraper().finalize_results([sample_product])
+        assert results[0].original_price == 120.0
+        assert results[0].discount == "17% off"
+        assert (results[0].unit_price, results[0].unit) == (198.0, "kg")
+        assert results[0].to_dict()["unit_price"] == 198.0
@@ -0,0 +1,136 @@
+"""Unit tests for the search orchestrator."""
+import asyncio
+import dataclasses
+import inspect
+import time
+import pytest
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
+
+from app.cache import cache as global_cache
+from app.orchestrator import BROWSER_PLATFORMS, PLATFORMS, SEARCH_PLATFORMS, SearchOrchestrator
+from app.scrapers.deadline import Deadline
+from tests.helpers import make_results
+
+
+class TestSearchOrchestrator:
+    """Tests for the shared search fan-out."""
+    
+    @staticmethod
+    def fake_platforms(monkeypatch, delays):
+        """Register scrapers that answer after the given delays, counting their searches."""
+        searches = []
+        for name, delay in delays.items():
+            class FakeScraper:
+                def __init__(self, pincode, name=name, delay=delay):
+                    self.name, self.delay = name, delay
+                
+                async def search(self, query):
+                    searches.append(self.name)
+                    await asyncio.sleep(self.delay)
+                    return make_results(self.name, price=50.0 + self.delay * 100)
+            
+            monkeypatch.setitem(PLATFORMS, name, dataclasses.replace(PLATFORMS[name], scraper_class=FakeScraper))
+        return searches
+    
+    @pytest.mark.unit
+    def test_registry(self):
+        """Test that unsearchable platforms are listed but never searched."""
+        assert {"Blinkit", "Instamart"} <= set(PLATFORMS)
+        assert not {"Blinkit", "Instamart"} & set(SEARCH_PLATFORMS)
+        assert SearchOrchestrator().platforms == SEARCH_PLATFORMS
+        with pytest.raises(ValueError):
+            SearchOrchestrator(["Amazon", "Myntra"])
+    
+    @pytest.mark.unit
+    def test_browser_platforms_cover_playwright_scrapers(self):
+        """Test that every searched platform whose scraper starts Playwright takes a browser slot."""
+        launches_browser = {
+            name for name in SEARCH_PLATFORMS
+            if "from playwright" in inspect.getsource(inspect.getmodule(PLATFORMS[name].scraper_class))
+        }
+        assert launches_browser == BROWSER_PLATFORMS
+        assert {"BigBasket", "JioMart", "JioMart Quick"} <= BROWSER_PLATFORMS
+    
+    @pytest.mark.unit
+    async def test_search_scrapes_misses_concurrently(self, monkeypatch):
+        """Test that every uncached platform, Zepto included, is scraped at once and merged."""
+        query = f"orchestrate-{time.time()}"
+        searches = self.fake_platforms(monkeypatch, {"Zepto": 0.2, "Amazon": 0.2, "Flipkart": 0.2})
+        global_cache.set("JioMart", query, "560087", make_results("JioMart", price=49.0))
+        
+        started = time.monotonic()
+        comparison = await SearchOrchestrator(["Zepto", "Amazon", "Flipkart", "JioMart"]).search(query, "560087")
+        assert time.monotonic() - started < 0.5
+        
+        assert sorted(searches) == ["Amazon", "Flipkart", "Zepto"]
+        assert [r.platform for r in comparison.results] == ["Zepto", "Amazon", "Flipkart", "JioMart"]
+        assert comparison.total_platforms == 4
+        assert comparison.lowest_price.platform == "JioMart"
+        assert set(comparison.components) == {"Zepto", "Amazon", "Flipkart", "JioMart"}
+        global_cache.invalidate_query(query)
+    
+    @pytest.mark.unit
+    async def test_stream_yields_cached_then_completion_order(self, monkeypatch):
+        """Test that cached platforms come first, then scrapes as they finish."""
+        query = f"orchestrate-{time.time()}"
+        self.fake_platforms(monkeypatch, {"Zepto": 0.1, "Amazon": 0.01})
+        global_cache.set("Flipkart", query, "560087", make_results("Flipkart"))
+        
+        answers = [answer async for answer in SearchOrchestrator(["Zepto", "Amazon", "Flipkart"]).stream(query, "560087")]
+        assert [(a.platform, a.cached) for a in answers] == [("Flipkart", True), ("Amazon", False), ("Zepto", False)]
+        global_cache.invalidate_query(query)
+    
+    @pytest.mark.unit
+    async def test_deadline_returns_partial_results(self, monkeypatch):
+        """Test that platforms still scraping at the deadline are listed as pending, not cached as failures."""
+        query = f"orchestrate-{time.time()}"
+        self.fake_platforms(monkeypatch, {"Zepto": 2.0, "Amazon": 0.01})
+        global_cache.set("Flipkart", query, "560087", make_results("Flipkart"))
+        
+        started = time.monotonic()
+        comparison = await SearchOrchestrator(["Zepto", "Amazon", "Flipkart"]).search(
+            query, "560087", Deadline.from_ms(300),
+        )
+        assert time.monotonic() - started < 1.0
+        
+        assert [r.platform for r in comparison.results] == ["Amazon", "Flipkart"]
+        assert comparison.pending_platforms == ["Zepto"]
+        await asyncio.sleep(0.1)
+        assert global_cache.peek("Zepto", query, "560087") is None
+        global_cache.invalidate_query(query)
+    
+    @pytest.mark.unit
+    async def test_unbounded_search_rescrapes_deadline_cut_flight(self, monkeypatch):
+        """Test that a search without a deadline does not inherit a shared scrape cut short by another's."""
+        query = f"orchestrate-{time.time()}"
+        searches = self.fake_platforms(monkeypatch, {"Zepto": 0.5})
+        orchestrator = SearchOrchestrator(["Zepto"])
+        
+        bounded, unbounded = await asyncio.gather(
+            orchestrator.search(query, "560087", Deadline.from_ms(200)),
+            orchestrator.search(query, "560087"),
+        )
+        assert bounded.pending_platforms == ["Zepto"]
+        assert [r.platform for r in unbounded.results] == ["Zepto"]
+        assert searches == ["Zepto", "Zepto"]
+        global_cache.invalidate_query(query)
+    
+    @pytest.mark.unit
+    async def test_bulk_search_deduplicates_and_runs_concurrently(self, monkeypatch):
+        """Test that a bulk search scrapes each distinct product once, all at the same time."""
+        stamp = time.time()
+        searches = self.fake_platforms(monkeypatch, {"Zepto": 0.2, "Amazon": 0.2})
+        products = [f"amul butter {stamp}", f"  Amul BUTTER {stamp}", f"milk {stamp}", f"bread {stamp}"]
+        
+        started = time.monotonic()
+        comparisons = await SearchOrchestrator(["Zepto", "Amazon"]).search_many(products, "560087")
+        assert time.monotonic() - started < 0.6
+        
+        assert len(searches) == 6   # 3 distinct products x 2 platforms
+        assert [comparison.query for comparison in comparisons] == products
+        assert comparisons[0].results == comparisons[1].results
+        assert all(comparison.total_platforms == 2 for comparison in comparisons)
+        for product in products:
+            global_cache.invalidate_query(product)
@@ -0,0 +1,139 @@
+"""Unit tests for popularity tracking and prefetching."""
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
+
+from app.cache import cache as global_cache
+from app.main import app
+from app.orchestrator import BROWSER_PLATFORMS, SEARCH_PLATFORMS
+from app.prefetch import PREFETCH_PRIORITY, PopularityTracker, PrefetchScheduler
+from app.refresh import RefreshQueue
+from tests.helpers import make_results
+
+
+class TestPrefetch:
+    """Tests for popularity tracking and scheduled cache warming."""
+    
+    @pytest.mark.unit
+    def test_popularity_decays_and_ranks(self):
+        """Test that scores merge spellings, halve per half-life and rank the top queries."""
+        now = [0.0]
+        tracker = PopularityTracker(half_life=3600, clock=lambda: now[0])
+        for _ in range(4):
+            tracker.record("Amul Butter", "560087")
+        tracker.record("butter amul", "560087")
+        tracker.record("milk", "560087")
+        tracker.record("milk", "400001")
+        
+        assert tracker.score("amul butter", "560087") == 5
+        now[0] = 3600
+        assert tracker.score("amul butter", "560087") == pytest.approx(2.5)
+        assert [(query, pincode) for query, pincode, _ in tracker.top(2)] == [
+            ("butter amul", "560087"), ("milk", "560087")]
+    
+    @pytest.mark.unit
+    def test_popularity_is_bounded(self):
+        """Test that the least popular keys are forgotten past max_keys."""
+        tracker = PopularityTracker(max_keys=10)
+        tracker.record("staple", "560087")
+        tracker.record("staple", "560087")
+        for i in range(20):
+            tracker.record(f"one-off {i}", "560087")
+        assert tracker.get_stats()["tracked"] <= 10
+        assert tracker.score("staple", "560087") == pytest.approx(2)
+    
+    def make_scheduler(self, cache, **kwargs):
+        """Scheduler over two platforms whose refreshes are recorded, not run."""
+        scheduled = []
+        loop = asyncio.get_running_loop()
+        
+        def schedule(platform, query, pincode, priority):
+            future = loop.create_future()
+            scheduled.append((platform, query, pincode, priority, future))
+            return future
+        
+        tracker = PopularityTracker()
+        scheduler = PrefetchScheduler(
+            tracker, cache, RefreshQueue(), schedule,
+            platforms=["Zepto", "Amazon"], browser_platforms=["Zepto"], **kwargs)
+        return tracker, scheduler, scheduled
+    
+    async def test_prefetches_due_entries_of_top_queries(self, cache):
+        """Test that missing and nearly stale entries are queued and fresh ones are not."""
+        tracker, scheduler, scheduled = self.make_scheduler(cache, top_n=1, max_in_flight=10)
+        tracker.record("milk", "560087")
+        tracker.record("milk", "560087")
+        tracker.record("bread", "560087")
+        fresh = cache.set("Amazon", "milk", "560087", make_results("Amazon"))
+        assert fresh.stale_in > scheduler.lead
+        
+        assert scheduler.run_once() == 1
+        assert [item[:4] for item in scheduled] == [("Zepto", "milk", "560087", PREFETCH_PRIORITY)]
+        
+        fresh.timestamp -= fresh.ttl * 0.8 - 30
+        assert scheduler.run_once() == 1
+        assert scheduled[-1][0] == "Amazon"
+    
+    async def test_budget_and_browser_slots(self, cache):
+        """Test that the hourly budget and browser slots cap what is queued."""
+        tracker, scheduler, scheduled = self.make_scheduler(cache, budget_per_hour=3600, interval=3)
+        for query in ["milk", "bread", "eggs"]:
+            tracker.record(query, "560087")
+        
+        assert scheduler.run_once() == 2
+        assert [platform for platform, *_ in scheduled] == ["Zepto", "Amazon"]
+        assert scheduler.get_stats()["skipped_slots"] == 1
+        
+        for *_, future in scheduled:
+            future.set_result(None)
+        await asyncio.sleep(0)
+        assert scheduler.get_stats()["browser_in_flight"] == 0
+        assert scheduler.get_stats()["failed"] == 2
+        
+        scheduler.budget_per_hour = 0
+        assert scheduler.run_once() == 0
+        assert scheduler.get_stats()["skipped_budget"] == 1
+    
+    async def test_reports_hit_rate_lift(self, cache):
+        """Test that hits on prefetched entries are reported as lift."""
+        tracker, scheduler, scheduled = self.make_scheduler(cache, max_in_flight=10)
+        tracker.record("milk", "560087")
+        scheduler.run_once()
+        for platform, query, pincode, _, future in scheduled:
+            future.set_result(cache.set(platform, query, pincode, make_results(platform)))
+        await asyncio.sleep(0)
+        
+        cache.get("Zepto", "milk", "560087")
+        cache.get("Zepto", "bread", "560087")
+        stats = scheduler.get_stats()
+        assert stats["completed"] == 2
+        assert stats["prefetch_hits"] == 1
+        assert stats["hit_rate_lift"] == 50.0
+        assert scheduler.get_stats(cache_stats=cache.get_stats()) == stats
+    
+    @pytest.mark.unit
+    def test_app_prefetcher_caps_every_browser_platform(self):
+        """Test that warm-up counts every Playwright platform against its browser slots."""
+        from app.main import prefetcher
+        assert prefetcher.browser_platforms == BROWSER_PLATFORMS
+        assert {"BigBasket", "JioMart", "JioMart Quick", "Zepto"} <= prefetcher.browser_platforms
+    
+    @pytest.mark.api
+    def test_search_records_popularity(self):
+        """Test that /api/search and /api/search/stream feed the popularity tracker."""
+        from app.prefetch import popular_queries
+        global_cache.clear()
+        for platform in SEARCH_PLATFORMS:
+            global_cache.set(platform, "atta 5kg", "560087", make_results(platform))
+        before = popular_queries.score("atta 5kg", "560087")
+        
+        with TestClient(app) as client:
+            client.get("/api/search?q=atta 5kg&pincode=560087")
+            client.get("/api/search/stream?q=5 kg atta&pincode=560087")
+            stats = client.get("/api/cache/stats").json()
+        
+        assert popular_queries.score("atta 5kg", "560087") == pytest.approx(before + 2, abs=0.01)
+        assert stats["prefetch"]["running"] is False
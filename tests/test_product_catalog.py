@@ -0,0 +1,148 @@
+"""Unit tests for the product metadata catalog."""
+import json
+import pytest
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
+
+from app.cache import CacheManager
+from app.product_catalog import ProductCatalog, product_key
+from app.scrapers.base import PriceRecord, ProductResult, ScrapeOutcome
+from tests.helpers import make_results
+
+
+class TestProductCatalog:
+    """Tests for the split of static product metadata from volatile prices."""
+    
+    @pytest.fixture
+    def split(self):
+        """Cache storing product metadata in a catalog."""
+        return CacheManager(max_entries=None, catalog=ProductCatalog())
+    
+    @staticmethod
+    def listing(platform="Amazon", price=99.0):
+        """Two products, one with a SKU in its URL."""
+        return [
+            ProductResult("Aashirvaad Atta 5kg", price, 120.0, "18% off", platform,
+                          "https://www.amazon.in/Aashirvaad-Atta/dp/B00TWOL9LM?ref=sr_1", "https://img/1.jpg", 4.4),
+            ProductResult("Pillsbury Atta 5kg", 210.0, None, None, platform,
+                          "https://www.amazon.in/s?k=atta", None, None, available=False),
+        ]
+    
+    @pytest.mark.unit
+    def test_product_keys(self):
+        """Test SKU keys, and name-qualified keys for URLs without one."""
+        assert product_key("Amazon", "https://www.amazon.in/x/dp/B00TWOL9LM?ref=a", "A") == "Amazon|B00TWOL9LM"
+        assert product_key("Flipkart", "https://www.flipkart.com/x/p/itm1?pid=ATAE5K&lid=1", "A") == "Flipkart|ATAE5K"
+        assert product_key("Zepto", "https://www.zeptonow.com/search?query=atta", "A") != \
+            product_key("Zepto", "https://www.zeptonow.com/search?query=atta", "B")
+    
+    @pytest.mark.unit
+    def test_round_trip_and_frame(self, split):
+        """Test that joined results and SSE frames match what was cached."""
+        results = self.listing()
+        split.set("Amazon", "atta", "560087", results)
+        assert split.get("Amazon", "atta", "560087")[0] == results
+        
+        frame, _ = split.get_frame("Amazon", "atta", "560087")
+        data = json.loads(frame.split(b"data: ", 1)[1])
+        assert [row["url"] for row in data["results"]] == [r.url for r in results]
+        assert data["results"][1]["available"] is False
+    
+    @pytest.mark.unit
+    def test_metadata_shared_across_entries(self, split):
+        """Test that products listed by many entries are stored once and entries shrink."""
+        whole = CacheManager(max_entries=None)
+        for pincode in ["560087", "400001", "110001", "600001"]:
+            for query in ["atta", "wheat flour"]:
+                split.set("Amazon", query, pincode, self.listing())
+                whole.set("Amazon", query, pincode, self.listing())
+        
+        stats = split.get_stats()
+        assert stats["catalog"]["products"] == 2
+        assert stats["memory_bytes"] + stats["catalog"]["memory_bytes"] < whole.get_stats()["memory_bytes"]
+    
+    @pytest.mark.unit
+    def test_reprice_carries_only_volatile_fields(self, split):
+        """Test that reprice updates the priced products and keeps the rest."""
+        results = self.listing()
+        old = split.set("Amazon", "atta", "560087", results)
+        
+        entry = split.reprice("Amazon", "atta", "560087", {results[0].url: PriceRecord(89.0, 120.0, "26% off")})
+        assert entry.generation > old.generation
+        repriced = entry.data
+        assert (repriced[0].price, repriced[0].discount, repriced[0].image_url) == (89.0, "26% off", "https://img/1.jpg")
+        assert repriced[1] == results[1]
+        assert split.catalog.get_stats()["changes"] == 0
+        assert split.reprice("Amazon", "ghee", "560087", {}) is None
+    
+    @pytest.mark.unit
+    def test_unreferenced_products_are_dropped(self):
+        """Test that products stay while an entry lists them and go as soon as none does."""
+        catalog = ProductCatalog()
+        cache = CacheManager(max_entries=None, catalog=catalog)
+        cache.set("Amazon", "atta", "560087", self.listing())
+        cache.set("Amazon", "wheat flour", "560087", self.listing())
+        cache.set("Flipkart", "atta", "560087", self.listing("Flipkart"))
+        
+        cache.invalidate("Amazon", "atta", "560087")
+        assert catalog.get_stats()["products"] == 4
+        cache.invalidate_platform("Amazon")
+        assert catalog.get_stats()["products"] == 2
+        assert catalog.get_stats()["dropped"] == 2
+        assert cache.get("Flipkart", "atta", "560087")[0] == self.listing("Flipkart")
+    
+    @pytest.mark.unit
+    def test_catalog_counts_against_byte_budget(self):
+        """Test that entries and catalog products together stay within max_bytes."""
+        cache = CacheManager(max_entries=None, max_bytes=20000, catalog=ProductCatalog())
+        for i in range(200):
+            cache.set("Amazon", f"query {i}", "560087", [
+                ProductResult(f"Product {i}-{n} " + "x" * 100, 99.0, None, None, "Amazon",
+                              f"https://www.amazon.in/p/{i}/{n}", None, None)
+                for n in range(5)
+            ])
+        
+        stats = cache.get_stats()
+        assert stats["evictions"] > 0
+        assert stats["memory_bytes"] + stats["catalog"]["memory_bytes"] <= 20000
+        assert stats["catalog"]["products"] == 5 * stats["entries"]
+    
+    @pytest.mark.unit
+    def test_failed_scrape_falls_back_to_joined_data(self, split):
+        """Test stale-if-error with split entries."""
+        split.set("Amazon", "atta", "560087", self.listing())
+        entry = split.set("Amazon", "atta", "560087", [], outcome=ScrapeOutcome.TIMEOUT)
+        assert entry.fallback is True
+        assert entry.data == self.listing()
+        assert split.catalog.get_stats()["referenced"] == 2
+    
+    @pytest.mark.unit
+    def test_entry_reads_in_full_after_eviction_or_invalidation(self):
+        """Test that an entry looked up before it left the cache still joins all its results."""
+        cache = CacheManager(max_entries=None, max_bytes=3000, catalog=ProductCatalog())
+        cache.set("Amazon", "atta", "560087", self.listing())
+        cache.set("Flipkart", "atta", "560087", self.listing("Flipkart"))
+        evicted = cache.get_many(["Amazon"], "atta", "560087")["Amazon"][0]
+        invalidated = cache.get_many(["Flipkart"], "atta", "560087")["Flipkart"][0]
+        
+        for i in range(20):
+            cache.set("Zepto", f"query {i}", "560087", self.listing("Zepto"))
+        cache.invalidate("Flipkart", "atta", "560087")
+        assert cache.peek("Amazon", "atta", "560087") is None
+        assert cache.peek("Flipkart", "atta", "560087") is None
+        
+        assert evicted.data == self.listing()
+        assert json.loads(evicted.results_json)[0]["name"] == "Aashirvaad Atta 5kg"
+        assert invalidated.data == self.listing("Flipkart")
+        frame = cache.frame_for(evicted, False)
+        assert json.loads(frame.split(b"data: ", 1)[1])["count"] == 2
+        
+        del evicted, invalidated
+        assert not any(key.startswith(("Amazon|", "Flipkart|")) for key in cache.catalog._products)
+    
+    @pytest.mark.unit
+    def test_join_rejects_unknown_products(self):
+        """Test that a product missing from the catalog is an error, not a shorter result list."""
+        with pytest.raises(KeyError):
+            ProductCatalog().join("Amazon", ["Amazon|B00TWOL9LM"], [[99.0, None, None, True, None]])
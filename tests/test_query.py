@@ -0,0 +1,67 @@
+"""Unit tests for query canonicalisation."""
+import pytest
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
+
+from app.query import QueryCanonicalizer, canonicalize
+from tests.helpers import make_results
+
+
+class TestQueryCanonicalisation:
+    """Tests for canonical cache keys."""
+    
+    @pytest.mark.unit
+    @pytest.mark.parametrize("query", [
+        "Amul Butter 500g",
+        "amul  butter 500 g",
+        "500g amul butter",
+        "butter, amul 500gm",
+        "Amul butter 0.5 kg",
+    ])
+    def test_spellings_share_a_key(self, query):
+        """Test that spacing, punctuation, word order and unit spellings collapse."""
+        assert canonicalize(query) == "500g amul butter"
+    
+    @pytest.mark.unit
+    def test_units_and_synonyms(self):
+        """Test volume units and the synonym table."""
+        assert canonicalize("Milk 1ltr") == canonicalize("1000 ml milk") == "1000ml milk"
+        assert canonicalize("Dahi 400 gm") == canonicalize("curd 400g")
+    
+    @pytest.mark.unit
+    @pytest.mark.parametrize("query, other", [
+        ("vitamin a", "vitamin"),
+        ("m&m", "m"),
+        ("M&M's", "m m s"),
+        ("coca-cola", "coca cola"),
+    ])
+    def test_distinct_products_keep_distinct_keys(self, query, other):
+        """Test that single letters and brand punctuation inside words are not canonicalised away."""
+        assert canonicalize(query) != canonicalize(other)
+    
+    @pytest.mark.unit
+    def test_brand_punctuation_survives(self):
+        """Test that &, ' and - are kept inside words and dropped between them."""
+        assert canonicalize("M&M's Peanut") == "m&m's peanut"
+        assert canonicalize("Coca-Cola, 750 ml") == "750ml coca-cola"
+        assert canonicalize("salt & pepper") == canonicalize("pepper - salt") == "pepper salt"
+    
+    @pytest.mark.unit
+    def test_variants_hit_one_entry(self, cache):
+        """Test that a differently spelled query hits the cached entry."""
+        cache.set("Zepto", "Amul Butter 500g", "560087", make_results("Zepto"))
+        assert cache.get("Zepto", "butter amul 500 gm", "560087")[0] is not None
+        assert cache.flight_key("Zepto", "500g Amul Butter", "560087") == ("Zepto", "500g amul butter", "560087")
+    
+    @pytest.mark.unit
+    def test_merge_stats(self):
+        """Test counting spellings merged into one key."""
+        canonical = QueryCanonicalizer()
+        for query in ["Amul Butter", "butter amul", "AMUL  BUTTER", "milk"]:
+            canonical(query)
+        stats = canonical.get_stats()
+        assert stats["spellings"] == 3
+        assert stats["canonical_keys"] == 2
+        assert stats["merged"] == 1
+        assert stats["largest_group"] == 2
@@ -0,0 +1,145 @@
+"""Unit tests for background refreshes of stale cache entries."""
+import dataclasses
+import time
+import pytest
+from fastapi.testclient import TestClient
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
+
+from app.cache import cache as global_cache
+from app.main import app
+from app.orchestrator import PLATFORMS, SEARCH_PLATFORMS
+from app.product_catalog import apply_prices
+from app.refresh import RefreshQueue
+from app.scrapers.base import PriceRecord
+from tests.helpers import make_results
+
+
+class TestBackgroundRefresh:
+    """Tests for the stale-while-revalidate refresh queue."""
+    
+    @pytest.mark.unit
+    async def test_jobs_are_deduplicated(self):
+        """Test that repeat enqueues for a pending key share one job."""
+        queue = RefreshQueue(workers=1)
+        calls = 0
+        
+        async def job():
+            nonlocal calls
+            calls += 1
+            return "fresh"
+        
+        first = queue.enqueue("k", job)
+        second = queue.enqueue("k", job)
+        assert first is second
+        assert await first == "fresh"
+        await queue.join()
+        
+        stats = queue.get_stats()
+        assert calls == 1
+        assert stats["deduplicated"] == 1
+        assert stats["completed"] == 1
+        assert stats["pending"] == 0
+    
+    @pytest.mark.unit
+    async def test_backlog_is_bounded(self):
+        """Test that jobs beyond max_pending are dropped."""
+        queue = RefreshQueue(workers=1, max_pending=1)
+        
+        async def job():
+            return None
+        
+        assert queue.enqueue("a", job) is not None
+        assert queue.enqueue("b", job) is None
+        assert queue.get_stats()["dropped"] == 1
+        await queue.join()
+    
+    @pytest.mark.api
+    def test_stale_stream_hit_returns_immediately(self, monkeypatch):
+        """Test that a stale platform is served from cache and refreshed in the background."""
+        class FakeScraper:
+            def __init__(self, pincode):
+                pass
+            
+            async def search(self, query):
+                return make_results("Zepto", price=79.0)
+        
+        monkeypatch.setitem(PLATFORMS, "Zepto", dataclasses.replace(PLATFORMS["Zepto"], scraper_class=FakeScraper, timeout=5.0))
+        global_cache.clear()
+        for platform in SEARCH_PLATFORMS:
+            global_cache.set(platform, "ghee", "560087", make_results(platform))
+        entry, _ = global_cache.lookup("Zepto", "ghee", "560087")
+        entry.timestamp -= entry.ttl * 0.9
+        
+        with TestClient(app) as client:
+            body = client.get("/api/search/stream?q=ghee&pincode=560087&live=true").text
+        
+        assert '"all_cached":true' in body
+        assert "event: refresh" in body
+        assert global_cache.get("Zepto", "ghee", "560087")[0][0].price == 79.0
+        global_cache.clear()
+
+
+class TestRepricingRefresh:
+    """Tests for refreshing stale entries by re-pricing their products."""
+    
+    class RepricingScraper:
+        """Scraper whose product pages all price at 79."""
+        
+        def __init__(self, priceable=True):
+            self.priceable = priceable
+            self.searches = 0
+            self.repriced = []
+        
+        def can_reprice(self, url):
+            return self.priceable
+        
+        async def reprice(self, urls):
+            self.repriced.append(urls)
+            return {url: PriceRecord(79.0) for url in urls}
+        
+        async def search(self, query):
+            self.searches += 1
+            return make_results("Amazon", price=95.0)
+    
+    @pytest.mark.unit
+    async def test_refresh_reprices_then_searches(self, monkeypatch):
+        """Test that refreshes reprice up to MAX_REPRICES times in a row, then search in full."""
+        from app import orchestrator
+        monkeypatch.setattr(orchestrator, "MAX_REPRICES", 2)
+        query = f"reprice-{time.time()}"
+        global_cache.set("Amazon", query, "560087", make_results("Amazon"))
+        scraper = self.RepricingScraper()
+        
+        for expected in (1, 2):
+            entry = await orchestrator.refresh_platform("Amazon", scraper, query, "560087", timeout=5)
+            assert (entry.data[0].price, entry.repriced) == (79.0, expected)
+        assert scraper.searches == 0
+        
+        entry = await orchestrator.refresh_platform("Amazon", scraper, query, "560087", timeout=5)
+        assert (entry.data[0].price, entry.repriced, scraper.searches) == (95.0, 0, 1)
+        global_cache.invalidate("Amazon", query, "560087")
+    
+    @pytest.mark.unit
+    async def test_unpriceable_results_fall_back_to_search(self):
+        """Test that entries listing search-page URLs are refreshed by a full search."""
+        from app.orchestrator import refresh_platform
+        query = f"reprice-{time.time()}"
+        global_cache.set("Amazon", query, "560087", make_results("Amazon"))
+        scraper = self.RepricingScraper(priceable=False)
+        
+        entry = await refresh_platform("Amazon", scraper, query, "560087", timeout=5)
+        assert (scraper.searches, scraper.repriced) == (1, [])
+        assert entry.data[0].price == 95.0
+        global_cache.invalidate("Amazon", query, "560087")
+    
+    @pytest.mark.unit
+    def test_apply_prices_keeps_mrp(self):
+        """Test that a price record without an MRP keeps the old one and recomputes the discount."""
+        result = make_results("Amazon")[0]
+        result.original_price = 120.0
+        repriced = apply_prices([result], {result.url: PriceRecord(90.0)})[0]
+        assert (repriced.price, repriced.original_price, repriced.discount) == (90.0, 120.0, "25% off")
+        assert repriced.unit_price == 180.0
+        assert repriced.name == result.name
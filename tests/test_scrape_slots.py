@@ -0,0 +1,34 @@
+"""Unit tests for the global scrape limits."""
+import asyncio
+import pytest
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
+
+from app.scrape_slots import ScrapeSlots
+
+
+class TestScrapeSlots:
+    """Tests for concurrent scrape limits."""
+    
+    @pytest.mark.unit
+    async def test_scrape_slots_bound_browser_scrapes(self):
+        """Test that browser scrapes beyond the browser slots wait for one to free up."""
+        slots = ScrapeSlots(max_scrapes=4, browser_slots=1)
+        running = peak = 0
+        
+        async def scrape(browser: bool):
+            nonlocal running, peak
+            async with slots.hold(browser=browser):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+        
+        await asyncio.gather(*(scrape(browser=True) for _ in range(3)))
+        assert peak == 1
+        await asyncio.gather(*(scrape(browser=False) for _ in range(6)))
+        assert peak == 4
+        stats = slots.get_stats()
+        assert (stats["acquired"], stats["in_flight"]) == (9, 0)
+        assert stats["queued"] >= 4
@@ -1,4 +1,7 @@
 """Unit tests for scrapers with mocked data."""
+import dataclasses
+import json
+import httpx
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from bs4 import BeautifulSoup
@@ -6,7 +9,8 @@ from bs4 import BeautifulSoup
 import sys
 sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
 
-from app.scrapers.base import BaseScraper, ProductResult
+from app.encoding import dumps
+from app.scrapers.base import BaseScraper, ProductResult, ScraperBlockedError, price_from_product_page
 from app.scrapers.amazon import AmazonScraper
 from app.scrapers.amazon_fresh import AmazonFreshScraper
 from app.scrapers.flipkart import FlipkartScraper
@@ -17,6 +21,8 @@ from app.scrapers.jiomart import JioMartScraper
 from app.scrapers.jiomart_quick import JioMartQuickScraper
 from app.scrapers.blinkit import BlinkitScraper
 from app.scrapers.instamart import InstamartScraper
+from app.scrapers.deadline import Deadline
+from tests.helpers import mock_transport
 
 
 class TestBaseScraper:
@@ -64,6 +70,33 @@ class TestBaseScraper:
         assert isinstance(headers, dict)
         assert "User-Agent" in headers
         assert "Accept" in headers
+    
+    @pytest.mark.unit
+    def test_check_blocked(self):
+        """Test that bot walls and rate limits raise ScraperBlockedError."""
+        scraper = AmazonScraper()
+        scraper.check_blocked(httpx.Response(200, text="<html>results</html>"))
+        with pytest.raises(ScraperBlockedError):
+            scraper.check_blocked(httpx.Response(429, text=""))
+        with pytest.raises(ScraperBlockedError):
+            scraper.check_blocked(httpx.Response(200, text="<form action='/errors/validateCaptcha'>"))
+    
+    @pytest.mark.unit
+    def test_budgets_fit_the_deadline(self):
+        """Test that timeouts and waits shrink to a request deadline, and only then."""
+        scraper = ZeptoScraper()
+        assert (scraper.nav_timeout(20000), scraper.pause(2000), scraper.budget_cut) == (20000, 2000, False)
+        
+        now = [100.0]
+        scraper.deadline = Deadline(3.0, clock=lambda: now[0])
+        assert scraper.nav_timeout(20000) == 2000   # leaves EXTRACT_RESERVE_MS for extraction
+        assert scraper.pause(2000) == 1500          # half of what is left
+        assert scraper.budget_cut
+        
+        now[0] += 3.5
+        assert scraper.deadline.expired
+        assert scraper.nav_timeout(20000) == Deadline.MIN_TIMEOUT_MS   # never 0 (no timeout)
+        assert scraper.pause(2000) == 0
 
 
 class TestProductResult:
@@ -93,6 +126,25 @@ class TestProductResult:
         )
         assert product.available is True
         assert product.delivery_time is None
+    
+    @pytest.mark.unit
+    def test_product_result_is_slotted(self, sample_product):
+        """Test that ProductResult has no per-instance __dict__."""
+        assert not hasattr(sample_product, "__dict__")
+    
+    @pytest.mark.unit
+    def test_product_result_interns_repeated_strings(self):
+        """Test that platform and delivery time strings are interned."""
+        first = ProductResult("A", 1.0, None, None, "".join(["Zep", "to"]), "u", None, None, delivery_time="".join(["10-15", " mins"]))
+        second = ProductResult("B", 2.0, None, None, "".join(["Ze", "pto"]), "u", None, None, delivery_time="".join(["10-", "15 mins"]))
+        assert first.platform is second.platform
+        assert first.delivery_time is second.delivery_time
+    
+    @pytest.mark.unit
+    def test_product_result_serialisation(self, sample_product):
+        """Test that the shallow dict and the encoded JSON match dataclasses.asdict."""
+        assert sample_product.to_dict() == dataclasses.asdict(sample_product)
+        assert json.loads(dumps(sample_product)) == sample_product.to_dict()
 
 
 class TestAmazonScraper:
@@ -328,4 +380,70 @@ class TestAllScrapersHaveRequiredAttributes:
         assert scraper.pincode == default_pincode
 
 
-
+class TestRepricing:
+    """Tests for re-pricing known products from their product pages."""
+    
+    JSON_LD_PAGE = """<html><head>
+        <script type="application/ld+json">{"@type": "BreadcrumbList"}</script>
+        <script type="application/ld+json">{"@graph": [{"@type": "Product", "name": "Atta",
+            "offers": [{"@type": "Offer", "price": "264.00", "availability": "https://schema.org/OutOfStock"}]}]}</script>
+        </head></html>"""
+    
+    AMAZON_PAGE = """<html><div id="corePriceDisplay_desktop_feature_div">
+        <span class="a-price priceToPay"><span class="a-offscreen">₹1,249.00</span></span>
+        <span class="a-price a-text-price"><span class="a-offscreen">₹1,599.00</span></span>
+        </div><div id="availability"><span>In stock</span></div></html>"""
+    
+    @pytest.mark.unit
+    def test_json_ld_and_meta_prices(self):
+        """Test reading offers from JSON-LD, falling back to price meta tags."""
+        record = price_from_product_page(self.JSON_LD_PAGE)
+        assert (record.price, record.available) == (264.0, False)
+        record = price_from_product_page('<meta property="product:price:amount" content="1,099">')
+        assert (record.price, record.available) == (1099.0, True)
+        assert price_from_product_page("<html>no price</html>") is None
+    
+    @pytest.mark.unit
+    def test_amazon_buy_box(self):
+        """Test the Amazon product page parser."""
+        record = AmazonScraper().extract_price_record(self.AMAZON_PAGE)
+        assert (record.price, record.original_price, record.available) == (1249.0, 1599.0, True)
+    
+    @pytest.mark.unit
+    def test_product_url_patterns(self):
+        """Test that only product pages are repriced, and store-priced quick-commerce pages not at all."""
+        assert AmazonScraper().can_reprice("https://www.amazon.in/Atta/dp/B00TWOL9LM/ref=sr_1")
+        assert not FlipkartScraper().can_reprice("https://www.flipkart.com/search")
+        assert BigBasketScraper().can_reprice("https://www.bigbasket.com/pd/126906/atta/")
+        assert not ZeptoScraper().can_reprice("https://www.zeptonow.com/pn/atta/pvid/1")
+        assert not AmazonFreshScraper().can_reprice("https://www.amazon.in/Atta/dp/B00TWOL9LM")
+        assert not JioMartQuickScraper().can_reprice("https://www.jiomart.com/p/groceries/atta/490000363")
+        assert not FlipkartMinutesScraper().can_reprice("https://www.flipkart.com/atta/p/itm1")
+    
+    @pytest.mark.unit
+    async def test_reprice_sends_location_cookies(self):
+        """Test that BigBasket product pages are fetched for the search's pincode."""
+        url = "https://www.bigbasket.com/pd/126906/atta/"
+        requests = []
+        with mock_transport({url: (200, self.JSON_LD_PAGE)}, requests):
+            prices = await BigBasketScraper(pincode="110001").reprice([url])
+        assert list(prices) == [url]
+        assert [request.headers.get("cookie") for request in requests] == ["_bb_pin_code=110001"]
+    
+    @pytest.mark.unit
+    async def test_reprice_fetches_product_pages(self):
+        """Test that reprice reads each product page once and skips what it cannot price."""
+        good = "https://www.flipkart.com/atta/p/itm1?pid=A1"
+        missing = "https://www.flipkart.com/ghee/p/itm2?pid=G2"
+        with mock_transport({good: (200, self.JSON_LD_PAGE)}):
+            prices = await FlipkartScraper().reprice([good, good, missing, "https://www.flipkart.com/search"])
+        assert list(prices) == [good]
+        assert prices[good].price == 264.0
+    
+    @pytest.mark.unit
+    async def test_reprice_blocked(self):
+        """Test that a platform refusing every page raises ScraperBlockedError."""
+        url = "https://www.flipkart.com/atta/p/itm1"
+        with mock_transport({url: (429, "")}):
+            with pytest.raises(ScraperBlockedError):
+                await FlipkartScraper().reprice([url])
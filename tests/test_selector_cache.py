@@ -0,0 +1,72 @@
+"""Unit tests for scraper selector memoization."""
+import pytest
+from bs4 import BeautifulSoup
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
+
+from app.scrapers.flipkart_minutes import FlipkartMinutesScraper
+from app.scrapers.selector_cache import SelectorCache, selector_cache
+
+
+class TestSelectorCache:
+    """Tests for adaptive selector memoization."""
+    
+    @pytest.mark.unit
+    def test_first_lookup_walks_cascade_in_order(self):
+        """Test that the first lookup tries candidates in cascade order."""
+        cache = SelectorCache()
+        tried = []
+        winner, result = cache.select("Test", ["a", "b", "c"], lambda s: tried.append(s) or s == "b")
+        assert winner == "b"
+        assert tried == ["a", "b"]
+    
+    @pytest.mark.unit
+    def test_remembered_winner_is_tried_first(self):
+        """Test that the winning selector is tried first on the next lookup."""
+        cache = SelectorCache()
+        cache.select("Test", ["a", "b", "c"], lambda s: s == "c")
+        tried = []
+        winner, _ = cache.select("Test", ["a", "b", "c"], lambda s: tried.append(s) or s == "c")
+        assert winner == "c"
+        assert tried == ["c"]
+        stats = cache.get_stats()["platforms"]["Test"]
+        assert stats["memo_hits"] == 1
+        assert stats["hit_rate"] == 100.0
+    
+    @pytest.mark.unit
+    def test_miss_re_explores_and_updates_winner(self):
+        """Test that a miss on the remembered selector falls back to the cascade."""
+        cache = SelectorCache()
+        cache.select("Test", ["a", "b", "c"], lambda s: s == "c")
+        winner, _ = cache.select("Test", ["a", "b", "c"], lambda s: s == "a")
+        assert winner == "a"
+        assert cache.get_stats()["platforms"]["Test"]["memo_misses"] == 1
+        assert cache.get_stats()["platforms"]["Test"]["preferred"] == "a"
+    
+    @pytest.mark.unit
+    def test_scheduled_exploration_uses_cascade_order(self):
+        """Test that every Nth lookup walks the full cascade again."""
+        cache = SelectorCache(explore_every=2)
+        cache.select("Test", ["a", "b"], lambda s: s == "b")
+        cache.select("Test", ["a", "b"], lambda s: True)
+        tried = []
+        cache.select("Test", ["a", "b"], lambda s: tried.append(s) or True)
+        assert tried == ["a"]
+        assert cache.get_stats()["platforms"]["Test"]["preferred"] == "a"
+    
+    @pytest.mark.unit
+    def test_flipkart_minutes_stops_at_first_sufficient_tier(self):
+        """Test that Flipkart Minutes skips later tiers once it has enough products."""
+        scraper = FlipkartMinutesScraper()
+        selector_cache.reset(scraper.PLATFORM_NAME)
+        body_text = "\n".join([
+            "Amul Pasteurised Butter 500 g", "₹275",
+            "Amul Salted Butter Pack 100 g", "₹58",
+            "Britannia Salted Butter 500 g", "₹265",
+            "", "", "",
+        ])
+        soup = BeautifulSoup("<html><body></body></html>", "lxml")
+        results = scraper._parse_products(soup, body_text)
+        assert len(results) == 3
+        assert selector_cache.get_stats()["platforms"][scraper.PLATFORM_NAME]["preferred"] == "text"
@@ -0,0 +1,74 @@
+"""Unit tests for single-flight scrape coalescing."""
+import asyncio
+import pytest
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
+
+from app.cache import cache as global_cache
+from app.singleflight import SingleFlight
+from tests.helpers import make_results
+
+
+class TestSingleFlight:
+    """Tests for coalescing identical in-flight scrapes."""
+    
+    @pytest.mark.unit
+    async def test_concurrent_callers_share_one_task(self):
+        """Test that concurrent calls for one key run the work once."""
+        flights = SingleFlight()
+        calls = 0
+        
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+        
+        results = await asyncio.gather(*[flights.do("k", work) for _ in range(20)])
+        assert results == [1] * 20
+        assert calls == 1
+        assert flights.get_stats()["coalesced"] == 19
+        assert flights.get_stats()["in_flight"] == 0
+    
+    @pytest.mark.unit
+    async def test_cancelled_caller_does_not_cancel_shared_work(self):
+        """Test that one caller going away leaves the others' result intact."""
+        flights = SingleFlight()
+        release = asyncio.Event()
+        
+        async def work():
+            await release.wait()
+            return "done"
+        
+        first = asyncio.create_task(flights.do("k", work))
+        second = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        assert await second == "done"
+        assert first.cancelled()
+    
+    @pytest.mark.unit
+    async def test_fetch_platform_coalesces_scrapes(self):
+        """Test that concurrent searches for one platform/query/pincode scrape once."""
+        from app.orchestrator import fetch_platform
+        global_cache.clear()
+        
+        class FakeScraper:
+            calls = 0
+            
+            async def search(self, query):
+                FakeScraper.calls += 1
+                await asyncio.sleep(0.01)
+                return make_results("Zepto")
+        
+        scraper = FakeScraper()
+        entries = await asyncio.gather(*[
+            fetch_platform("Zepto", scraper, query, "560087", timeout=5)
+            for query in ["amul butter", "Amul Butter", " amul butter"]
+        ])
+        assert FakeScraper.calls == 1
+        assert entries[0] is entries[1] is entries[2]
+        assert global_cache.get("Zepto", "amul butter", "560087")[0] == make_results("Zepto")
+        global_cache.clear()
@@ -0,0 +1,122 @@
+"""Unit tests for the learned pincode to dark store mapping."""
+import time
+import threading
+import pytest
+
+import sys
+sys.path.insert(0, str(__file__).rsplit('/tests', 1)[0])
+
+from app.cache import CacheManager, cache as global_cache
+from app.geo import DEFAULT_COORDINATES, ZONE_CENTROIDS, KeyScope, KeyScopePolicy
+from app.scrapers.store_map import StoreMap, find_store_id, store_map
+from tests.helpers import make_results
+
+
+class TestStoreMap:
+    """Tests for the learned pincode -> dark store mapping."""
+    
+    @pytest.fixture
+    def stores(self, tmp_path):
+        """Store map persisted in a temporary file."""
+        return StoreMap(str(tmp_path / "stores.json"))
+    
+    @pytest.mark.unit
+    def test_find_store_id(self):
+        """Test store id discovery in nested serviceability payloads."""
+        payload = {"data": {"serviceable": True, "stores": [{"name": "HSR", "storeId": 4711}]}}
+        assert find_store_id(payload) == "4711"
+        assert find_store_id({"store_id": "", "hub_id": "H-9"}) == "H-9"
+        assert find_store_id({"serviceable": False}) is None
+        assert find_store_id({"a": {"b": {"store_id": "deep"}}}, depth=1) is None
+    
+    @pytest.mark.unit
+    def test_learn_persists_and_reloads(self, stores):
+        """Test that learned stores and coordinates survive a reload."""
+        assert stores.learn("Zepto", "560087", "ds-1") is True
+        assert stores.learn("Zepto", "560087", "ds-1") is False
+        assert stores.learn("Zepto", "560087", "ds-2") is True
+        stores.set_coordinates("560087", 12.95, 77.70)
+        
+        reloaded = StoreMap(stores.path)
+        assert reloaded.store_for("Zepto", "560087") == "ds-2"
+        assert reloaded.coordinates("560087") == (12.95, 77.70)
+        assert stores.get_stats()["learned"] == 1
+        assert stores.get_stats()["moved"] == 1
+    
+    @pytest.mark.unit
+    async def test_alearn_saves_off_the_event_loop(self, stores, monkeypatch):
+        """Test that a store learned during a scrape is persisted from a worker thread."""
+        save, threads = stores.save, []
+        monkeypatch.setattr(stores, "save", lambda: (threads.append(threading.current_thread()), save()))
+        
+        assert await stores.alearn("Zepto", "560087", "ds-1") is True
+        assert await stores.alearn("Zepto", "560087", "ds-1") is False
+        assert threads and threading.main_thread() not in threads
+        assert StoreMap(stores.path).store_for("Zepto", "560087") == "ds-1"
+    
+    @pytest.mark.unit
+    def test_unlearned_pincodes_keep_their_own_scope(self):
+        """Test that geocoded pincodes without a learned store are not merged by area."""
+        stores = StoreMap()
+        stores.set_coordinates("560034", 12.935, 77.624)
+        stores.set_coordinates("560095", 12.936, 77.625)
+        assert stores.location("Zepto", "560034") is None
+        assert stores.location("Zepto", "560095") is None
+        stores.learn("Zepto", "560034", "ds-1")
+        assert stores.location("Zepto", "560034") == "store:ds-1"
+        assert stores.locations("560034") == {"store:ds-1"}
+    
+    @pytest.mark.unit
+    def test_coordinates_fall_back_to_zone(self):
+        """Test that unknown pincodes are located at their zone's centroid, else Bengaluru."""
+        stores = StoreMap()
+        assert stores.coordinates("110001") == ZONE_CENTROIDS["delhi-ncr"]
+        assert stores.coordinates("641001") == DEFAULT_COORDINATES
+    
+    @pytest.mark.unit
+    def test_store_scope_shares_entries_across_pincodes(self):
+        """Test that pincodes served by one dark store share entries; unmapped ones stay per pincode."""
+        stores = StoreMap()
+        stores.learn("Zepto", "560034", "ds-1")
+        stores.learn("Zepto", "560095", "ds-1")
+        cache = CacheManager(key_scopes=KeyScopePolicy({"Zepto": KeyScope.STORE}, stores=stores))
+        
+        cache.set("Zepto", "atta", "560034", make_results("Zepto"))
+        assert cache.get("Zepto", "atta", "560095")[0] is not None
+        assert cache.get("Zepto", "atta", "560087")[0] is None
+        assert cache.flight_key("Zepto", "atta", "560034") == cache.flight_key("Zepto", "atta", "560095")
+        
+        assert cache.invalidate_pincode("560095") == 1
+        assert cache.get("Zepto", "atta", "560034")[0] is None
+    
+    @pytest.mark.unit
+    def test_scraper_captures_store_from_serviceability(self):
+        """Test that only serviceability URLs are searched for a store id."""
+        from app.scrapers import ZeptoScraper
+        
+        scraper = ZeptoScraper("560087")
+        assert scraper.capture_store("https://cdn.example/api/banner", {"storeId": "ad"}) is None
+        for url in ["https://www.zeptonow.com/storefront/config", "https://api.zeptonow.com/store-locator",
+                    "https://cdn.zeptonow.com/static/store/banner.json"]:
+            assert scraper.capture_store(url, {"storeId": "bogus"}) is None
+        assert scraper.capture_store("https://api.zeptonow.com/serviceability", {"storeId": "ds-7"}) == "ds-7"
+    
+    @pytest.mark.unit
+    async def test_fetch_platform_learns_store(self, monkeypatch):
+        """Test that fetch_platform learns the scraper's store and caches under it."""
+        from app.orchestrator import fetch_platform
+        
+        monkeypatch.setattr(store_map, "path", None)
+        monkeypatch.setattr(store_map, "_stores", {})
+        
+        class StoreScraper:
+            store_id = "ds-42"
+            
+            async def search(self, query):
+                return make_results("Zepto")
+        
+        query = f"storemap-{time.time()}"
+        await fetch_platform("Zepto", StoreScraper(), query, "560087", timeout=5)
+        assert store_map.store_for("Zepto", "560087") == "ds-42"
+        assert "store:ds-42" in global_cache.flight_key("Zepto", query, "560087")
+        assert global_cache.get("Zepto", query, "560087")[0] is not None